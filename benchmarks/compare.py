@@ -0,0 +1,69 @@
+import sys
+import json
+import argparse
+from typing import Dict, List, Any, Optional
+
+
+# Для этих показателей рост означает ухудшение
+LOWER_IS_BETTER = ("cpu_ms_per_run", "peak_rss_mb", "peak_open_sockets")
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _change(old: Optional[float], new: Optional[float]) -> str:
+    if old is None or new is None:
+        return "-"
+    if not old:
+        return "+inf" if new else "0%"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 10) -> List[str]:
+    """Строки сравнения по точкам с одинаковым числом кошельков; ухудшения больше threshold процентов помечаются"""
+    lines = [
+        f"База: {baseline['environment'].get('commit')}  Текущий: {current['environment'].get('commit')}"
+    ]
+    old_points = {point["wallets"]: point for point in baseline["points"]}
+
+    for point in current["points"]:
+        old = old_points.get(point["wallets"])
+        if old is None:
+            continue
+
+        lines.append(f"\n{point['wallets']} кошельков:")
+        metrics = [("runs_per_minute", old["runs_per_minute"], point["runs_per_minute"])]
+        metrics += [(key, old.get(key), point.get(key)) for key in LOWER_IS_BETTER]
+        for stage, stats in point["stages"].items():
+            old_stats = old["stages"].get(stage, {})
+            metrics += [(f"{stage} p{q}", old_stats.get(f"p{q}"), stats.get(f"p{q}")) for q in (50, 95, 99)]
+
+        for name, old_value, new_value in metrics:
+            worse = False
+            if old_value and new_value is not None:
+                delta = (new_value - old_value) / old_value * 100
+                worse = delta < -threshold if name == "runs_per_minute" else delta > threshold
+            mark = "  <-- хуже" if worse else ""
+            lines.append(
+                f"  {name:<28}{'-' if old_value is None else f'{old_value:.3f}':>12}"
+                f"{'-' if new_value is None else f'{new_value:.3f}':>12}{_change(old_value, new_value):>10}{mark}"
+            )
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Сравнение двух результатов бенчмарка")
+    parser.add_argument("baseline", help="результат до изменений")
+    parser.add_argument("current", help="результат после изменений")
+    parser.add_argument("--threshold", type=float, default=10, help="порог ухудшения в процентах")
+    args = parser.parse_args(argv)
+
+    lines = compare(_load(args.baseline), _load(args.current), args.threshold)
+    print("\n".join(lines))
+    return 1 if any(line.endswith("<-- хуже") for line in lines) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import sys
+import json
+import time
+import argparse
+import tempfile
+from typing import Dict, List, Any, Optional
+
+from .run import environment, mock_endpoints, start_mocks, run_point, save_report
+
+
+# Наборы сбоев: секция faults конфига (доли от всех запросов транспорта)
+FAULT_MIXES: Dict[str, Dict[str, Any]] = {
+    "clean": {},
+    "http_5xx": {"http": {"server_error_rate": 0.05, "rate_limit_rate": 0.03}},
+    "http_resets": {"http": {"reset_rate": 0.05}},
+    "http_timeouts": {"http": {"timeout_rate": 0.03, "timeout_seconds": 3}},
+    "slow_bodies": {
+        "http": {"slow_body_rate": 0.1, "slow_body_seconds": 2},
+        "rpc": {"slow_body_rate": 0.1, "slow_body_seconds": 1}
+    },
+    "rpc_errors": {"rpc": {"server_error_rate": 0.03, "rate_limit_rate": 0.03, "reset_rate": 0.01}},
+    "dropped_transactions": {"rpc": {"drop_transaction_rate": 0.1}},
+    "mixed": {
+        "http": {"server_error_rate": 0.02, "rate_limit_rate": 0.02, "reset_rate": 0.01, "timeout_rate": 0.01, "timeout_seconds": 3},
+        "rpc": {"server_error_rate": 0.01, "rate_limit_rate": 0.01, "drop_transaction_rate": 0.02}
+    }
+}
+
+# Стратегии повторов HTTP запросов TLSClient
+STRATEGIES: Dict[str, Dict[str, Any]] = {
+    "no_retry": {"max_retries": 1, "retry_delay": 0},
+    "default": {"max_retries": 3, "retry_delay": 1.0},
+    "fast": {"max_retries": 5, "retry_delay": 0.2}
+}
+
+
+def _select(value: str, available: Dict[str, Any]) -> List[str]:
+    if value == "all":
+        return list(available)
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise SystemExit(f"Неизвестные имена: {', '.join(unknown)}. Доступны: {', '.join(available)}")
+    return names
+
+
+def format_table(points: List[Dict[str, Any]]) -> str:
+    lines = [f"{'сбои':<22}{'стратегия':<11}{'успех':>8}{'goodput/мин':>13}{'впустую':>9}{'запросов':>10}  внесено"]
+    for point in points:
+        wasted = "-" if point["wasted_request_ratio"] is None else f"{point['wasted_request_ratio'] * 100:.1f}%"
+        faults = ", ".join(f"{kind} {count}" for kind, count in point["faults_injected"].items()) or "-"
+        lines.append(
+            f"{point['mix']:<22}{point['strategy']:<11}{point['success']:>4}/{point['runs']:<3}"
+            f"{point['goodput_per_minute']:>13.1f}{wasted:>9}{point['requests']['http'] + point['requests']['rpc']:>10}  {faults}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Goodput и доля лишних запросов стратегий повторов при разных сбоях")
+    parser.add_argument("--wallets", type=int, default=50)
+    parser.add_argument("--mixes", default="all", help=f"наборы сбоев через запятую: {', '.join(FAULT_MIXES)}")
+    parser.add_argument("--strategies", default="all", help=f"стратегии повторов через запятую: {', '.join(STRATEGIES)}")
+    parser.add_argument("--mock-config", help="JSON с настройками заглушек вместо встроенных")
+    parser.add_argument("--poll-seconds", type=float, default=0.2)
+    parser.add_argument("--receipt-timeout", type=float, default=20, help="ожидание квитанции, с (важно для потерянных транзакций)")
+    parser.add_argument("--workers", help="воркеры этапов, например prepare=50,generate=200,publish=50,mint=50")
+    parser.add_argument("--queue-size", type=int)
+    parser.add_argument("--timeout", type=float, default=600, help="предел одного прогона, с")
+    parser.add_argument("--seed", type=int, default=1, help="зерно генератора сбоев, одинаковое для всех стратегий")
+    parser.add_argument("--output", help="файл результата (по умолчанию benchmarks/results/faults-<время>-<коммит>.json)")
+    args = parser.parse_args(argv)
+
+    mixes = _select(args.mixes, FAULT_MIXES)
+    strategies = _select(args.strategies, STRATEGIES)
+    mock_config, mahojin_url, rpc_url = mock_endpoints(args)
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "settings": {
+            "mock_services": mock_config, "wallets": args.wallets, "poll_seconds": args.poll_seconds,
+            "receipt_timeout": args.receipt_timeout, "seed": args.seed,
+            "mixes": {name: FAULT_MIXES[name] for name in mixes},
+            "strategies": {name: STRATEGIES[name] for name in strategies}
+        },
+        "points": []
+    }
+
+    with tempfile.TemporaryDirectory(prefix="mahojin-mocks-") as config_dir:
+        for mix in mixes:
+            for strategy in strategies:
+                mocks = start_mocks(mock_config, config_dir)
+                try:
+                    print(f"Сбои {mix}, стратегия {strategy}...", flush=True)
+                    extra = [
+                        "--receipt-timeout", str(args.receipt_timeout),
+                        "--max-retries", str(STRATEGIES[strategy]["max_retries"]),
+                        "--retry-delay", str(STRATEGIES[strategy]["retry_delay"])
+                    ]
+                    if FAULT_MIXES[mix]:
+                        extra += ["--faults", json.dumps(dict(FAULT_MIXES[mix], seed=args.seed))]
+                    point = run_point(args.wallets, mahojin_url, rpc_url, args, extra)
+                    report["points"].append(dict(point, mix=mix, strategy=strategy))
+                finally:
+                    mocks.terminate()
+                    mocks.wait(timeout=30)
+
+    output = save_report(report, args.output, prefix="faults-")
+    print(format_table(report["points"]))
+    print(f"Результат сохранен в {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
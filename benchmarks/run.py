@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List, Any, Optional, Tuple
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+# Задержки заглушек сжаты: генерация секунда вместо минуты, блок раз в полсекунды
+MOCK_CONFIG = {
+    "mahojin": {
+        "generation_seconds": 1,
+        "faults": {"latency_ms": 20, "latency_jitter_ms": 10}
+    },
+    "chain": {
+        "block_time": 0.5,
+        "max_block_transactions": 5000,
+        "faults": {"latency_ms": 5}
+    }
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_port(port: int, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Заглушка на порту {port} не запустилась за {timeout} с")
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def start_mocks(config: Dict[str, Any], config_dir: str) -> subprocess.Popen:
+    config_path = os.path.join(config_dir, "mock_services.json")
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "mock_services", "--config", config_path],
+        cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    _wait_port(config["mahojin_port"])
+    _wait_port(config["rpc_port"])
+    return process
+
+
+def run_point(wallets: int, mahojin_url: str, rpc_url: str, args: argparse.Namespace,
+              extra: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Каждая точка кривой в отдельном процессе, чтобы пиковая память и сокеты не копились между точками"""
+    command = [
+        sys.executable, "-m", "benchmarks.scenario",
+        "--wallets", str(wallets), "--mahojin-url", mahojin_url, "--rpc-url", rpc_url,
+        "--poll-seconds", str(args.poll_seconds), "--timeout", str(args.timeout)
+    ]
+    if args.workers:
+        command += ["--workers", args.workers]
+    if args.queue_size:
+        command += ["--queue-size", str(args.queue_size)]
+    command += extra or []
+
+    completed = subprocess.run(command, cwd=REPO_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Прогон на {wallets} кошельков упал:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def format_table(points: List[Dict[str, Any]]) -> str:
+    lines = [
+        f"{'кошельки':>9}{'прогоны/мин':>13}{'успех':>8}{'CPU мс/прогон':>15}"
+        f"{'RSS МБ':>9}{'сокеты':>8}  p50/p95/p99 по этапам, с"
+    ]
+    for point in points:
+        stages = "  ".join(
+            f"{name} {stage['p50']:.2f}/{stage['p95']:.2f}/{stage['p99']:.2f}"
+            for name, stage in point["stages"].items()
+        )
+        cpu = "-" if point["cpu_ms_per_run"] is None else f"{point['cpu_ms_per_run']:.1f}"
+        lines.append(
+            f"{point['wallets']:>9}{point['runs_per_minute']:>13.1f}{point['success']:>8}{cpu:>15}"
+            f"{point['peak_rss_mb']:>9.0f}{point['peak_open_sockets']:>8}  {stages}"
+        )
+    return "\n".join(lines)
+
+
+def mock_endpoints(args: argparse.Namespace) -> Tuple[Dict[str, Any], str, str]:
+    mock_config = dict(MOCK_CONFIG)
+    if args.mock_config:
+        with open(args.mock_config, 'r', encoding='utf-8') as f:
+            mock_config = json.load(f)
+    mock_config["mahojin_port"] = _free_port()
+    mock_config["rpc_port"] = _free_port()
+    return mock_config, f"http://127.0.0.1:{mock_config['mahojin_port']}", f"http://127.0.0.1:{mock_config['rpc_port']}"
+
+
+def save_report(report: Dict[str, Any], output: Optional[str], prefix: str = "") -> str:
+    output = output or os.path.join(
+        RESULTS_DIR, f"{prefix}{time.strftime('%Y%m%d-%H%M%S')}-{report['environment']['commit'] or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    return output
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк пропускной способности против локальных заглушек")
+    parser.add_argument("--wallets", default="10,100,1000,10000", help="точки кривой масштабирования через запятую")
+    parser.add_argument("--mock-config", help="JSON с настройками заглушек вместо встроенных")
+    parser.add_argument("--poll-seconds", type=float, default=0.2)
+    parser.add_argument("--workers", help="воркеры этапов, например prepare=50,generate=200,publish=50,mint=50")
+    parser.add_argument("--queue-size", type=int)
+    parser.add_argument("--timeout", type=float, default=600, help="предел одной точки, с")
+    parser.add_argument("--output", help="файл результата (по умолчанию benchmarks/results/<время>-<коммит>.json)")
+    args = parser.parse_args(argv)
+
+    mock_config, mahojin_url, rpc_url = mock_endpoints(args)
+    env = environment()
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": env,
+        "settings": {
+            "mock_services": mock_config, "poll_seconds": args.poll_seconds,
+            "workers": args.workers, "queue_size": args.queue_size
+        },
+        "points": []
+    }
+
+    with tempfile.TemporaryDirectory(prefix="mahojin-mocks-") as config_dir:
+        # Заглушки перезапускаются для каждой точки: состояние цепочки и сессий не переходит между ними
+        for wallets in [int(value) for value in args.wallets.split(",") if value.strip()]:
+            mocks = start_mocks(mock_config, config_dir)
+            try:
+                print(f"Прогон на {wallets} кошельков...", flush=True)
+                report["points"].append(run_point(wallets, mahojin_url, rpc_url, args))
+            finally:
+                mocks.terminate()
+                mocks.wait(timeout=30)
+
+    output = save_report(report, args.output)
+    print(format_table(report["points"]))
+    print(f"Результат сохранен в {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
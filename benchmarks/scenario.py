@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from typing import Dict, List, Any, Optional
+
+try:
+    import resource
+except ImportError:
+    # Windows: модуля resource и /proc нет, RSS и сокеты в отчете будут нулевыми
+    resource = None
+
+from eth_account import Account
+from loguru import logger
+
+from functions.config_manager import ConfigManager
+from functions.account_manager import AccountManager
+from functions.logger_setup import setup_logging
+from observability.metrics import STAGE_LATENCY, HTTP_REQUESTS, RPC_REQUESTS, RETRIES, FAULTS_INJECTED
+
+
+QUANTILES = (0.5, 0.95, 0.99)
+# Корзины Prometheus слишком грубые для квантилей: в процессе бенчмарка шаг корзин 10%, от 5 мс до 10 мин
+FINE_BUCKETS = tuple(0.005 * 1.1 ** i for i in range(125))
+
+
+class ResourceSampler:
+    """Раз в interval секунд снимает текущий RSS и число открытых сокетов процесса, запоминая максимум"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.peak_sockets = 0
+        self.peak_rss_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="bench-sampler", daemon=True)
+
+
+    @staticmethod
+    def open_sockets() -> int:
+        count = 0
+        try:
+            for fd in os.listdir("/proc/self/fd"):
+                try:
+                    if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                        count += 1
+                except OSError:
+                    continue
+        except OSError:
+            return 0
+        return count
+
+
+    @staticmethod
+    def rss_mb() -> float:
+        try:
+            with open("/proc/self/statm", 'r') as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+        except (OSError, ValueError, AttributeError):
+            # AttributeError: os.sysconf есть только в POSIX
+            return 0.0
+
+
+    @staticmethod
+    def max_rss_mb() -> float:
+        """Пиковый RSS процесса по данным ОС"""
+        if resource is None:
+            return 0.0
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss в Linux в килобайтах, в macOS в байтах
+        return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 1024
+
+
+    def _sample(self) -> None:
+        self.peak_sockets = max(self.peak_sockets, self.open_sockets())
+        self.peak_rss_mb = max(self.peak_rss_mb, self.rss_mb())
+
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+
+    def start(self) -> None:
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._sample()
+
+
+def _parse_workers(value: Optional[str]) -> Dict[str, int]:
+    workers = {}
+    for item in filter(None, (value or "").split(",")):
+        stage, count = item.split("=")
+        workers[stage.strip()] = int(count)
+    return workers
+
+
+def prepare_files(files_dir: str, wallets: int, args: argparse.Namespace) -> ConfigManager:
+    """Создает config.json и accounts.csv с новыми ключами; задержки сжаты до значений, удобных для заглушек"""
+    ConfigManager(files_dir)
+    config_path = os.path.join(files_dir, "config.json")
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    config["endpoints"] = {"mahojin_url": args.mahojin_url, "dynamic_auth_url": args.mahojin_url, "rpc_url": args.rpc_url}
+    config["polling"] = {"generation_status_seconds": args.poll_seconds, "receipt_seconds": args.poll_seconds}
+    config["pipeline"]["enabled"] = True
+    config["pipeline"]["workers"].update(_parse_workers(args.workers))
+    config["pipeline"]["queue_size"] = args.queue_size or config["pipeline"]["queue_size"]
+    config["pipeline"]["metrics_interval_seconds"] = 10**9
+    config["results"]["enabled"] = False
+    config["dashboard"]["enabled"] = False
+    config["tracing"]["enabled"] = False
+    config["metrics"]["enabled"] = False
+    config["logging"]["console_events"] = False
+    config["drain_timeout_seconds"] = args.timeout
+    config["polling"]["receipt_timeout_seconds"] = args.receipt_timeout
+    if args.faults:
+        config["faults"] = dict(json.loads(args.faults), enabled=True)
+    if args.max_retries is not None:
+        config["http_retry"]["max_retries"] = args.max_retries
+    if args.retry_delay is not None:
+        config["http_retry"]["retry_delay_seconds"] = args.retry_delay
+
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=4)
+
+    with open(os.path.join(files_dir, "accounts.csv"), 'w', encoding='utf-8') as f:
+        f.write("private_key,proxy\n")
+        for _ in range(wallets):
+            f.write(f"{Account.create().key.hex()},\n")
+
+    return ConfigManager(files_dir)
+
+
+def stage_latency(before: Dict[tuple, List[float]], after: Dict[tuple, List[float]]) -> Dict[str, Dict[str, Any]]:
+    stages = {}
+    for labels, data in sorted(after.items()):
+        previous = before.get(labels, [0] * len(data))
+        delta = [current - old for current, old in zip(data, previous)]
+        if not delta[-1]:
+            continue
+        name = "/".join(labels)
+        stages[name] = {"count": int(delta[-1]), "mean": delta[-2] / delta[-1]}
+        for q in QUANTILES:
+            stages[name][f"p{int(q * 100)}"] = STAGE_LATENCY.quantile(q, delta)
+    return stages
+
+
+def request_counts() -> Dict[str, int]:
+    """Попытки запросов и потраченные впустую: повторы, ошибки, ответы 4xx/5xx и RPC ошибки"""
+    http = HTTP_REQUESTS.totals()
+    retries = RETRIES.totals()
+    rpc = RPC_REQUESTS.totals()
+    http_retries = sum(value for (component, _), value in retries.items() if component == "http")
+    return {
+        "http": sum(http.values()) + http_retries,
+        "http_wasted": http_retries + sum(
+            value for labels, value in http.items() if not labels[-1].isdigit() or int(labels[-1]) >= 400
+        ),
+        "rpc": sum(rpc.values()),
+        "rpc_wasted": sum(value for (_, outcome), value in rpc.items() if outcome != "ok")
+    }
+
+
+async def _drive(account_manager: AccountManager, results: List[Dict[str, Any]], timing: Dict[str, float]) -> None:
+    async def one(account: Dict[str, str], account_index: int) -> None:
+        private_key, proxy = account_manager._parse_account(account)
+        results.append(await account_manager._run_pipeline_job(private_key, proxy, account_index))
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(account, i) for i, account in enumerate(account_manager.accounts)))
+    finally:
+        timing["elapsed"] = time.perf_counter() - started
+        account_manager.shutdown_event.set()
+
+
+def run_scenario(args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="mahojin-bench-") as files_dir:
+        setup_logging(log_dir=files_dir, level=args.log_level)
+        config_manager = prepare_files(files_dir, args.wallets, args)
+        account_manager = AccountManager(config_manager)
+        results: List[Dict[str, Any]] = []
+        timing: Dict[str, float] = {}
+
+        STAGE_LATENCY.buckets = FINE_BUCKETS
+        sampler = ResourceSampler(args.sample_interval)
+        latency_before = STAGE_LATENCY.totals()
+        requests_before = request_counts()
+        faults_before = FAULTS_INJECTED.totals()
+        cpu_before = os.times()
+        sampler.start()
+        try:
+            asyncio.run(account_manager._run_pipeline([_drive(account_manager, results, timing)]))
+        finally:
+            sampler.stop()
+            cpu_after = os.times()
+            requests = {key: value - requests_before[key] for key, value in request_counts().items()}
+            faults = {
+                "/".join(labels): value - faults_before.get(labels, 0)
+                for labels, value in FAULTS_INJECTED.totals().items() if value - faults_before.get(labels, 0)
+            }
+            account_manager.close()
+            logger.complete()
+
+    runs = len(results)
+    elapsed = timing.get("elapsed", 0)
+    cpu_seconds = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+    errors: Dict[str, int] = {}
+    for result in results:
+        if not result.get("success", False):
+            reason = f"{result.get('stage') or '-'}: {str(result.get('error'))[:80]}"
+            errors[reason] = errors.get(reason, 0) + 1
+
+    success = sum(1 for result in results if result.get("success", False))
+    attempts = requests["http"] + requests["rpc"]
+    return {
+        "wallets": args.wallets,
+        "runs": runs,
+        "success": success,
+        "failed": sum(1 for result in results if not result.get("success", False)),
+        "elapsed_seconds": elapsed,
+        "runs_per_minute": runs / elapsed * 60 if elapsed else 0,
+        "goodput_per_minute": success / elapsed * 60 if elapsed else 0,
+        "requests": requests,
+        "wasted_request_ratio": (requests["http_wasted"] + requests["rpc_wasted"]) / attempts if attempts else None,
+        "faults_injected": faults,
+        "cpu_seconds": cpu_seconds,
+        "cpu_ms_per_run": cpu_seconds / runs * 1000 if runs else None,
+        "peak_rss_mb": max(sampler.peak_rss_mb, sampler.max_rss_mb()),
+        "peak_open_sockets": sampler.peak_sockets,
+        "stages": stage_latency(latency_before, STAGE_LATENCY.totals()),
+        "errors": dict(sorted(errors.items(), key=lambda item: item[1], reverse=True)[:10])
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Один прогон бенчмарка: N новых кошельков через конвейер против заглушек")
+    parser.add_argument("--wallets", type=int, required=True)
+    parser.add_argument("--mahojin-url", required=True)
+    parser.add_argument("--rpc-url", required=True)
+    parser.add_argument("--poll-seconds", type=float, default=0.2, help="интервал опроса генерации и квитанций")
+    parser.add_argument("--workers", help="воркеры этапов, например prepare=50,generate=200,publish=50,mint=50")
+    parser.add_argument("--queue-size", type=int)
+    parser.add_argument("--timeout", type=float, default=600, help="сколько ждать незавершенные прогоны")
+    parser.add_argument("--receipt-timeout", type=float, default=60, help="сколько ждать квитанцию транзакции")
+    parser.add_argument("--faults", help="JSON секции faults (http/rpc) для внесения сбоев")
+    parser.add_argument("--max-retries", type=int, help="попытки HTTP запроса")
+    parser.add_argument("--retry-delay", type=float, help="базовая задержка повтора HTTP запроса")
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(run_scenario(args)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
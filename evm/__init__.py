@@ -1,9 +1,12 @@
 from .base_activity import BaseActivity
 from .client import EVMClient
 from .networks import Networks
+from .registry import Registry, registry
 
 __all__ = [
     "BaseActivity",
     "EVMClient",
-    "Networks"
+    "Networks",
+    "Registry",
+    "registry"
 ]
@@ -0,0 +1,36 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+# Каталог ABI относительно пакета, а не текущей директории процесса
+ABI_DIR = Path(__file__).parent / "abis"
+
+_cache: Dict[str, List[Dict[str, Any]]] = {}
+_lock = threading.Lock()
+
+
+def load_abi(abi_filename: str) -> List[Dict[str, Any]]:
+    """ABI из evm/abis: файл читается и разбирается один раз на процесс, дальше объект общий для всех контрактов"""
+    abi = _cache.get(abi_filename)
+    if abi is not None:
+        return abi
+
+    with _lock:
+        abi = _cache.get(abi_filename)
+        if abi is None:
+            path = ABI_DIR / abi_filename
+            try:
+                with path.open("r", encoding="utf-8") as file:
+                    abi = json.load(file)
+            except FileNotFoundError:
+                raise FileNotFoundError(f"ABI файл не найден: {path}")
+            except json.JSONDecodeError:
+                raise ValueError(f"Ошибка парсинга ABI файла: {path}")
+
+            for item in abi:
+                if item.get("inputs") is None:
+                    item["inputs"] = []
+            abi = _cache[abi_filename] = abi
+    return abi
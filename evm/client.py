@@ -1,22 +1,43 @@
 import asyncio
-from web3 import AsyncWeb3, AsyncHTTPProvider
+from typing import Dict, Tuple
 from eth_account import Account
+from eth_account.signers.local import LocalAccount
+from hexbytes import HexBytes
+from eth_account.messages import encode_defunct
 from .networks import Network
-from fake_useragent import UserAgent
+from .provider_pool import provider_pool
 from evm.models.token import TokenAmount
 from loguru import logger
 
+
+# Аккаунты по приватному ключу: открытый ключ выводится один раз на процесс, а не на каждый прогон
+_local_accounts: Dict[str, LocalAccount] = {}
+
+
+def local_account(private_key: str) -> LocalAccount:
+    account = _local_accounts.get(private_key)
+    if account is None:
+        account = _local_accounts[private_key] = Account.from_key(private_key)
+    return account
+
+
 class EVMClient:
-    def __init__(self, private_key: str, network: Network, proxy: str = None):
+    """Кошелек поверх общего провайдера пула: клиенты с одинаковыми RPC и прокси делят AsyncWeb3 и соединения"""
+    
+    def __init__(
+        self,
+        private_key: str,
+        network: Network,
+        proxy: str = None,
+        fault_injector=None,
+        base_fee_multiplier: float = 2,
+        signer=None
+    ):
         self.private_key = private_key
         self.network = network
-        
-        self.headers = {
-            'accept': '*/*',
-            'accept-language': 'en-US,en;q=0.9',
-            'content-type': 'application/json',
-            'user-agent': UserAgent().chrome
-        }
+        self.base_fee_multiplier = base_fee_multiplier
+        # SigningService: подпись в пуле процессов вместо event loop
+        self.signer = signer
         
         if proxy:
             if 'http' not in proxy:
@@ -24,17 +45,9 @@ class EVMClient:
             self.proxy = proxy
         else:
             self.proxy = None
-            
-        provider = AsyncHTTPProvider(
-            endpoint_uri=network.rpc_url,
-            request_kwargs={
-                'proxy': self.proxy,
-                'headers': self.headers
-            }
-        )
         
-        self.web3 = AsyncWeb3(provider)
-        self.account = Account.from_key(private_key)
+        self.web3, self.headers = provider_pool.web3(network, self.proxy, fault_injector)
+        self.account = local_account(private_key)
         self.chain_id = network.chain_id
 
     async def get_nonce(self):
@@ -63,46 +76,68 @@ class EVMClient:
         to: str, 
         value: int = 0, 
         data: bytes = b'', 
-        gas: int = None
+        gas: int = None,
+        nonce: int = None
     ):
         try:
-            await asyncio.sleep(1)
-            
             tx_params = {
                 'from': self.account.address,
                 'to': to,
                 'value': value,
                 'data': data,
-                'nonce': await self.get_nonce(),
                 'chainId': self.chain_id,
                 'type': '0x2'
             }
 
-            estimated_gas = await self.web3.eth.estimate_gas(tx_params)
-            
-            latest_block = await self.web3.eth.get_block('latest')
+            # Запросы друг от друга не зависят (оценке газа nonce не нужен) и идут параллельно
+            nonce, estimated_gas, latest_block, max_priority_fee = await asyncio.gather(
+                self.get_nonce() if nonce is None else asyncio.sleep(0, nonce),
+                self.web3.eth.estimate_gas(tx_params) if gas is None else asyncio.sleep(0, gas),
+                self.web3.eth.get_block('latest'),
+                self.web3.eth.max_priority_fee
+            )
             base_fee = latest_block['baseFeePerGas']
 
-            max_priority_fee = await self.web3.eth.max_priority_fee
-
             tx = {
                 **tx_params,
+                'nonce': nonce,
                 'gas': estimated_gas,  
-                'maxFeePerGas': base_fee + max_priority_fee,
+                # Запас на рост base fee в следующих блоках; фактически списывается base fee блока + tip
+                'maxFeePerGas': int(base_fee * self.base_fee_multiplier) + max_priority_fee,
                 'maxPriorityFeePerGas': max_priority_fee
             }
 
             return tx
             
         except Exception as e:
-            print(f"Ошибка при построении транзакции: {e}")
+            logger.error(f"Ошибка при построении транзакции: {e}")
             raise
 
-    async def send_transaction(self, tx: dict) -> str:
-        signed_tx = self.web3.eth.account.sign_transaction(tx, private_key=self.private_key)
-        tx_hash = await self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        
+    async def sign_transaction(self, tx: dict) -> Tuple[bytes, str]:
+        """Подписанная транзакция и ее хеш: хеш известен до отправки в сеть"""
+        if self.signer is not None:
+            raw_transaction, tx_hash = await self.signer.sign_transaction(self.account.address, tx)
+        else:
+            signed = self.account.sign_transaction(tx)
+            raw_transaction, tx_hash = signed.rawTransaction, signed.hash
+        return raw_transaction, HexBytes(tx_hash).hex()
+
+
+    async def send_raw_transaction(self, raw_transaction: bytes) -> str:
+        tx_hash = await self.web3.eth.send_raw_transaction(raw_transaction)
         return tx_hash.hex()
+
+
+    async def send_transaction(self, tx: dict) -> str:
+        raw_transaction, _ = await self.sign_transaction(tx)
+        return await self.send_raw_transaction(raw_transaction)
+
+
+    async def sign_message(self, message: str) -> str:
+        if self.signer is not None:
+            return await self.signer.sign_message(self.account.address, message)
+        signed = self.account.sign_message(encode_defunct(text=message))
+        return signed.signature.hex()
     
     
     async def get_native_balance(self) -> TokenAmount:
@@ -1,6 +1,5 @@
-import json
-from pathlib import Path
 from web3 import Web3
+from .abi_cache import load_abi
 from .base_activity import BaseActivity
 
 
@@ -13,11 +12,4 @@ class ContractWrapper(BaseActivity):
 
 
     def _load_abi(self, abi_filename: str):
-        path = Path("evm/abis") / abi_filename
-        with path.open("r", encoding="utf-8") as file:
-            abi = json.load(file)
-            
-        for item in abi:
-            if item.get("inputs") is None:
-                item["inputs"] = []
-        return abi
+        return load_abi(abi_filename)
@@ -0,0 +1,154 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from eth_abi import decode
+from eth_utils import keccak, to_checksum_address
+from hexbytes import HexBytes
+from loguru import logger
+
+
+ZERO_TOPIC = HexBytes(b"\x00" * 32)
+
+
+class EventDecoder:
+    """Разбор одного события по сигнатуре: topic0 считается один раз, индексированные поля берутся из topics,
+    остальные декодируются из data"""
+
+    def __init__(self, name: str, inputs: List[Tuple[str, str, bool]]):
+        self.name = name
+        self.inputs = inputs
+        self.signature = f"{name}({','.join(abi_type for _, abi_type, _ in inputs)})"
+        self.topic = HexBytes(keccak(text=self.signature))
+        self.data_types = [abi_type for _, abi_type, indexed in inputs if not indexed]
+
+
+    def decode(self, log: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        topics = [HexBytes(topic) for topic in log["topics"]]
+        indexed_inputs = [(name, abi_type) for name, abi_type, indexed in self.inputs if indexed]
+        # Transfer ERC20 и ERC721 имеют одну сигнатуру и различаются только числом индексированных полей
+        if len(topics) != len(indexed_inputs) + 1:
+            return None
+
+        values = dict(zip([name for name, _, indexed in self.inputs if not indexed], decode(self.data_types, HexBytes(log["data"]))))
+        for (name, abi_type), topic in zip(indexed_inputs, topics[1:]):
+            values[name] = decode([abi_type], topic)[0]
+        return values
+
+
+TRANSFER = EventDecoder("Transfer", [("from", "address", True), ("to", "address", True), ("tokenId", "uint256", True)])
+IP_REGISTERED = EventDecoder("IPRegistered", [
+    ("ipId", "address", False),
+    ("chainId", "uint256", True),
+    ("tokenContract", "address", True),
+    ("tokenId", "uint256", True),
+    ("name", "string", False),
+    ("uri", "string", False),
+    ("registrationDate", "uint256", False)
+])
+# Разборщики по topic0: для лога выбирается без перебора сигнатур
+DECODERS: Dict[bytes, EventDecoder] = {decoder.topic: decoder for decoder in (TRANSFER, IP_REGISTERED)}
+
+
+@dataclass
+class MintEvent:
+    """Итог минта из логов: NFT (контракт, token id, владелец) и IP Asset, зарегистрированный на него"""
+    transaction_hash: str
+    block_number: int
+    nft_contract: str
+    token_id: int
+    owner: str
+    ip_id: Optional[str] = None
+
+
+def _hex(value: Any) -> str:
+    return "0x" + bytes(HexBytes(value)).hex()
+
+
+def address_topic(address: str) -> str:
+    return _hex(bytes(12) + bytes(HexBytes(address)))
+
+
+def decode_log(log: Dict[str, Any]) -> Optional[Tuple[EventDecoder, Dict[str, Any]]]:
+    if not log["topics"]:
+        return None
+    decoder = DECODERS.get(HexBytes(log["topics"][0]))
+    if decoder is None:
+        return None
+    values = decoder.decode(log)
+    return None if values is None else (decoder, values)
+
+
+def decode_mints(logs: Iterable[Dict[str, Any]], nft_contract: Optional[str] = None) -> Dict[str, MintEvent]:
+    """Минты NFT (Transfer с нулевого адреса) по хешу транзакции, дополненные ipId из IPRegistered"""
+    mints: Dict[str, MintEvent] = {}
+    ip_ids: Dict[Tuple[str, int], str] = {}
+
+    for log in logs:
+        decoded = decode_log(log)
+        if decoded is None:
+            continue
+        decoder, values = decoded
+
+        if decoder is TRANSFER:
+            contract = to_checksum_address(log["address"])
+            if int(values["from"], 16) != 0 or (nft_contract is not None and contract.lower() != nft_contract.lower()):
+                continue
+            tx_hash = _hex(log["transactionHash"])
+            mints[tx_hash] = MintEvent(
+                transaction_hash=tx_hash,
+                block_number=int(log["blockNumber"]),
+                nft_contract=contract,
+                token_id=values["tokenId"],
+                owner=to_checksum_address(values["to"])
+            )
+        else:
+            ip_ids[(values["tokenContract"].lower(), values["tokenId"])] = to_checksum_address(values["ipId"])
+
+    for mint in mints.values():
+        mint.ip_id = ip_ids.get((mint.nft_contract.lower(), mint.token_id))
+    return mints
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def fetch_mints(
+    web3: Any,
+    nft_contract: str,
+    wallets: Iterable[str],
+    from_block: int,
+    to_block: int,
+    block_chunk: int = 10_000,
+    wallets_per_request: int = 500
+) -> List[MintEvent]:
+    """Минты кошельков за диапазон блоков через eth_getLogs: получатели Transfer фильтруются узлом
+    (список адресов в topics), IPRegistered запрашиваются только для найденных token id"""
+    nft_contract = to_checksum_address(nft_contract)
+    wallet_topics = [address_topic(wallet) for wallet in dict.fromkeys(wallet.lower() for wallet in wallets)]
+    contract_topic = address_topic(nft_contract)
+    logs: List[Dict[str, Any]] = []
+
+    for start in range(from_block, to_block + 1, block_chunk):
+        end = min(start + block_chunk - 1, to_block)
+        transfers = []
+        for topics in _chunks(wallet_topics, wallets_per_request):
+            transfers += await web3.eth.get_logs({
+                "fromBlock": start,
+                "toBlock": end,
+                "address": nft_contract,
+                "topics": [_hex(TRANSFER.topic), _hex(ZERO_TOPIC), topics]
+            })
+
+        token_topics = [_hex(log["topics"][3]) for log in transfers if len(log["topics"]) == 4]
+        for token_ids in _chunks(token_topics, wallets_per_request):
+            logs += await web3.eth.get_logs({
+                "fromBlock": start,
+                "toBlock": end,
+                "topics": [_hex(IP_REGISTERED.topic), None, contract_topic, token_ids]
+            })
+        logs += transfers
+        logger.debug(f"Блоки {start}-{end}: минтов {len(transfers)}")
+
+    return sorted(decode_mints(logs, nft_contract).values(), key=lambda mint: mint.block_number)
@@ -0,0 +1,26 @@
+import time
+from typing import Any, Callable
+
+from observability.metrics import RPC_REQUESTS, RPC_LATENCY
+from observability.tracing import span
+
+
+async def metrics_middleware(make_request: Callable, w3: Any) -> Callable:
+    async def middleware(method: str, params: Any) -> Any:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await make_request(method, params)
+            outcome = "rpc_error" if "error" in response else "ok"
+            return response
+        finally:
+            RPC_LATENCY.observe(method, value=time.perf_counter() - started)
+            RPC_REQUESTS.inc(method, outcome)
+    return middleware
+
+
+async def tracing_middleware(make_request: Callable, w3: Any) -> Callable:
+    async def middleware(method: str, params: Any) -> Any:
+        with span(f"rpc {method}"):
+            return await make_request(method, params)
+    return middleware
@@ -1,9 +1,11 @@
+from .network import Network
 from .protocol import Protocol
 from .token import Token
 from .registry.protocols import MonadProtocols
 from .registry.tokens import MonadTokens
 
 __all__ = [
+    "Network",
     "Protocol",
     "Token",
     "MonadProtocols",
@@ -0,0 +1,21 @@
+from dataclasses import dataclass, field
+from typing import Optional, Union, Dict, Any, List
+
+@dataclass
+class Network:
+    name: str
+    chain_id: int
+    rpc_url: str
+    explorer_url: Optional[str] = None
+    token_symbol: str = "ETH"
+    token_name: str = "Ethereum"
+    token_decimals: int = 18
+    # Все RPC сети для чтения; rpc_url всегда первый в списке
+    rpc_urls: List[str] = field(default_factory=list)
+    # RPC для отправки транзакций; пустой список - те же, что для чтения
+    write_rpc_urls: List[str] = field(default_factory=list)
+    
+    def __post_init__(self):
+        if self.explorer_url and not self.explorer_url.endswith("/"):
+            self.explorer_url += "/"
+        self.rpc_urls = list(dict.fromkeys([self.rpc_url, *self.rpc_urls]))
@@ -1,30 +1,15 @@
-from typing import Dict
 from ..protocol import Protocol
 
 class MonadProtocols:
-    # APRIORI = Protocol(
-    #     address="0xb2f82D0f38dc453D596Ad40A37799446Cc89274A",
-    #     name="aPriori",
-    #     abi_filename="aPriori.json"
-    # )
-
-
-    
-    _by_address: Dict[str, Protocol] = {}
+    """Прежний API поиска протокола по адресу; протоколы задаются в evm/registry.json"""
 
     @classmethod
     def get_by_address(cls, address: str) -> Protocol:
         """Получает протокол по его адресу"""
-        if not cls._by_address:
-            for attr_name in dir(cls):
-                if attr_name.startswith('_'):
-                    continue
-                protocol = getattr(cls, attr_name)
-                if isinstance(protocol, Protocol):
-                    cls._by_address[protocol.address.lower()] = protocol
+        from evm.registry import registry
         
-        address = address.lower()
-        if address not in cls._by_address:
-            raise ValueError(f"Неизвестный протокол с адресом {address}")
+        protocol = registry.by_address(address)
+        if not isinstance(protocol, Protocol):
+            raise ValueError(f"Неизвестный протокол с адресом {address.lower()}")
         
-        return cls._by_address[address]
\ No newline at end of file
+        return protocol
@@ -1,41 +1,14 @@
-from typing import Dict
 from ..token import Token
 
 class MonadTokens:
-
-    # MON = Token(
-    #     address="0x0000000000000000000000000000000000000000",
-    #     name="Monad",
-    #     symbol="MON",
-    #     decimals=18,
-    #     is_native=True
-    # )
-
-    # WMON = Token(
-    #     address="0x760AfE86e5de5fa0Ee542fc7B7B713e1c5425701",
-    #     name="Wrapped Monad",
-    #     symbol="WMON",
-    #     decimals=18,
-    #     abi_filename="monad_wrap_eth.json"
-    # )
-
-
-
-    _by_address: Dict[str, Token] = {}
-
+    """Прежний API поиска токена по адресу; токены задаются в evm/registry.json"""
 
     @classmethod
     def get_by_address(cls, address: str) -> Token:
-        if not cls._by_address:
-            for attr_name in dir(cls):
-                if attr_name.startswith('_'):
-                    continue
-                token = getattr(cls, attr_name)
-                if isinstance(token, Token):
-                    cls._by_address[token.address.lower()] = token
+        from evm.registry import registry
         
-        address = address.lower()
-        if address not in cls._by_address:
-            raise ValueError(f"Неизвестный токен с адресом {address}")
+        token = registry.by_address(address)
+        if not isinstance(token, Token):
+            raise ValueError(f"Неизвестный токен с адресом {address.lower()}")
         
-        return cls._by_address[address]
\ No newline at end of file
+        return token
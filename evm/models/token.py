@@ -1,10 +1,10 @@
-import json
-from pathlib import Path
 from typing import Optional, Union
 from web3 import Web3
 from decimal import Decimal
 from web3.contract import Contract
 
+from evm.abi_cache import load_abi
+
 class TokenAmount:
     def __init__(self, amount: Union[int, float, str, Decimal], decimals: int = 18, wei: bool = False) -> None:
         if wei:
@@ -39,7 +39,8 @@ class Token:
         symbol: str,
         decimals: int,
         is_native: bool = False,
-        abi_filename: Optional[str] = None
+        abi_filename: Optional[str] = None,
+        chain_id: Optional[int] = None
     ):
         self.address = Web3.to_checksum_address(address)
         self.name = name
@@ -47,6 +48,7 @@ class Token:
         self.decimals = decimals
         self.is_native = is_native
         self.abi_filename = abi_filename
+        self.chain_id = chain_id
         self._abi = None
         self._contract: Optional[Contract] = None
 
@@ -54,18 +56,7 @@ class Token:
     @property
     def abi(self):
         if self._abi is None and self.abi_filename:
-            path = Path("evm/abis") / self.abi_filename
-            try:
-                with path.open("r", encoding="utf-8") as file:
-                    self._abi = json.load(file)
-                for item in self._abi:
-                    if item.get("inputs") is None:
-                        item["inputs"] = []
-                        
-            except FileNotFoundError:
-                raise FileNotFoundError(f"ABI файл не найден: {path}")
-            except json.JSONDecodeError:
-                raise ValueError(f"Ошибка парсинга ABI файла: {path}")
+            self._abi = load_abi(self.abi_filename)
         return self._abi
 
 
@@ -1,29 +1,16 @@
-from dataclasses import dataclass
-from typing import Optional, Union, Dict, Any
+from .models.network import Network
+from .registry import registry
 
-@dataclass
-class Network:
-    name: str
-    chain_id: int
-    rpc_url: str
-    explorer_url: Optional[str] = None
-    token_symbol: str = "ETH"
-    token_name: str = "Ethereum"
-    token_decimals: int = 18
-    
-    def __post_init__(self):
-        if self.explorer_url and not self.explorer_url.endswith("/"):
-            self.explorer_url += "/"
 
 class Networks:
+    """Сети реестра (evm/registry.json) по имени; новые сети добавляются в файл, а не сюда"""
+
+    STORY = registry.network("story")
+    
+    # Прежнее имя: сеть всегда была Story, а не Monad
+    MONAD = STORY
 
-    MONAD = Network(
-        name="Story",
-        chain_id=1514, 
-        rpc_url="https://evm-rpc.story.mainnet.dteam.tech",
-        explorer_url="https://explorer.story.foundation",
-        token_symbol="IP",
-        token_name="IP Token",
-        token_decimals=18
-    )
-    
\ No newline at end of file
+    @staticmethod
+    def get(key) -> Network:
+        """Сеть по chain id или имени"""
+        return registry.network(key)
@@ -0,0 +1,168 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+
+from web3.exceptions import TransactionNotFound
+
+from observability.metrics import TX_REPLACEMENTS
+
+
+class PendingTransaction:
+    """Отправленная транзакция и все ее замены с тем же nonce; в блок войдет только одна из них"""
+
+    def __init__(self, tx: Dict[str, Any], hashes: List[str], on_signed: Optional[Callable[[Dict[str, Any], str], None]] = None):
+        self.nonce: int = tx["nonce"]
+        self.tx = tx
+        self.hashes: List[str] = list(hashes)
+        # Вызывается для каждой подписанной транзакции (и замены) до ее отправки в сеть
+        self.on_signed = on_signed
+        # Блок, с которого отсчитывается ожидание; известен после первого опроса
+        self.sent_block: Optional[int] = None
+        self.bumps = 0
+
+
+    @property
+    def tx_hash(self) -> str:
+        return self.hashes[-1]
+
+
+class PendingTransactionManager:
+    """Следит за отправленными транзакциями кошелька по nonce. Если транзакция не вошла в блок
+    за stuck_blocks блоков, отправляет замену с тем же nonce и комиссиями выше на bump_percent
+    процентов (но не ниже текущих base fee и tip сети), не больше max_bumps раз"""
+
+    def __init__(self, client: Any, stuck_blocks: int = 3, bump_percent: float = 12.5, max_bumps: int = 5):
+        self.client = client
+        self.stuck_blocks = stuck_blocks
+        self.bump_percent = bump_percent
+        self.max_bumps = max_bumps
+        self.pending: Dict[int, PendingTransaction] = {}
+        self._nonces: Dict[str, int] = {}
+
+
+    async def _broadcast(self, tx: Dict[str, Any], on_signed: Optional[Callable[[Dict[str, Any], str], None]]) -> str:
+        raw_transaction, tx_hash = await self.client.sign_transaction(tx)
+        if on_signed is not None:
+            on_signed(tx, tx_hash)
+        return await self.client.send_raw_transaction(raw_transaction)
+
+
+    async def send(
+        self,
+        tx: Dict[str, Any],
+        on_signed: Optional[Callable[[Dict[str, Any], str], None]] = None
+    ) -> PendingTransaction:
+        tx_hash = await self._broadcast(tx, on_signed)
+        return self.adopt(tx, [tx_hash], on_signed)
+
+
+    def adopt(
+        self,
+        tx: Dict[str, Any],
+        hashes: List[str],
+        on_signed: Optional[Callable[[Dict[str, Any], str], None]] = None
+    ) -> PendingTransaction:
+        """Берет под наблюдение уже отправленную транзакцию, например из журнала после перезапуска:
+        ее можно заменить так же, как отправленную через send"""
+        previous = self.pending.get(tx["nonce"])
+        if previous is not None:
+            self._forget(previous)
+
+        pending = self.pending[tx["nonce"]] = PendingTransaction(tx, hashes, on_signed)
+        for tx_hash in pending.hashes:
+            self._nonces[tx_hash] = pending.nonce
+        return pending
+
+
+    def transaction(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """Последняя версия транзакции по хешу любой из ее замен, если она отправлена через менеджер"""
+        nonce = self._nonces.get(tx_hash)
+        pending = self.pending.get(nonce) if nonce is not None else None
+        return pending.tx if pending is not None else None
+
+
+    def _forget(self, pending: PendingTransaction) -> None:
+        self.pending.pop(pending.nonce, None)
+        for tx_hash in pending.hashes:
+            self._nonces.pop(tx_hash, None)
+
+
+    async def _receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await self.client.web3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+
+
+    async def _bump(self, pending: PendingTransaction, block: int) -> Optional[str]:
+        latest_block, network_tip = await asyncio.gather(
+            self.client.web3.eth.get_block('latest'),
+            self.client.web3.eth.max_priority_fee
+        )
+        multiplier = 1 + self.bump_percent / 100
+        priority_fee = max(int(pending.tx['maxPriorityFeePerGas'] * multiplier), network_tip)
+        max_fee = max(
+            int(pending.tx['maxFeePerGas'] * multiplier),
+            int(latest_block['baseFeePerGas'] * self.client.base_fee_multiplier) + priority_fee
+        )
+        tx = dict(pending.tx, maxFeePerGas=max_fee, maxPriorityFeePerGas=priority_fee)
+
+        # Следующая попытка не раньше чем через stuck_blocks блоков, даже если эта не удалась
+        pending.sent_block = block
+        try:
+            tx_hash = await self._broadcast(tx, pending.on_signed)
+        except ValueError as e:
+            # Например, nonce too low: одна из транзакций уже в блоке, квитанция найдется при следующем опросе
+            logger.warning(f"Замена транзакции с nonce {pending.nonce} не принята: {e}")
+            TX_REPLACEMENTS.inc("rejected")
+            return None
+
+        pending.tx = tx
+        pending.hashes.append(tx_hash)
+        pending.bumps += 1
+        self._nonces[tx_hash] = pending.nonce
+        TX_REPLACEMENTS.inc("sent")
+        logger.warning(
+            f"Транзакция с nonce {pending.nonce} не вошла в блок за {self.stuck_blocks} бл., "
+            f"замена {pending.bumps}/{self.max_bumps}: {tx_hash} (max fee {max_fee}, tip {priority_fee})"
+        )
+        return tx_hash
+
+
+    async def wait_for_receipt(
+        self,
+        tx_hash: str,
+        timeout: float = 300,
+        poll_interval: float = 5,
+        on_replaced: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        """Ждет квитанцию транзакции или любой из ее замен. Транзакции, отправленные не через
+        менеджер (например, восстановленные из чекпоинта), только ожидаются, без замен"""
+        nonce = self._nonces.get(tx_hash)
+        pending = self.pending.get(nonce) if nonce is not None else None
+        hashes = pending.hashes if pending is not None else [tx_hash]
+        start_time = asyncio.get_event_loop().time()
+
+        while asyncio.get_event_loop().time() - start_time < timeout:
+            receipts = await asyncio.gather(*(self._receipt(candidate) for candidate in hashes))
+            for candidate, receipt in zip(hashes, receipts):
+                if receipt is None:
+                    continue
+                if candidate != tx_hash:
+                    logger.info(f"В блок вошла замена транзакции {tx_hash}: {candidate}")
+                if pending is not None:
+                    self._forget(pending)
+                return receipt
+
+            if pending is not None and pending.bumps < self.max_bumps:
+                block = await self.client.web3.eth.block_number
+                if pending.sent_block is None:
+                    pending.sent_block = block
+                elif block - pending.sent_block >= self.stuck_blocks:
+                    replacement = await self._bump(pending, block)
+                    if replacement is not None and on_replaced is not None:
+                        on_replaced(replacement)
+
+            await asyncio.sleep(poll_interval)
+
+        raise TimeoutError(f"Превышено время ожидания квитанции транзакции: {tx_hash}")
@@ -0,0 +1,250 @@
+import re
+import time
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+import aiohttp
+from web3 import AsyncWeb3, AsyncHTTPProvider
+from web3.types import RPCEndpoint, RPCResponse
+from eth_utils import keccak
+from hexbytes import HexBytes
+from fake_useragent import UserAgent
+from loguru import logger
+
+from .networks import Network
+from .rpc_router import RpcRouter, EndpointState, WRITE_METHODS, FAILOVER_ERROR_CODES
+from .middleware import metrics_middleware, tracing_middleware
+from observability.metrics import RETRIES, RPC_ENDPOINT_REQUESTS
+
+
+# Ответ узла, к которому транзакция уже пришла (от другого RPC или в прошлой попытке): geth, erigon, nethermind
+ALREADY_KNOWN = re.compile(r"already known|known transaction|already imported|alreadyknown", re.IGNORECASE)
+
+_user_agents: Optional[UserAgent] = None
+_user_agents_lock = threading.Lock()
+
+
+def random_user_agent() -> str:
+    """Случайный User-Agent Chrome; база fake_useragent загружается один раз на процесс"""
+    global _user_agents
+    if _user_agents is None:
+        with _user_agents_lock:
+            if _user_agents is None:
+                _user_agents = UserAgent()
+    return _user_agents.chrome
+
+
+class PooledHTTPProvider(AsyncHTTPProvider):
+    """HTTP провайдер, который шлет запросы через общую сессию пула вместо кэша сессий web3.
+    RPC для каждого запроса выбирает роутер; при сетевой ошибке или сбое узла запрос уходит на следующий"""
+
+    def __init__(
+        self,
+        pool: "ProviderPool",
+        router: RpcRouter,
+        request_kwargs: Dict[str, Any],
+        fault_injector: Any = None
+    ):
+        super().__init__(endpoint_uri=router.read[0].url, request_kwargs=request_kwargs)
+        self.pool = pool
+        self.router = router
+        self.fault_injector = fault_injector
+
+
+    async def _send(self, session: aiohttp.ClientSession, endpoint: EndpointState, request_data: bytes) -> RPCResponse:
+        async with session.post(endpoint.url, data=request_data, **self.get_request_kwargs()) as response:
+            response.raise_for_status()
+            return self.decode_rpc_response(await response.read())
+
+
+    async def _post(
+        self,
+        session: aiohttp.ClientSession,
+        endpoint: EndpointState,
+        request_data: bytes,
+        method: str = "eth_blockNumber",
+        params: Any = ()
+    ) -> RPCResponse:
+        request = self._send(session, endpoint, request_data)
+        if self.fault_injector is not None:
+            # Сбои вносятся на каждый запрос к конкретному RPC, поэтому роутер видит их и переключает узел
+            return await self.fault_injector.rpc(request, method, params, self.pool.timeout)
+        return await request
+
+
+    async def _probe(self, session: aiohttp.ClientSession) -> None:
+        request_data = self.encode_rpc_request(RPCEndpoint("eth_blockNumber"), [])
+
+        async def probe(endpoint: EndpointState) -> None:
+            started = time.perf_counter()
+            try:
+                response = await self._post(session, endpoint, request_data)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError):
+                self.router.record_failure(endpoint, time.perf_counter() - started)
+                return
+            self.router.record_success(endpoint, time.perf_counter() - started, "eth_blockNumber", response.get("result"))
+
+        await asyncio.gather(*(probe(endpoint) for endpoint in self.router.endpoints.values()))
+        logger.debug(f"Состояние RPC: {self.router.stats()}")
+
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        session = await self.pool.session()
+        if self.router.probe_due():
+            self.pool.spawn(self._probe(session))
+
+        candidates = self.router.candidates(method)
+        last_error: Optional[Exception] = None
+        last_response: Optional[RPCResponse] = None
+        for attempt, endpoint in enumerate(candidates):
+            if attempt:
+                RETRIES.inc("rpc", "failover")
+            started = time.perf_counter()
+            try:
+                response = await self._post(session, endpoint, request_data, method, params)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError, ValueError) as e:
+                self.router.record_failure(endpoint, time.perf_counter() - started)
+                RPC_ENDPOINT_REQUESTS.inc(endpoint.label, "error")
+                last_error = e
+                continue
+
+            error = response.get("error")
+            if isinstance(error, dict) and error.get("code") in FAILOVER_ERROR_CODES:
+                self.router.record_failure(endpoint, time.perf_counter() - started)
+                RPC_ENDPOINT_REQUESTS.inc(endpoint.label, "node_error")
+                last_response = response
+                continue
+
+            if attempt and method in WRITE_METHODS and isinstance(error, dict) \
+                    and ALREADY_KNOWN.search(str(error.get("message", ""))):
+                # Предыдущий узел успел принять транзакцию до сбоя: для отправителя это успех
+                response = {"jsonrpc": "2.0", "id": response.get("id"), "result": "0x" + keccak(HexBytes(params[0])).hex()}
+
+            self.router.record_success(endpoint, time.perf_counter() - started, method, response.get("result"))
+            RPC_ENDPOINT_REQUESTS.inc(endpoint.label, "ok")
+            return response
+
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+
+class ProviderPool:
+    """Общие AsyncWeb3 по ключу (RPC сети, прокси) и одна aiohttp сессия на каждый event loop.
+    Тысячи кошельков с одним прокси используют один провайдер и одни keep-alive соединения,
+    а состояние RPC (задержки, ошибки, высота) общее для всех кошельков сети"""
+
+    def __init__(self):
+        self.configure()
+        self._lock = threading.Lock()
+        self._web3: Dict[Tuple[Any, ...], Tuple[AsyncWeb3, Dict[str, str]]] = {}
+        self._routers: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], RpcRouter] = {}
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._background: Set[asyncio.Task] = set()
+
+
+    def configure(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30,
+        timeout: float = 30,
+        max_block_lag: int = 3,
+        probe_interval: float = 15,
+        failure_cooldown: float = 30
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.router_settings = {
+            "max_block_lag": max_block_lag,
+            "probe_interval": probe_interval,
+            "failure_cooldown": failure_cooldown
+        }
+
+
+    def router(self, network: Network) -> RpcRouter:
+        key = (tuple(network.rpc_urls), tuple(network.write_rpc_urls))
+        with self._lock:
+            router = self._routers.get(key)
+            if router is None:
+                router = self._routers[key] = RpcRouter(network.rpc_urls, network.write_rpc_urls, **self.router_settings)
+            return router
+
+
+    def web3(self, network: Network, proxy: Optional[str] = None, fault_injector: Any = None) -> Tuple[AsyncWeb3, Dict[str, str]]:
+        """AsyncWeb3 и заголовки для ключа; при первом обращении создаются провайдер и middleware"""
+        router = self.router(network)
+        key = (id(router), proxy, fault_injector)
+        with self._lock:
+            entry = self._web3.get(key)
+            if entry is not None:
+                return entry
+
+            headers = {
+                'accept': '*/*',
+                'accept-language': 'en-US,en;q=0.9',
+                'content-type': 'application/json',
+                'user-agent': random_user_agent()
+            }
+            provider = PooledHTTPProvider(self, router, {
+                'proxy': proxy,
+                'headers': headers,
+                'timeout': aiohttp.ClientTimeout(total=self.timeout)
+            }, fault_injector)
+            web3 = AsyncWeb3(provider)
+            web3.middleware_onion.add(metrics_middleware, "metrics")
+            web3.middleware_onion.add(tracing_middleware, "tracing")
+
+            entry = self._web3[key] = (web3, headers)
+            return entry
+
+
+    async def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.get(loop)
+            if session is not None and not session.closed:
+                return session
+
+            # Сессии завершившихся event loop (режим потоков) выбрасываются при создании новой
+            for stale_loop in [stale for stale in self._sessions if stale.is_closed()]:
+                del self._sessions[stale_loop]
+
+            session = self._sessions[loop] = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=300
+                )
+            )
+            logger.debug("Создана общая RPC сессия")
+            return session
+
+
+    def spawn(self, coro) -> None:
+        """Фоновая задача пула (опрос высоты RPC); ссылка хранится, пока задача не завершится"""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+    async def close_loop_sessions(self) -> None:
+        """Закрывает сессии текущего event loop; вызывается перед его завершением"""
+        loop = asyncio.get_running_loop()
+        pending = [task for task in self._background if task.get_loop() is loop]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        with self._lock:
+            session = self._sessions.pop(loop, None)
+        if session is not None:
+            await session.close()
+
+
+provider_pool = ProviderPool()
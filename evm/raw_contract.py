@@ -1,7 +1,7 @@
-import json
-from pathlib import Path
 from web3 import Web3
 
+from .abi_cache import load_abi
+
 class RawContract:
     def __init__(self, name: str, address: str, abi_filename: str = None):
         self.name = name
@@ -16,16 +16,5 @@ class RawContract:
         return self._abi
 
     def _load_abi(self):
-        path = Path("evm/abis") / self.abi_filename
-        try:
-            with path.open("r", encoding="utf-8") as file:
-                abi = json.load(file)
-            for item in abi:
-                if item.get("inputs") is None:
-                    item["inputs"] = []
-            return abi
-        except FileNotFoundError:
-            raise FileNotFoundError(f"ABI файл не найден: {path}")
-        except json.JSONDecodeError:
-            raise ValueError(f"Ошибка парсинга ABI файла: {path}")
+        return load_abi(self.abi_filename)
         
\ No newline at end of file
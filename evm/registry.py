@@ -0,0 +1,133 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from evm.models.network import Network
+from evm.models.protocol import Protocol
+from evm.models.token import Token
+
+
+REGISTRY_FILE = Path(__file__).parent / "registry.json"
+
+
+class Registry:
+    """Сети, токены и протоколы из файлов данных. Индексы (сеть по chain id и имени, токен по адресу и символу,
+    протокол по имени и адресу в пределах сети) строятся при загрузке, поиск - одно обращение к словарю.
+    Новая сеть или токен добавляются в файл без изменений кода"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._networks: Dict[int, Network] = {}
+        self._network_names: Dict[str, int] = {}
+        self._tokens: Dict[Tuple[int, str], Token] = {}
+        self._token_symbols: Dict[Tuple[int, str], Token] = {}
+        self._chain_tokens: Dict[int, List[Token]] = {}
+        self._protocols: Dict[Tuple[int, str], Protocol] = {}
+        # Адрес без сети: для старого API (get_by_address) и адресов, одинаковых во всех сетях
+        self._any_chain: Dict[str, Union[Token, Protocol]] = {}
+
+
+    def load(self, path: Union[str, Path]) -> "Registry":
+        """Добавляет записи файла. Сеть с тем же chain id, токен или протокол с тем же адресом в той же сети заменяют прежние"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        with self._lock:
+            for entry in data.get("networks", []):
+                entry = dict(entry)
+                aliases = entry.pop("aliases", [])
+                self._add_network(Network(**entry), aliases)
+            for entry in data.get("tokens", []):
+                self._add_token(Token(**entry))
+            for entry in data.get("protocols", []):
+                self._add_protocol(Protocol(**entry))
+        return self
+
+
+    def _add_network(self, network: Network, aliases: List[str]) -> None:
+        self._networks[network.chain_id] = network
+        for name in [network.name, *aliases]:
+            self._network_names[name.lower()] = network.chain_id
+
+
+    def _add_token(self, token: Token) -> None:
+        previous = self._tokens.get((token.chain_id, token.address.lower()))
+        if previous is not None:
+            self._chain_tokens[token.chain_id].remove(previous)
+        self._tokens[(token.chain_id, token.address.lower())] = token
+        self._token_symbols[(token.chain_id, token.symbol.upper())] = token
+        self._chain_tokens.setdefault(token.chain_id, []).append(token)
+        self._index_address(token)
+
+
+    def _add_protocol(self, protocol: Protocol) -> None:
+        self._protocols[(protocol.chain_id, protocol.name.lower())] = protocol
+        self._protocols[(protocol.chain_id, protocol.address.lower())] = protocol
+        self._index_address(protocol)
+
+
+    def _index_address(self, entry: Union[Token, Protocol]) -> None:
+        # Адрес, уже занятый записью другой сети, остается за ней
+        current = self._any_chain.get(entry.address.lower())
+        if current is None or current.chain_id == entry.chain_id:
+            self._any_chain[entry.address.lower()] = entry
+
+
+    def network(self, key: Union[int, str]) -> Network:
+        """Сеть по chain id или имени (без учета регистра)"""
+        if isinstance(key, str) and key.isdigit():
+            key = int(key)
+        chain_id = key if isinstance(key, int) else self._network_names.get(key.lower())
+        network = self._networks.get(chain_id)
+        if network is None:
+            raise ValueError(f"Неизвестная сеть {key}")
+        return network
+
+
+    @property
+    def networks(self) -> List[Network]:
+        return list(self._networks.values())
+
+
+    def _chain_id(self, chain: Union[int, str, Network]) -> int:
+        return chain.chain_id if isinstance(chain, Network) else self.network(chain).chain_id
+
+
+    def token(self, chain: Union[int, str, Network], address_or_symbol: str) -> Token:
+        """Токен сети по адресу или символу"""
+        chain_id = self._chain_id(chain)
+        token = (
+            self._tokens.get((chain_id, address_or_symbol.lower()))
+            or self._token_symbols.get((chain_id, address_or_symbol.upper()))
+        )
+        if token is None:
+            raise ValueError(f"Неизвестный токен {address_or_symbol} в сети {chain_id}")
+        return token
+
+
+    def tokens(self, chain: Union[int, str, Network]) -> List[Token]:
+        return list(self._chain_tokens.get(self._chain_id(chain), []))
+
+
+    def protocol(self, chain: Union[int, str, Network], name_or_address: str) -> Protocol:
+        """Протокол сети по имени или адресу"""
+        protocol = self._protocols.get((self._chain_id(chain), name_or_address.lower()))
+        if protocol is None:
+            raise ValueError(f"Неизвестный протокол {name_or_address} в сети {chain}")
+        return protocol
+
+
+    def by_address(self, address: str) -> Optional[Union[Token, Protocol]]:
+        """Токен или протокол по адресу в любой сети"""
+        return self._any_chain.get(address.lower())
+
+
+    def web3(self, chain: Union[int, str, Network], proxy: Optional[str] = None, fault_injector: Any = None):
+        """AsyncWeb3 и заголовки сети из общего пула: у каждой сети свой роутер RPC, свои провайдеры и соединения"""
+        from evm.provider_pool import provider_pool
+        network = chain if isinstance(chain, Network) else self.network(chain)
+        return provider_pool.web3(network, proxy, fault_injector)
+
+
+registry = Registry().load(REGISTRY_FILE)
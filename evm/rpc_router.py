@@ -0,0 +1,118 @@
+import time
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+
+WRITE_METHODS = {"eth_sendRawTransaction", "eth_sendTransaction"}
+# Ошибки узла, а не запроса: лимит запросов и внутренняя ошибка. Такой запрос повторяется на другом RPC
+FAILOVER_ERROR_CODES = {-32005, -32603}
+
+
+class EndpointState:
+    """Скользящие задержка и доля ошибок RPC, последний известный номер блока и время остывания после сбоя"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.label = urlsplit(url).netloc or url
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.head: Optional[int] = None
+        self.cooldown_until = 0.0
+
+
+    def __repr__(self) -> str:
+        return f"<{self.label} latency={self.latency} errors={self.error_rate:.2f} head={self.head}>"
+
+
+class RpcRouter:
+    """Выбирает RPC для каждого запроса: чтение - самый быстрый узел, не отставший от сети больше
+    чем на max_block_lag блоков; запись - только узлы из write_urls. Узлы после сбоя остывают
+    failure_cooldown секунд и пробуются последними"""
+
+    def __init__(
+        self,
+        read_urls: List[str],
+        write_urls: Optional[List[str]] = None,
+        max_block_lag: int = 3,
+        probe_interval: float = 15,
+        failure_cooldown: float = 30,
+        ewma_alpha: float = 0.2
+    ):
+        self.endpoints: Dict[str, EndpointState] = {}
+        for url in [*read_urls, *(write_urls or [])]:
+            self.endpoints.setdefault(url, EndpointState(url))
+        self.read = [self.endpoints[url] for url in read_urls]
+        self.write = [self.endpoints[url] for url in (write_urls or read_urls)]
+        self.max_block_lag = max_block_lag
+        self.probe_interval = probe_interval
+        self.failure_cooldown = failure_cooldown
+        self.ewma_alpha = ewma_alpha
+        self._last_probe = 0.0
+        self._lock = threading.Lock()
+
+
+    def candidates(self, method: str) -> List[EndpointState]:
+        """Узлы в порядке попыток: сначала не остывающие и синхронные, среди них - по задержке с учетом ошибок"""
+        endpoints = self.write if method in WRITE_METHODS else self.read
+        if len(endpoints) == 1:
+            return endpoints
+
+        now = time.time()
+        heads = [endpoint.head for endpoint in endpoints if endpoint.head is not None]
+        best_head = max(heads) if heads else None
+
+        def rank(endpoint: EndpointState):
+            lagging = best_head is not None and endpoint.head is not None and best_head - endpoint.head > self.max_block_lag
+            # Узел без замеров пробуется сразу, чтобы получить по нему задержку
+            latency = endpoint.latency if endpoint.latency is not None else 0.0
+            return (endpoint.cooldown_until > now, lagging, latency * (1 + 4 * endpoint.error_rate))
+
+        return sorted(endpoints, key=rank)
+
+
+    def _observe(self, endpoint: EndpointState, latency: float, failed: bool) -> None:
+        alpha = self.ewma_alpha
+        endpoint.latency = latency if endpoint.latency is None else endpoint.latency + alpha * (latency - endpoint.latency)
+        endpoint.error_rate += alpha * ((1.0 if failed else 0.0) - endpoint.error_rate)
+
+
+    def record_success(self, endpoint: EndpointState, latency: float, method: str, result: Any = None) -> None:
+        self._observe(endpoint, latency, failed=False)
+        if method == "eth_blockNumber" and isinstance(result, str):
+            self.observe_head(endpoint, int(result, 16))
+
+
+    def record_failure(self, endpoint: EndpointState, latency: float) -> None:
+        self._observe(endpoint, latency, failed=True)
+        endpoint.cooldown_until = time.time() + self.failure_cooldown
+
+
+    def observe_head(self, endpoint: EndpointState, head: int) -> None:
+        if endpoint.head is None or head > endpoint.head:
+            endpoint.head = head
+
+
+    def probe_due(self) -> bool:
+        """Пора ли опросить высоту всех узлов; при одном узле отставать не от кого"""
+        if len(self.endpoints) < 2:
+            return False
+        with self._lock:
+            now = time.time()
+            if now - self._last_probe < self.probe_interval:
+                return False
+            self._last_probe = now
+            return True
+
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "endpoint": endpoint.label,
+                "latency": endpoint.latency,
+                "error_rate": endpoint.error_rate,
+                "head": endpoint.head,
+                "cooling": endpoint.cooldown_until > time.time()
+            }
+            for endpoint in self.endpoints.values()
+        ]
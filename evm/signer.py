@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+from loguru import logger
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+
+# Ключи процесса подписи по адресу в нижнем регистре; передаются один раз при запуске процесса
+_keys: Dict[str, str] = {}
+_accounts: Dict[str, Any] = {}
+
+
+def _init_worker(keys: Dict[str, str]) -> None:
+    _keys.update(keys)
+
+
+def _account(address: str) -> Any:
+    # Открытый ключ выводится при первой подписи адреса, а не для всех ключей при запуске
+    account = _accounts.get(address)
+    if account is None:
+        account = _accounts[address] = Account.from_key(_keys[address])
+    return account
+
+
+def _sign_batch(kind: str, requests: List[Tuple[str, Any]]) -> List[Tuple[bool, Any]]:
+    """Подписывает пачку запросов; ошибка одного запроса не роняет остальные"""
+    results = []
+    for address, payload in requests:
+        try:
+            account = _account(address.lower())
+            if kind == "transaction":
+                signed = account.sign_transaction(payload)
+                results.append((True, (bytes(signed.rawTransaction), bytes(signed.hash))))
+            else:
+                signed = account.sign_message(encode_defunct(text=payload))
+                results.append((True, signed.signature.hex()))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+class SigningService:
+    """Подпись транзакций и сообщений в пуле процессов: ECDSA и keccak на чистом Python не блокируют event loop.
+    Ключи (адрес -> приватный ключ) передаются процессам один раз при запуске, запросы ссылаются на адрес. Запросы, пришедшие
+    за одну итерацию event loop, уходят в процесс одной пачкой (не больше max_batch)"""
+
+    def __init__(self, keys: Dict[str, str], processes: int = 2, max_batch: int = 64):
+        keys = {address.lower(): private_key for address, private_key in keys.items()}
+        self.max_batch = max_batch
+        self._executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(keys,)
+        )
+        self._lock = threading.Lock()
+        # Очереди запросов по (event loop, вид): в режиме потоков у каждого аккаунта свой loop
+        self._queues: Dict[Tuple[asyncio.AbstractEventLoop, str], List[Tuple[str, Any, asyncio.Future]]] = {}
+        logger.info(f"Запущен пул подписи: {processes} проц., {len(keys)} ключей")
+
+
+    def submit(self, kind: str, address: str, payload: Any) -> asyncio.Future:
+        """Ставит запрос в очередь текущего event loop и возвращает future с результатом"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (loop, kind)
+        with self._lock:
+            queue = self._queues.setdefault(key, [])
+            queue.append((address, payload, future))
+            first = len(queue) == 1
+        if first:
+            loop.call_soon(self._flush, key)
+        return future
+
+
+    def _flush(self, key: Tuple[asyncio.AbstractEventLoop, str]) -> None:
+        loop, kind = key
+        with self._lock:
+            queue = self._queues.pop(key, [])
+        for start in range(0, len(queue), self.max_batch):
+            batch = queue[start:start + self.max_batch]
+            task = loop.run_in_executor(self._executor, _sign_batch, kind, [(address, payload) for address, payload, _ in batch])
+            task.add_done_callback(lambda done, batch=batch: self._resolve(batch, done))
+
+
+    @staticmethod
+    def _resolve(batch: List[Tuple[str, Any, asyncio.Future]], done: asyncio.Future) -> None:
+        if done.cancelled():
+            for _, _, future in batch:
+                future.cancel()
+            return
+        error = done.exception()
+        results = done.result() if error is None else [(False, error)] * len(batch)
+        for (_, _, future), (ok, value) in zip(batch, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+    def sign_transaction(self, address: str, tx: Dict[str, Any]) -> asyncio.Future:
+        """Future с (raw_transaction, hash)"""
+        return self.submit("transaction", address, tx)
+
+
+    def sign_message(self, address: str, message: str) -> asyncio.Future:
+        """Future с подписью сообщения (hex)"""
+        return self.submit("message", address, message)
+
+
+    async def sign_transactions(self, requests: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[bytes, bytes]]:
+        return await asyncio.gather(*(self.sign_transaction(address, tx) for address, tx in requests))
+
+
+    async def sign_messages(self, requests: List[Tuple[str, str]]) -> List[str]:
+        return await asyncio.gather(*(self.sign_message(address, message) for address, message in requests))
+
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
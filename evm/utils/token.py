@@ -1,9 +1,9 @@
-import json
-from pathlib import Path
 from typing import Optional
 from web3 import Web3
 from web3.contract import Contract
 
+from evm.abi_cache import load_abi
+
 class Token:
     def __init__(
         self,
@@ -27,18 +27,7 @@ class Token:
     @property
     def abi(self):
         if self._abi is None and self.abi_filename:
-            path = Path("evm/abis") / self.abi_filename
-            try:
-                with path.open("r", encoding="utf-8") as file:
-                    self._abi = json.load(file)
-                    
-                for item in self._abi:
-                    if item.get("inputs") is None:
-                        item["inputs"] = []
-            except FileNotFoundError:
-                raise FileNotFoundError(f"ABI файл не найден: {path}")
-            except json.JSONDecodeError:
-                raise ValueError(f"Ошибка парсинга ABI файла: {path}")
+            self._abi = load_abi(self.abi_filename)
         return self._abi
 
 
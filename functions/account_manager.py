@@ -1,21 +1,40 @@
+import os
 import threading
 import signal
 import sys
 import time
+import uuid
 import random
 import asyncio
-from typing import Dict, List, Any, Optional, Tuple
+import dataclasses
+from typing import Dict, List, Any, Optional, Tuple, Callable, Coroutine, Set
 from loguru import logger
 
 from tls_client.client import TLSClient
-from evm.client import EVMClient
-from evm.networks import Networks
+from tls_client.cassette import Cassette
+from evm.client import EVMClient, local_account
+from evm.registry import registry as chain_registry
+from evm.provider_pool import provider_pool
+from evm.signer import SigningService
 from tasks.authenticator import Authenticator
 from tasks.image_generator import ImageGenerator
 from tasks.publisher import Publisher
 from tasks.blockchain import BlockchainManager
-from tasks.mahojin_task import MahojinTask
+from tasks.mahojin_task import MahojinTask, GENERATION_COST_POINTS
+from tasks.checkpoint import CheckpointStore, RunStage
+from tasks.endpoints import Endpoints
 from tasks.promts import get_diverse_prompts
+from functions.pipeline import StagePipeline, PipelineJob
+from functions.supervisor import Supervisor
+from functions.lease_store import LeaseStore, wallet_key, default_node_id
+from functions.points_tracker import PointsTracker
+from functions.results_store import ResultsStore
+from functions.mint_journal import MintJournal, MintStatus, reconcile
+from functions.spend_ledger import SpendLedger, GasBudget
+from functions.fault_injector import FaultInjector
+from observability.metrics import registry, start_metrics_server, active_stages
+from functions.dashboard import Dashboard, FleetState, NO_POINTS, OVER_BUDGET
+from observability import tracing
 
 
 class AccountManager:
@@ -25,28 +44,156 @@ class AccountManager:
         self.accounts = config_manager.accounts
         self.config = config_manager.config
         self.shutdown_event = threading.Event()
+        self.running = False
+        self.drain_timeout = self.config.get("drain_timeout_seconds", 300)
         self.threads = []
         self.next_runs = {}
         self.next_runs_lock = threading.Lock()
+        self.checkpoint_store = CheckpointStore(os.path.join(config_manager.files_dir, "checkpoints"))
+        self.pipeline_config = self.config.get("pipeline", {})
+        self.coordinator_config = self.config.get("coordinator", {})
+        self.admission_config = self.config.get("admission", {})
+        self.points_tracker = PointsTracker(
+            os.path.join(config_manager.files_dir, "points"),
+            required_points=self.admission_config.get("required_points", GENERATION_COST_POINTS)
+        )
+        # Адреса выведены при загрузке аккаунтов (ConfigManager), здесь только индекс ключ -> адрес
+        self._addresses: Dict[str, str] = {
+            self._parse_account(account)[0]: account["address"] for account in self.accounts if account.get("address")
+        }
+        
+        registry_config = self.config.get("registry", {})
+        for path in registry_config.get("files", []):
+            # Дополнительные сети, токены и протоколы поверх evm/registry.json
+            chain_registry.load(path if os.path.isabs(path) else os.path.join(config_manager.files_dir, path))
+        
+        endpoints_config = self.config.get("endpoints", {})
+        Endpoints.configure(endpoints_config.get("mahojin_url"), endpoints_config.get("dynamic_auth_url"))
+        self.network = chain_registry.network(endpoints_config.get("chain", "story"))
+        if endpoints_config.get("rpc_url") or endpoints_config.get("rpc_urls"):
+            # Список из конфига заменяет RPC сети целиком, а не дополняет их
+            rpc_urls = [url for url in [endpoints_config.get("rpc_url"), *(endpoints_config.get("rpc_urls") or [])] if url]
+            self.network = dataclasses.replace(
+                self.network,
+                rpc_url=rpc_urls[0],
+                rpc_urls=rpc_urls,
+                write_rpc_urls=endpoints_config.get("write_rpc_urls") or []
+            )
+        
+        results_config = self.config.get("results", {})
+        self.results_store: Optional[ResultsStore] = None
+        if results_config.get("enabled", True):
+            self.results_store = ResultsStore(
+                results_config.get("db_path") or os.path.join(config_manager.files_dir, "results.db"),
+                batch_size=results_config.get("batch_size", 100),
+                flush_interval=results_config.get("flush_interval_seconds", 5)
+            )
+        
+        mint_journal_config = self.config.get("mint_journal", {})
+        self.mint_journal: Optional[MintJournal] = None
+        if mint_journal_config.get("enabled", True):
+            self.mint_journal = MintJournal(
+                mint_journal_config.get("db_path") or os.path.join(config_manager.files_dir, "mint_journal.db")
+            )
+        
+        spend_config = self.config.get("spend", {})
+        self.spend_ledger: Optional[SpendLedger] = None
+        self.gas_budget: Optional[GasBudget] = None
+        if spend_config.get("enabled", True):
+            self.spend_ledger = SpendLedger(spend_config.get("db_path") or os.path.join(config_manager.files_dir, "spend.db"))
+            self.gas_budget = GasBudget.from_config(self.spend_ledger, spend_config)
+        
+        cassette_config = self.config.get("cassette", {})
+        self.cassette: Optional[Cassette] = None
+        if cassette_config.get("mode"):
+            self.cassette = Cassette(
+                cassette_config.get("path") or os.path.join(config_manager.files_dir, "cassettes", "default"),
+                mode=cassette_config["mode"],
+                latency_scale=cassette_config.get("latency_scale", 1.0)
+            )
+        
+        rpc_pool_config = self.config.get("rpc_pool", {})
+        rpc_router_config = self.config.get("rpc_router", {})
+        provider_pool.configure(
+            limit=rpc_pool_config.get("connections", 100),
+            limit_per_host=rpc_pool_config.get("connections_per_host", 0),
+            keepalive_timeout=rpc_pool_config.get("keepalive_seconds", 30),
+            timeout=rpc_pool_config.get("timeout_seconds", 30),
+            max_block_lag=rpc_router_config.get("max_block_lag", 3),
+            probe_interval=rpc_router_config.get("probe_interval_seconds", 15),
+            failure_cooldown=rpc_router_config.get("failure_cooldown_seconds", 30)
+        )
+        
+        self.fault_injector = FaultInjector.from_config(self.config.get("faults", {}))
+        self.http_retry_config = self.config.get("http_retry", {})
+        self.gas_config = self.config.get("gas", {})
+        self.signer_config = self.config.get("signer", {})
+        self._signer: Optional[SigningService] = None
+        self._signer_lock = threading.Lock()
+        # Список аккаунтов и ключи, с которыми запущен пул подписи
+        self._signer_accounts: Optional[List[Dict[str, str]]] = None
+        self._signer_keys: Dict[str, str] = {}
         
-        signal.signal(signal.SIGINT, self.signal_handler)
+        self.dashboard_config = self.config.get("dashboard", {})
+        self.dashboard_enabled = self.dashboard_config.get("enabled", True) and sys.stdout.isatty()
+        self.fleet = FleetState()
+        
+        logging_config = self.config.get("logging", {})
+        # В структурированном режиме и при включенной панели цветной вывод каждого события только мешает
+        self.console_events = (
+            logging_config.get("console_events", not logging_config.get("structured", False))
+            and not self.dashboard_enabled
+        )
+        
+        tracing_config = self.config.get("tracing", {})
+        tracing.configure(
+            enabled=tracing_config.get("enabled", False),
+            sample_rate=tracing_config.get("sample_rate", 0.05),
+            output_dir=os.path.join(config_manager.files_dir, "traces")
+        )
+        self.pipeline: Optional[StagePipeline] = None
+        self.supervisor: Optional[Supervisor] = None
+        self.result_callbacks: List[Callable[[int, Dict[str, Any]], None]] = [self.fleet.run_finished]
     
     
     def signal_handler(self, sig, frame):
-        """Обработчик сигнала для корректного завершения при Ctrl+C"""
-        logger.info("Получен сигнал прерывания. Завершаем работу...")
-        print("\n\033[93mПрограмма завершается, ожидайте...\033[0m")
-        self.shutdown_event.set()
+        """Единый обработчик SIGINT и SIGTERM. Первый сигнал во время работы останавливает запуск новых прогонов
+        и дает текущим завершиться (включая ожидание отправленных транзакций), повторный прерывает ожидание"""
+        if not self.running or self.shutdown_event.is_set():
+            raise KeyboardInterrupt
         
-        for thread in self.threads:
-            if thread.is_alive():
-                thread.join(timeout=5)
-        
-        sys.exit(0)
+        logger.info(f"Получен сигнал {signal.Signals(sig).name}. Новые прогоны не запускаются, ждем завершения текущих (до {self.drain_timeout} с)")
+        print(f"\n\033[93mПрограмма завершается, ждем завершения текущих прогонов (до {self.drain_timeout} с). Повторное нажатие Ctrl+C прервет ожидание\033[0m")
+        self.shutdown_event.set()
+    
+    
+    def close(self) -> None:
+        if self.results_store is not None:
+            self.results_store.close()
+        if self.cassette is not None:
+            self.cassette.close()
+        if self._signer is not None:
+            self._signer.close()
+        if self.mint_journal is not None:
+            self.mint_journal.close()
+        if self.spend_ledger is not None:
+            self.spend_ledger.close()
+    
+    
+    def _console(self, message: str, color: str = "93") -> None:
+        if self.console_events:
+            print(f"\033[{color}m{message}\033[0m")
     
     
     def validate_accounts(self) -> Tuple[bool, List[str]]:
-        return self.config_manager.validate_accounts()
+        is_valid, errors = self.config_manager.validate_accounts()
+        
+        processes = self.config.get("processes", 1)
+        if self.config.get("cassette", {}).get("mode") == "record" and processes > 1 and not self.coordinator_config.get("enabled", False):
+            # Процессы дописывали бы одну кассету независимо друг от друга и портили ее
+            errors.append(f"Запись кассеты (cassette.mode: record) работает только в одном процессе, а processes = {processes}")
+        
+        return is_valid and not errors, errors
     
     
     def start_tasks(self):
@@ -56,20 +203,65 @@ class AccountManager:
             return
         
         self.shutdown_event.clear()
+        self.running = True
+        try:
+            self._start_tasks()
+        finally:
+            self.running = False
+    
+    
+    def _start_tasks(self):
+        metrics_config = self.config.get("metrics", {})
+        if metrics_config.get("enabled", False):
+            start_metrics_server(metrics_config.get("port", 9108), metrics_config.get("host", "127.0.0.1"))
         
-        for i, account in enumerate(self.accounts):
-            if self.shutdown_event.is_set():
-                break
-                
-            thread = threading.Thread(
-                target=self.account_task_loop,
-                args=(account, i),
-                daemon=True
+        if self.mint_journal is not None:
+            try:
+                asyncio.run(self._reconcile_mint_journal())
+            except Exception as e:
+                # Не сверенные записи все равно проверяются перед минтом своих метаданных
+                logger.error(f"Ошибка сверки журнала минтов: {e}")
+        
+        dashboard = None
+        if self.dashboard_enabled:
+            dashboard = Dashboard(
+                self.fleet,
+                self.stage_counts,
+                len(self.accounts),
+                refresh_per_second=self.dashboard_config.get("refresh_per_second", 1),
+                top=self.dashboard_config.get("top", 5)
             )
+            dashboard.start()
+        
+        processes = self.config.get("processes", 1)
+        
+        if self.coordinator_config.get("enabled", False):
+            thread = threading.Thread(target=self.coordinator_loop, daemon=True)
             self.threads.append(thread)
             thread.start()
-            
-            time.sleep(random.uniform(1, 3))
+        elif processes > 1:
+            self.supervisor = Supervisor(self, processes)
+            thread = threading.Thread(target=self.supervisor.run, daemon=True)
+            self.threads.append(thread)
+            thread.start()
+        elif self.pipeline_config.get("enabled", False):
+            thread = threading.Thread(target=self.pipeline_loop, daemon=True)
+            self.threads.append(thread)
+            thread.start()
+        else:
+            for i, account in enumerate(self.accounts):
+                if self.shutdown_event.is_set():
+                    break
+                    
+                thread = threading.Thread(
+                    target=self.account_task_loop,
+                    args=(account, account.get("index", i)),
+                    daemon=True
+                )
+                self.threads.append(thread)
+                thread.start()
+                
+                time.sleep(random.uniform(1, 3))
         
         logger.info(f"Запущены задачи для {len(self.accounts)} аккаунтов")
         print(f"\033[92mЗапущены задачи для {len(self.accounts)} аккаунтов\033[0m")
@@ -81,48 +273,195 @@ class AccountManager:
             logger.info("Остановка по команде пользователя")
             self.shutdown_event.set()
         
+        deadline = time.time() + self.drain_timeout
         for thread in self.threads:
             if thread.is_alive():
-                thread.join()
+                thread.join(timeout=max(0, deadline - time.time()))
+            if thread.is_alive():
+                logger.warning(f"Прогоны не завершились за {self.drain_timeout} с, останавливаемся без них")
+                break
         
         self.threads = []
+        if dashboard is not None:
+            dashboard.stop()
     
     
-    def account_task_loop(self, account: Dict[str, str], account_index: int):
-        private_key = account.get('private_key', '').strip()
-        proxy = account.get('proxy', '').strip()
+    async def _reconcile_mint_journal(self) -> None:
+        """Сверяет с сетью минты, оставшиеся незавершенными после прошлого запуска"""
+        entries = self.mint_journal.pending()
+        if not entries:
+            return
+        logger.info(f"Сверка журнала минтов: незавершенных записей {len(entries)}")
+        web3, _ = provider_pool.web3(self.network)
+        try:
+            entries = await reconcile(self.mint_journal, web3, entries)
+        finally:
+            await provider_pool.close_loop_sessions()
+        still_pending = sum(1 for entry in entries if entry["status"] == MintStatus.PENDING)
+        if still_pending:
+            logger.info(f"Транзакции минта еще не в блоке: {still_pending}, их дождутся прогоны кошельков")
+    
+    
+    def stage_counts(self) -> Dict[str, Dict[str, int]]:
+        """Задачи по этапам для панели: из очередей конвейера или из счетчиков запущенных этапов"""
+        if self.supervisor is not None:
+            totals: Dict[str, Dict[str, int]] = {}
+            with self.supervisor.stats_lock:
+                for stats in self.supervisor.stats.values():
+                    for name, stage in stats.get("pipeline", {}).items():
+                        counts = totals.setdefault(name, {"queued": 0, "active": 0})
+                        counts["queued"] += stage["queue_depth"]
+                        counts["active"] += stage["in_flight"]
+            return totals
+        
+        if self.pipeline is not None:
+            return {
+                name: {"queued": stage["queue_depth"], "active": stage["in_flight"]}
+                for name, stage in self.pipeline.metrics().items()
+            }
+        
+        return {stage: {"queued": 0, "active": count} for stage, count in active_stages().items()}
+    
+    
+    def _parse_account(self, account: Dict[str, str]) -> Tuple[str, Optional[str]]:
+        private_key = str(account.get('private_key', '')).strip()
+        proxy = str(account.get('proxy', '')).strip()
         
         if proxy.lower() == 'nan' or not proxy:
             proxy = None
         elif not (proxy.startswith('http://') or proxy.startswith('https://')):
             proxy = f"http://{proxy}"
         
+        return private_key, proxy
+    
+    
+    def _first_delay(self, account_index: int) -> float:
         first_delay_min = self.config.get("first_generation_delay", {}).get("min_seconds", 10)
         first_delay_max = self.config.get("first_generation_delay", {}).get("max_seconds", 30)
         first_delay = random.uniform(first_delay_min, first_delay_max)
         
         logger.info(f"Аккаунт #{account_index+1}: Начинаем работу через {first_delay:.2f} секунд")
-        print(f"\033[93mАккаунт #{account_index+1}: Начинаем работу через {first_delay:.2f} секунд\033[0m")
-        time.sleep(first_delay)
+        self._console(f"Аккаунт #{account_index+1}: Начинаем работу через {first_delay:.2f} секунд")
+        self.fleet.scheduled(account_index, time.time() + first_delay)
+        return first_delay
+    
+    
+    def _wallet_address(self, private_key: str) -> str:
+        if private_key not in self._addresses:
+            self._addresses[private_key] = local_account(private_key).address
+        return self._addresses[private_key]
+    
+    
+    @property
+    def signer(self) -> Optional[SigningService]:
+        """Пул подписи создается при первом прогоне: в родительском процессе supervisor он не нужен.
+        Ключи - только аккаунты этого процесса (в процессе supervisor - его шард). Если после перечитывания
+        accounts.csv набор ключей изменился, пул перезапускается с новыми ключами"""
+        if not self.signer_config.get("enabled", True):
+            return None
+        with self._signer_lock:
+            if self._signer_accounts is not self.accounts:
+                keys = {}
+                for account in self.accounts:
+                    private_key, _ = self._parse_account(account)
+                    keys[account.get("address") or self._wallet_address(private_key)] = private_key
+                self._signer_accounts = self.accounts
+                if self._signer is not None and keys != self._signer_keys:
+                    logger.info("Набор ключей изменился, перезапускаем пул подписи")
+                    self._signer.close()
+                    self._signer = None
+                self._signer_keys = keys
+            
+            if self._signer is None:
+                self._signer = SigningService(
+                    self._signer_keys,
+                    processes=self.signer_config.get("processes", 2),
+                    max_batch=self.signer_config.get("max_batch", 64)
+                )
+            return self._signer
+    
+    
+    def _points_delay(self, private_key: str) -> float:
+        """Сколько секунд кошельку еще копить поинты по прогнозу (0 - можно запускать)"""
+        if not self.admission_config.get("enabled", True):
+            return 0
         
-        success = self.execute_task(private_key, proxy, account_index)
+        address = self._wallet_address(private_key)
+        checkpoint = self.checkpoint_store.get(address) or {}
+        if RunStage.reached(checkpoint.get("stage"), RunStage.GENERATED):
+            return 0
         
-        while not self.shutdown_event.is_set():
+        ready_at = self.points_tracker.predict_ready_at(address)
+        if ready_at is None:
+            return 0
+        return max(0, ready_at - time.time())
+    
+    
+    def _budget_delay(self, private_key: str) -> float:
+        """Сколько секунд кошелек стоит на паузе из-за дневного лимита расходов на газ (0 - можно запускать)"""
+        if self.gas_budget is None or self.gas_budget.exceeded(self._wallet_address(private_key)) is None:
+            return 0
+        return max(0, self.gas_budget.resume_at() - time.time())
+    
+    
+    def _is_admitted(self, private_key: str, account_index: int) -> bool:
+        if self.shutdown_event.is_set():
+            return False
+        
+        if self.gas_budget is not None:
+            reason = self.gas_budget.exceeded(self._wallet_address(private_key))
+            if reason is not None:
+                logger.info(f"Аккаунт #{account_index+1}: {reason}, запуск пропущен до следующего дня")
+                self.fleet.set_status(account_index, OVER_BUDGET)
+                return False
+        
+        points_delay = self._points_delay(private_key)
+        if points_delay <= 0:
+            return True
+        
+        logger.info(f"Аккаунт #{account_index+1}: По прогнозу поинтов не хватит еще {points_delay/60:.2f} минут, запуск пропущен")
+        self.fleet.set_status(account_index, NO_POINTS)
+        return False
+    
+    
+    def _next_delay(self, account_index: int, private_key: Optional[str] = None) -> float:
+        points_delay = self._points_delay(private_key) if private_key else 0
+        budget_delay = self._budget_delay(private_key) if private_key else 0
+        
+        if points_delay > 0 or budget_delay > 0:
+            next_delay = max(points_delay, budget_delay) + random.uniform(0, self.admission_config.get("jitter_seconds", 300))
+        else:
             next_delay_min = self.config.get("subsequent_generation_delay", {}).get("min_seconds", 3600)
             next_delay_max = self.config.get("subsequent_generation_delay", {}).get("max_seconds", 7200)
             next_delay = random.uniform(next_delay_min, next_delay_max)
-            
-            logger.info(f"Аккаунт #{account_index+1}: Следующая задача через {next_delay/60:.2f} минут")
-            
-            next_time = time.strftime("%H:%M:%S", time.localtime(time.time() + next_delay))
-            print(f"\033[93mАккаунт #{account_index+1}: Следующая задача в {next_time} (через {next_delay/60:.2f} минут)\033[0m")
-            
-            with self.next_runs_lock:
-                self.next_runs[account_index] = {
-                    "account_index": account_index,
-                    "next_time": next_time,
-                    "next_delay_minutes": next_delay/60
-                }
+        
+        logger.info(f"Аккаунт #{account_index+1}: Следующая задача через {next_delay/60:.2f} минут")
+        
+        next_time = time.strftime("%H:%M:%S", time.localtime(time.time() + next_delay))
+        self._console(f"Аккаунт #{account_index+1}: Следующая задача в {next_time} (через {next_delay/60:.2f} минут)")
+        
+        with self.next_runs_lock:
+            self.next_runs[account_index] = {
+                "account_index": account_index,
+                "next_time": next_time,
+                "next_delay_minutes": next_delay/60
+            }
+        self.fleet.scheduled(account_index, time.time() + next_delay)
+        
+        return next_delay
+    
+    
+    def account_task_loop(self, account: Dict[str, str], account_index: int):
+        private_key, proxy = self._parse_account(account)
+        
+        if self.shutdown_event.wait(self._first_delay(account_index)):
+            return
+        
+        if self._is_admitted(private_key, account_index):
+            success = self.execute_task(private_key, proxy, account_index)
+        
+        while not self.shutdown_event.is_set():
+            next_delay = self._next_delay(account_index, private_key)
             
             start_time = time.time()
             while time.time() - start_time < next_delay:
@@ -130,61 +469,413 @@ class AccountManager:
                     return
                 time.sleep(1)
             
-            success = self.execute_task(private_key, proxy, account_index)
+            if self._is_admitted(private_key, account_index):
+                success = self.execute_task(private_key, proxy, account_index)
     
     
     def execute_task(self, private_key: str, proxy: Optional[str], account_index: int) -> bool:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
             result = loop.run_until_complete(self._run_task(private_key, proxy, account_index))
-            loop.close()
             
             return result.get("success", False)
             
         except Exception as e:
             logger.error(f"Аккаунт #{account_index+1}: Ошибка выполнения задачи: {e}")
-            print(f"\033[91mАккаунт #{account_index+1}: Ошибка выполнения задачи: {e}\033[0m")
+            self._console(f"Аккаунт #{account_index+1}: Ошибка выполнения задачи: {e}", "91")
+            self.fleet.run_finished(account_index, {"success": False, "error": str(e)})
             return False
+            
+        finally:
+            loop.close()
     
     
-    async def _run_task(self, private_key: str, proxy: Optional[str], account_index: int) -> Dict[str, Any]:
+    def _create_clients(self, private_key: str, proxy: Optional[str], account_index: int) -> Tuple[TLSClient, EVMClient]:
         logger.info(f"Аккаунт #{account_index+1}: Инициализация клиентов")
         
         tls_client = TLSClient(
             proxy=proxy,
-            randomize_fingerprint=True
+            randomize_fingerprint=True,
+            cassette=self.cassette,
+            wallet=self._wallet_address(private_key),
+            fault_injector=self.fault_injector,
+            max_retries=self.http_retry_config.get("max_retries", 3),
+            retry_delay=self.http_retry_config.get("retry_delay_seconds", 1.0)
         )
         
         evm_client = EVMClient(
             private_key=private_key,
-            network=Networks.MONAD,
-            proxy=proxy
+            network=self.network,
+            proxy=proxy,
+            fault_injector=self.fault_injector,
+            base_fee_multiplier=self.gas_config.get("base_fee_multiplier", 2),
+            signer=self.signer
         )
         
-        try:
-            authenticator = Authenticator(tls_client)
+        return tls_client, evm_client
+    
+    
+    async def _create_task(
+        self, 
+        tls_client: TLSClient, 
+        evm_client: EVMClient, 
+        account_index: int
+    ) -> Tuple[Optional[MahojinTask], Optional[Dict[str, Any]]]:
+        authenticator = Authenticator(tls_client)
+        checkpoint = self.checkpoint_store.get(evm_client.account.address) or {}
+        
+        if RunStage.reached(checkpoint.get("stage"), RunStage.PUBLISHED):
+            logger.info(f"Аккаунт #{account_index+1}: Изображение уже опубликовано, аутентификация не требуется")
+            auth_success = True
+        else:
             auth_success = await authenticator.authenticate(evm_client)
+        
+        if not auth_success:
+            logger.error(f"Аккаунт #{account_index+1}: Аутентификация не удалась")
+            self._console(f"Аккаунт #{account_index+1}: Аутентификация не удалась", "91")
+            return None, {"success": False, "error": "Ошибка аутентификации", "stage": "authenticate", "wallet": evm_client.account.address}
+        
+        polling_config = self.config.get("polling", {})
+        image_generator = ImageGenerator(
+            tls_client, authenticator.auth_cookies,
+            poll_interval=polling_config.get("generation_status_seconds", 5)
+        )
+        publisher = Publisher(tls_client, authenticator.auth_cookies)
+        blockchain_manager = BlockchainManager(
+            evm_client,
+            receipt_poll_interval=polling_config.get("receipt_seconds", 5),
+            receipt_timeout=polling_config.get("receipt_timeout_seconds", 300),
+            stuck_blocks=self.gas_config.get("stuck_blocks", 3),
+            bump_percent=self.gas_config.get("bump_percent", 12.5),
+            max_bumps=self.gas_config.get("max_bumps", 5),
+            mint_journal=self.mint_journal,
+            spend_ledger=self.spend_ledger,
+            gas_budget=self.gas_budget
+        )
+        
+        task = MahojinTask(
+            tls_client, evm_client, authenticator, image_generator, publisher, blockchain_manager,
+            checkpoint_store=self.checkpoint_store
+        )
+        return task, None
+    
+    
+    def _report_result(self, account_index: int, result: Dict[str, Any], run_id: Optional[str] = None) -> None:
+        status = "успешно" if result.get("success", False) else "с ошибкой"
+        logger.info(f"Аккаунт #{account_index+1}: Задача выполнена {status}")
+        self._console(f"Аккаунт #{account_index+1}: Задача выполнена {status}", "92" if result.get("success", False) else "91")
+        
+        if result.get("wallet") and result.get("current_points") is not None:
+            self.points_tracker.observe(result["wallet"], result["current_points"], result.get("points_spent", 0))
+        
+        if self.results_store is not None:
+            self.results_store.record(account_index, result, run_id)
+        
+        self.notify_result(account_index, result)
+    
+    
+    def notify_result(self, account_index: int, result: Dict[str, Any]) -> None:
+        for callback in self.result_callbacks:
+            try:
+                callback(account_index, result)
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике результата: {e}")
+    
+    
+    async def _run_task(self, private_key: str, proxy: Optional[str], account_index: int) -> Dict[str, Any]:
+        trace = tracing.start_trace("run", account_index=account_index)
+        result: Dict[str, Any] = {}
+        
+        run_id = uuid.uuid4().hex[:12]
+        self.fleet.run_started(account_index, proxy)
+        
+        with logger.contextualize(account_index=account_index, run_id=run_id), tracing.activate(trace):
+            tls_client: Optional[TLSClient] = None
+            try:
+                # Внутри try: если клиенты (или пул подписи) не создались, трейс все равно закрывается
+                tls_client, evm_client = self._create_clients(private_key, proxy, account_index)
+                task, error = await self._create_task(tls_client, evm_client, account_index)
+                if task is None:
+                    result = error
+                    self._report_result(account_index, result, run_id)
+                    return result
+                
+                result = await task.run()
+                self._report_result(account_index, result, run_id)
+                
+                return result
+                
+            finally:
+                if tls_client is not None:
+                    await tls_client.close()
+                # В режиме потоков у каждого прогона свой event loop, его RPC сессии закрываются вместе с ним
+                await provider_pool.close_loop_sessions()
+                tracing.finish_trace(trace, success=result.get("success", False), stage=result.get("stage"))
+    
+    
+    def pipeline_loop(self):
+        try:
+            asyncio.run(self._pipeline_main())
+        except Exception as e:
+            logger.exception(f"Ошибка конвейера: {e}")
+            print(f"\033[91mОшибка конвейера: {e}\033[0m")
+    
+    
+    def coordinator_loop(self):
+        try:
+            asyncio.run(self._coordinator_main())
+        except Exception as e:
+            logger.exception(f"Ошибка режима координатора: {e}")
+            print(f"\033[91mОшибка режима координатора: {e}\033[0m")
+    
+    
+    def _create_pipeline(self) -> StagePipeline:
+        workers = self.pipeline_config.get("workers", {})
+        return StagePipeline(
+            [
+                ("prepare", self._stage_prepare, workers.get("prepare", 20)),
+                ("generate", self._stage_generate, workers.get("generate", 50)),
+                ("publish", self._stage_publish, workers.get("publish", 20)),
+                ("mint", self._stage_mint, workers.get("mint", 10))
+            ],
+            queue_size=self.pipeline_config.get("queue_size", 100)
+        )
+    
+    
+    async def _run_pipeline(self, drivers: List[Coroutine]):
+        self.pipeline = self._create_pipeline()
+        self.pipeline.start()
+        
+        registry.gauge(
+            "mahojin_pipeline_queue_depth", "Задачи в очереди этапа конвейера", ["stage"],
+            callback=lambda: {(name,): stage["queue_depth"] for name, stage in self.pipeline.metrics().items()}
+        )
+        registry.gauge(
+            "mahojin_pipeline_in_flight", "Задачи, которые сейчас обрабатывает этап конвейера", ["stage"],
+            callback=lambda: {(name,): stage["in_flight"] for name, stage in self.pipeline.metrics().items()}
+        )
+        
+        driver_tasks = [asyncio.create_task(driver) for driver in drivers]
+        
+        metrics_interval = self.pipeline_config.get("metrics_interval_seconds", 60)
+        last_metrics = time.time()
+        
+        try:
+            while not self.shutdown_event.is_set():
+                await asyncio.sleep(1)
+                
+                if time.time() - last_metrics >= metrics_interval:
+                    last_metrics = time.time()
+                    logger.info(f"Метрики конвейера: {self.pipeline.metrics()}")
+        finally:
+            # Планировщики сами завершаются, когда их текущий прогон дойдет до конца
+            _, pending = await asyncio.wait(driver_tasks, timeout=self.drain_timeout) if driver_tasks else (set(), set())
+            if pending:
+                logger.warning(f"Прогоны не завершились за {self.drain_timeout} с, прерываем: {len(pending)}")
+            for driver_task in pending:
+                driver_task.cancel()
+            await asyncio.gather(*driver_tasks, return_exceptions=True)
+            await self.pipeline.stop()
+            await provider_pool.close_loop_sessions()
+    
+    
+    async def _pipeline_main(self):
+        await self._run_pipeline([
+            self._account_schedule(account, account.get("index", i))
+            for i, account in enumerate(self.accounts)
+        ])
+    
+    
+    async def _coordinator_main(self):
+        await self._run_pipeline([self._lease_driver()])
+    
+    
+    async def _wait(self, seconds: float) -> bool:
+        """Асинхронно ждет указанное время. Возвращает False, если за это время пришел сигнал остановки"""
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            if self.shutdown_event.is_set():
+                return False
+            await asyncio.sleep(min(1, deadline - time.time()))
+        return not self.shutdown_event.is_set()
+    
+    
+    async def _account_schedule(self, account: Dict[str, str], account_index: int):
+        private_key, proxy = self._parse_account(account)
+        
+        if not await self._wait(self._first_delay(account_index)):
+            return
+        
+        while True:
+            if self._is_admitted(private_key, account_index):
+                await self._run_pipeline_job(private_key, proxy, account_index)
             
-            if not auth_success:
-                logger.error(f"Аккаунт #{account_index+1}: Аутентификация не удалась")
-                print(f"\033[91mАккаунт #{account_index+1}: Аутентификация не удалась\033[0m")
-                return {"success": False, "error": "Ошибка аутентификации"}
-            
-            image_generator = ImageGenerator(tls_client, authenticator.auth_cookies)
-            publisher = Publisher(tls_client, authenticator.auth_cookies)
-            blockchain_manager = BlockchainManager(evm_client)
-            
-            task = MahojinTask(tls_client, evm_client, authenticator, image_generator, publisher, blockchain_manager)
-            result = await task.run()
-            
-            status = "успешно" if result.get("success", False) else "с ошибкой"
-            logger.info(f"Аккаунт #{account_index+1}: Задача выполнена {status}")
-            print(f"\033[{'92' if result.get('success', False) else '91'}mАккаунт #{account_index+1}: Задача выполнена {status}\033[0m")
-            
+            if self.shutdown_event.is_set() or not await self._wait(self._next_delay(account_index, private_key)):
+                return
+    
+    
+    async def _run_pipeline_job(self, private_key: str, proxy: Optional[str], account_index: int) -> Dict[str, Any]:
+        job = PipelineJob(account_index, private_key, proxy)
+        job.trace = tracing.start_trace("run", account_index=account_index)
+        self.fleet.run_started(account_index, proxy)
+        try:
+            result = await self.pipeline.submit(job)
+            self._report_result(account_index, result, job.run_id)
             return result
+        except Exception as e:
+            logger.error(f"Аккаунт #{account_index+1}: Ошибка выполнения задачи: {e}")
+            self._console(f"Аккаунт #{account_index+1}: Ошибка выполнения задачи: {e}", "91")
+            self.fleet.run_finished(account_index, {"success": False, "error": str(e)})
+            return {"success": False, "error": str(e)}
+        finally:
+            tls_client = job.context.get("tls_client")
+            if tls_client is not None:
+                await tls_client.close()
+            
+            result = job.result or {}
+            tracing.finish_trace(job.trace, success=result.get("success", False), stage=result.get("stage"))
+    
+    
+    async def _lease_driver(self):
+        """Берет кошельки в аренду из общей базы, пока есть свободные слоты"""
+        store = LeaseStore(
+            self.coordinator_config.get("db_path") or os.path.join(self.config_manager.files_dir, "leases.db"),
+            lease_ttl=self.coordinator_config.get("lease_ttl_seconds", 900),
+            cycle_seconds=self.coordinator_config.get("cycle_seconds", 86400)
+        )
+        node_id = self.coordinator_config.get("node_id") or default_node_id()
+        max_in_flight = self.coordinator_config.get("max_in_flight", 50)
+        batch_size = self.coordinator_config.get("batch_size", 10)
+        poll_interval = self.coordinator_config.get("poll_interval_seconds", 30)
+        
+        accounts_by_key = {
+            wallet_key(str(account.get("private_key", ""))): (account, account.get("index", i))
+            for i, account in enumerate(self.accounts)
+        }
+        await asyncio.to_thread(store.register, list(accounts_by_key))
+        logger.info(f"Узел {node_id}: зарегистрировано {len(accounts_by_key)} кошельков, статус: {store.stats()}")
+        
+        held: Set[str] = set()
+        running: Set[asyncio.Task] = set()
+        heartbeat = asyncio.create_task(self._lease_heartbeat(store, node_id, held))
+        
+        try:
+            while not self.shutdown_event.is_set():
+                free_slots = max_in_flight - len(held)
+                keys = []
+                if free_slots > 0:
+                    now = time.time()
+                    # Выполненным кошелек отмечается в цикле аренды, даже если прогон закончится уже в следующем
+                    cycle = store.current_cycle(now)
+                    keys = await asyncio.to_thread(store.acquire, node_id, min(batch_size, free_slots), now)
+                
+                for key in keys:
+                    if key not in accounts_by_key:
+                        # Кошелька нет в accounts.csv этого узла: аренда истечет и его заберет другой узел
+                        logger.warning(f"Узел {node_id}: получен неизвестный кошелек {key[:12]}")
+                        continue
+                    
+                    held.add(key)
+                    task = asyncio.create_task(self._run_leased(store, node_id, key, *accounts_by_key[key], cycle, held))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                
+                if len(keys) < batch_size and not await self._wait(poll_interval):
+                    break
+                await asyncio.sleep(0)
+        finally:
+            try:
+                # Аренды продлеваются, пока идут уже начатые прогоны
+                if running:
+                    await asyncio.wait(list(running), timeout=self.drain_timeout)
+            finally:
+                heartbeat.cancel()
+                for task in list(running):
+                    task.cancel()
+                await asyncio.gather(heartbeat, *running, return_exceptions=True)
+                
+                await asyncio.to_thread(store.release, node_id, list(held))
+                store.close()
+    
+    
+    async def _run_leased(
+        self,
+        store: LeaseStore,
+        node_id: str,
+        key: str,
+        account: Dict[str, str],
+        account_index: int,
+        cycle: int,
+        held: Set[str]
+    ):
+        private_key, proxy = self._parse_account(account)
+        
+        # Ключ убирается из удерживаемых при любом исходе: иначе при ошибке базы heartbeat продлевал бы
+        # аренду кошелька, который этот узел уже не выполняет, и другие узлы не смогли бы его забрать
+        try:
+            result = None
+            if self._is_admitted(private_key, account_index):
+                result = await self._run_pipeline_job(private_key, proxy, account_index)
             
+            if result is not None and result.get("success", False) and not result.get("skip_reason"):
+                await asyncio.to_thread(store.complete, node_id, key, cycle)
+            else:
+                # Ошибка, пропуск или остановка: кошелек возвращается в очередь, повтор - по обычному расписанию кошелька
+                retry_at = 0 if self.shutdown_event.is_set() else time.time() + self._next_delay(account_index, private_key)
+                await asyncio.to_thread(store.release, node_id, [key], retry_at)
         finally:
-            await tls_client.close()
-            
\ No newline at end of file
+            held.discard(key)
+    
+    
+    async def _lease_heartbeat(self, store: LeaseStore, node_id: str, held: Set[str]):
+        interval = self.coordinator_config.get("heartbeat_seconds", 60)
+        while True:
+            await asyncio.sleep(interval)
+            extended = await asyncio.to_thread(store.heartbeat, node_id, list(held))
+            logger.info(f"Узел {node_id}: продлено аренд {extended}, статус: {await asyncio.to_thread(store.stats)}")
+    
+    
+    async def _stage_prepare(self, job: PipelineJob) -> Optional[Dict[str, Any]]:
+        if self.shutdown_event.is_set():
+            # Задача еще стояла в очереди: при остановке новые прогоны не начинаем
+            return {"success": False, "skip_reason": "shutdown"}
+        
+        tls_client, evm_client = self._create_clients(job.private_key, job.proxy, job.account_index)
+        job.context["tls_client"] = tls_client
+        
+        task, error = await self._create_task(tls_client, evm_client, job.account_index)
+        if task is None:
+            return error
+        
+        job.context["task"] = task
+        try:
+            return await task.prepare()
+        except Exception as e:
+            return task.failure(e)
+    
+    
+    async def _stage_generate(self, job: PipelineJob) -> Optional[Dict[str, Any]]:
+        task = job.context["task"]
+        try:
+            await task.generate()
+        except Exception as e:
+            return task.failure(e)
+        return None
+    
+    
+    async def _stage_publish(self, job: PipelineJob) -> Optional[Dict[str, Any]]:
+        task = job.context["task"]
+        try:
+            await task.publish()
+        except Exception as e:
+            return task.failure(e)
+        return None
+    
+    
+    async def _stage_mint(self, job: PipelineJob) -> Optional[Dict[str, Any]]:
+        task = job.context["task"]
+        try:
+            return await task.mint()
+        except Exception as e:
+            return task.failure(e)
@@ -2,15 +2,22 @@ import os
 import json
 import csv
 import pandas as pd
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 from loguru import logger
+from eth_account import Account
+
+from functions.lease_store import wallet_key
 
 class ConfigManager:
     
-    def __init__(self, files_dir="files"):
+    def __init__(self, files_dir="files", config_path=None, accounts_path=None):
         self.files_dir = files_dir
-        self.accounts_csv = "accounts.csv"
-        self.config_json = "config.json"
+        # Явно заданные пути (из командной строки) абсолютные, поэтому os.path.join с files_dir их не меняет
+        self.accounts_csv = os.path.abspath(accounts_path) if accounts_path else "accounts.csv"
+        self.config_json = os.path.abspath(config_path) if config_path else "config.json"
+        # Адреса, выведенные из ключей: sha256 ключа -> адрес. Вывод открытого ключа дорогой, поэтому кэш хранится в файле
+        self.addresses_json = "addresses.json"
+        self.accounts_by_address: Dict[str, Dict[str, Any]] = {}
         
         self.ensure_files_exist()
         self.config = self.load_config()
@@ -32,6 +39,142 @@ class ConfigManager:
                 "subsequent_generation_delay": {
                     "min_seconds": 43200, 
                     "max_seconds": 86400   
+                },
+                "registry": {
+                    "files": []
+                },
+                "endpoints": {
+                    "chain": "story",
+                    "mahojin_url": "https://app.mahojin.ai",
+                    "dynamic_auth_url": "https://app.dynamicauth.com",
+                    "rpc_url": None,
+                    "rpc_urls": [],
+                    "write_rpc_urls": []
+                },
+                "cassette": {
+                    "mode": None,
+                    "path": None,
+                    "latency_scale": 1.0
+                },
+                "polling": {
+                    "generation_status_seconds": 5,
+                    "receipt_seconds": 5,
+                    "receipt_timeout_seconds": 300
+                },
+                "rpc_pool": {
+                    "connections": 100,
+                    "connections_per_host": 0,
+                    "keepalive_seconds": 30,
+                    "timeout_seconds": 30
+                },
+                "rpc_router": {
+                    "max_block_lag": 3,
+                    "probe_interval_seconds": 15,
+                    "failure_cooldown_seconds": 30
+                },
+                "gas": {
+                    "base_fee_multiplier": 2,
+                    "stuck_blocks": 3,
+                    "bump_percent": 12.5,
+                    "max_bumps": 5
+                },
+                "signer": {
+                    "enabled": True,
+                    "processes": 2,
+                    "max_batch": 64
+                },
+                "http_retry": {
+                    "max_retries": 3,
+                    "retry_delay_seconds": 1.0
+                },
+                "faults": {
+                    "enabled": False,
+                    "seed": None,
+                    "http": {
+                        "timeout_rate": 0,
+                        "timeout_seconds": 5,
+                        "reset_rate": 0,
+                        "server_error_rate": 0,
+                        "rate_limit_rate": 0,
+                        "slow_body_rate": 0,
+                        "slow_body_seconds": 2
+                    },
+                    "rpc": {
+                        "timeout_rate": 0,
+                        "timeout_seconds": 5,
+                        "reset_rate": 0,
+                        "server_error_rate": 0,
+                        "rate_limit_rate": 0,
+                        "slow_body_rate": 0,
+                        "slow_body_seconds": 2,
+                        "drop_transaction_rate": 0
+                    }
+                },
+                "admission": {
+                    "enabled": True,
+                    "required_points": 40,
+                    "jitter_seconds": 300
+                },
+                "metrics": {
+                    "enabled": False,
+                    "host": "127.0.0.1",
+                    "port": 9108
+                },
+                "tracing": {
+                    "enabled": False,
+                    "sample_rate": 0.05
+                },
+                "results": {
+                    "enabled": True,
+                    "batch_size": 100,
+                    "flush_interval_seconds": 5
+                },
+                "mint_journal": {
+                    "enabled": True
+                },
+                "spend": {
+                    "enabled": True,
+                    "wallet_daily": 0,
+                    "fleet_daily": 0,
+                    "max_gas_price_gwei": 0
+                },
+                "dashboard": {
+                    "enabled": True,
+                    "refresh_per_second": 1,
+                    "top": 5
+                },
+                "logging": {
+                    "structured": False,
+                    "level": "INFO",
+                    "console_events": True,
+                    "rate_limit": {
+                        "max_per_window": 20,
+                        "window_seconds": 60
+                    }
+                },
+                "processes": 1,
+                "drain_timeout_seconds": 300,
+                "coordinator": {
+                    "enabled": False,
+                    "db_path": None,
+                    "node_id": None,
+                    "cycle_seconds": 86400,
+                    "lease_ttl_seconds": 900,
+                    "heartbeat_seconds": 60,
+                    "poll_interval_seconds": 30,
+                    "batch_size": 10,
+                    "max_in_flight": 50
+                },
+                "pipeline": {
+                    "enabled": False,
+                    "queue_size": 100,
+                    "metrics_interval_seconds": 60,
+                    "workers": {
+                        "prepare": 20,
+                        "generate": 50,
+                        "publish": 20,
+                        "mint": 10
+                    }
                 }
             }
             with open(config_path, 'w', encoding='utf-8') as f:
@@ -71,16 +214,70 @@ class ConfigManager:
     def load_accounts(self) -> List[Dict[str, str]]:
         accounts_path = os.path.join(self.files_dir, self.accounts_csv)
         try:
-            df = pd.read_csv(accounts_path)
+            df = pd.read_csv(accounts_path, dtype=str)
             if 'private_key' in df.columns:
                 df['private_key'] = df['private_key'].str.strip()
             if 'proxy' in df.columns:
                 df['proxy'] = df['proxy'].str.strip()
-            return df.to_dict('records')
+            accounts = df.to_dict('records')
         except Exception as e:
             logger.error(f"Ошибка при чтении файла аккаунтов {accounts_path}: {e}")
             return []
         
+        return self._index_accounts(accounts)
+    
+    
+    def _load_address_cache(self) -> Dict[str, str]:
+        try:
+            with open(os.path.join(self.files_dir, self.addresses_json), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    
+    def _index_accounts(self, accounts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Добавляет к каждому аккаунту адрес (ключ выводится один раз, дальше берется из кэша) и номер строки файла,
+        строит индекс адрес -> аккаунт и убирает повторы одного кошелька"""
+        cache = self._load_address_cache()
+        derived = 0
+        unique = []
+        self.accounts_by_address = {}
+        
+        for i, account in enumerate(accounts):
+            # Номер строки сохраняется: после пропуска повторов позиция в списке с ним уже не совпадает
+            account['index'] = i
+            private_key = str(account.get('private_key', '')).strip()
+            key_hash = wallet_key(private_key)
+            address = cache.get(key_hash)
+            if address is None:
+                try:
+                    address = Account.from_key(private_key).address
+                except Exception:
+                    # Некорректный ключ: ошибку покажет validate_accounts
+                    unique.append(account)
+                    continue
+                cache[key_hash] = address
+                derived += 1
+            
+            if address.lower() in self.accounts_by_address:
+                logger.warning(f"Аккаунт #{i+1}: кошелек {address} уже есть в файле аккаунтов, повтор пропущен")
+                continue
+            account['address'] = address
+            self.accounts_by_address[address.lower()] = account
+            unique.append(account)
+        
+        if derived:
+            cache_path = os.path.join(self.files_dir, self.addresses_json)
+            with open(cache_path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+            os.replace(cache_path + ".tmp", cache_path)
+            logger.info(f"Выведены адреса {derived} новых ключей")
+        return unique
+    
+    
+    def account_by_address(self, address: str) -> Optional[Dict[str, Any]]:
+        return self.accounts_by_address.get(address.lower())
+        
         
     def reload_accounts(self) -> List[Dict[str, str]]:
         self.accounts = self.load_accounts()
@@ -92,7 +289,8 @@ class ConfigManager:
             return False, ["Нет аккаунтов в файле accounts.csv"]
         
         errors = []
-        for i, account in enumerate(self.accounts):
+        for position, account in enumerate(self.accounts):
+            i = account.get('index', position)
             if 'private_key' not in account or not account['private_key']:
                 errors.append(f"Аккаунт #{i+1}: Отсутствует приватный ключ")
                 continue
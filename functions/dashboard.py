@@ -0,0 +1,225 @@
+import re
+import sys
+import time
+import heapq
+import threading
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple, Callable
+from urllib.parse import urlsplit
+from loguru import logger
+
+
+WAITING = "waiting"
+RUNNING = "running"
+NO_POINTS = "no_points"
+OVER_BUDGET = "over_budget"
+
+STATUS_NAMES = {WAITING: "ожидание", RUNNING: "в работе", NO_POINTS: "копят поинты", OVER_BUDGET: "лимит газа"}
+
+_VARIABLE_PARTS = re.compile(r"0x[0-9a-fA-F]+|\d+")
+
+
+def proxy_label(proxy: Optional[str]) -> str:
+    """Хост и порт прокси без логина и пароля"""
+    if not proxy:
+        return "без прокси"
+    parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    return f"{parts.hostname}:{parts.port}" if parts.port else str(parts.hostname)
+
+
+class FleetState:
+    """Сводное состояние всех кошельков. Каждое событие меняет счетчики за O(1),
+    поэтому отрисовка не зависит от числа кошельков"""
+
+    def __init__(self, window_minutes: int = 60, ewma_alpha: float = 0.3):
+        self.window_minutes = window_minutes
+        self.ewma_alpha = ewma_alpha
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+        self._status: Dict[int, str] = {}
+        self.status_counts: Dict[str, int] = {}
+        self._running: Dict[int, Tuple[float, str]] = {}
+        # Поминутные корзины: [минута, успехи, ошибки, пропуски, {причина ошибки: количество}]
+        self._minutes: deque = deque(maxlen=window_minutes)
+        self._scheduled: Dict[int, float] = {}
+        self._upcoming: List[Tuple[float, int]] = []
+        self._proxy_latency: Dict[str, List[float]] = {}
+
+
+    def set_status(self, account_index: int, status: str) -> None:
+        with self._lock:
+            previous = self._status.get(account_index)
+            if previous == status:
+                return
+            if previous is not None:
+                self.status_counts[previous] -= 1
+            self._status[account_index] = status
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+
+    def scheduled(self, account_index: int, run_at: float) -> None:
+        self.set_status(account_index, WAITING)
+        with self._lock:
+            self._scheduled[account_index] = run_at
+            heapq.heappush(self._upcoming, (run_at, account_index))
+
+
+    def run_started(self, account_index: int, proxy: Optional[str]) -> None:
+        self.set_status(account_index, RUNNING)
+        with self._lock:
+            self._running[account_index] = (time.time(), proxy_label(proxy))
+
+
+    def run_finished(self, account_index: int, result: Dict[str, Any]) -> None:
+        now = time.time()
+        minute = int(now // 60)
+
+        with self._lock:
+            if not self._minutes or self._minutes[-1][0] != minute:
+                self._minutes.append([minute, 0, 0, 0, {}])
+            bucket = self._minutes[-1]
+
+            if result.get("skip_reason"):
+                bucket[3] += 1
+            elif result.get("success", False):
+                bucket[1] += 1
+            else:
+                bucket[2] += 1
+                reason = f"{result.get('stage') or '-'}: {_VARIABLE_PARTS.sub('#', str(result.get('error')))[:60]}"
+                bucket[4][reason] = bucket[4].get(reason, 0) + 1
+
+            started = self._running.pop(account_index, None)
+            if started is not None:
+                started_at, proxy = started
+                latency = self._proxy_latency.setdefault(proxy, [now - started_at, 0])
+                latency[0] += self.ewma_alpha * (now - started_at - latency[0])
+                latency[1] += 1
+
+
+    def _window(self, now: float) -> List[list]:
+        first_minute = int(now // 60) - self.window_minutes + 1
+        return [bucket for bucket in self._minutes if bucket[0] >= first_minute]
+
+
+    def _next_runs(self, now: float, top: int) -> List[Tuple[float, int]]:
+        """Ближайшие запуски из кучи; устаревшие записи выбрасываются, когда оказываются на вершине"""
+        found = []
+        while self._upcoming and len(found) < top:
+            run_at, account_index = heapq.heappop(self._upcoming)
+            if run_at < now or self._scheduled.get(account_index) != run_at or self._status.get(account_index) != WAITING:
+                continue
+            found.append((run_at, account_index))
+        for entry in found:
+            heapq.heappush(self._upcoming, entry)
+        return found
+
+
+    def snapshot(self, top: int = 5) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            window = self._window(now)
+            errors: Dict[str, int] = {}
+            for bucket in window:
+                for reason, count in bucket[4].items():
+                    errors[reason] = errors.get(reason, 0) + count
+
+            return {
+                "now": now,
+                "uptime": now - self.started_at,
+                "status": dict(self.status_counts),
+                "success": sum(bucket[1] for bucket in window),
+                "failed": sum(bucket[2] for bucket in window),
+                "skipped": sum(bucket[3] for bucket in window),
+                "errors": heapq.nlargest(top, errors.items(), key=lambda item: item[1]),
+                "next_runs": self._next_runs(now, top),
+                # Прокси меньше, чем кошельков, и выборка идет только по ним
+                "slow_proxies": heapq.nlargest(top, self._proxy_latency.items(), key=lambda item: item[1][0])
+            }
+
+
+class Dashboard:
+    """Перерисовывает сводку в терминале с фиксированной частотой вместо строки на каждое событие"""
+
+    def __init__(
+        self,
+        state: FleetState,
+        stage_counts: Callable[[], Dict[str, Dict[str, int]]],
+        total_accounts: int,
+        refresh_per_second: float = 1,
+        top: int = 5,
+        stream=None
+    ):
+        self.state = state
+        self.stage_counts = stage_counts
+        self.total_accounts = total_accounts
+        self.interval = 1 / max(0.1, refresh_per_second)
+        self.top = top
+        self.stream = stream or sys.stdout
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+
+    def render(self) -> str:
+        snapshot = self.state.snapshot(self.top)
+        uptime = int(snapshot["uptime"])
+        lines = [
+            "\033[36m{:=^80}\033[0m".format(" Mahojin "),
+            f"Аккаунтов: {self.total_accounts}   "
+            f"Время: {time.strftime('%H:%M:%S', time.localtime(snapshot['now']))}   "
+            f"Работает: {uptime // 3600:02d}:{uptime % 3600 // 60:02d}:{uptime % 60:02d}",
+            "Состояние: " + (", ".join(
+                f"{STATUS_NAMES.get(status, status)} {count}" for status, count in sorted(snapshot["status"].items()) if count
+            ) or "-")
+        ]
+
+        stages = self.stage_counts()
+        lines.append("Этапы (очередь/в работе): " + ("  ".join(
+            f"{name} {counts.get('queued', 0)}/{counts.get('active', 0)}" for name, counts in stages.items()
+        ) or "-"))
+
+        attempted = snapshot["success"] + snapshot["failed"]
+        error_rate = f"{snapshot['failed'] / attempted * 100:.1f}%" if attempted else "-"
+        lines.append(
+            f"За {self.state.window_minutes} мин: \033[92mминтов {snapshot['success']}\033[0m, "
+            f"\033[91mошибок {snapshot['failed']} ({error_rate})\033[0m, пропусков {snapshot['skipped']}"
+        )
+
+        lines.append("\033[90m{:-^80}\033[0m".format(" Частые ошибки "))
+        lines.extend(f"{count:>6}  {reason}" for reason, count in snapshot["errors"])
+
+        lines.append("\033[90m{:-^80}\033[0m".format(" Ближайшие запуски "))
+        for run_at, account_index in snapshot["next_runs"]:
+            lines.append(
+                f"  #{account_index + 1:<6} {time.strftime('%H:%M:%S', time.localtime(run_at))}"
+                f"  (через {(run_at - snapshot['now']) / 60:.1f} мин)"
+            )
+
+        lines.append("\033[90m{:-^80}\033[0m".format(" Медленные прокси "))
+        for proxy, (latency, runs) in snapshot["slow_proxies"]:
+            lines.append(f"  {proxy:<40} {latency:8.1f} с   прогонов {runs}")
+
+        return "\n".join(lines)
+
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                # Курсор в начало и очистка экрана одной записью, без вызова внешней команды
+                self.stream.write("\033[H\033[J" + self.render() + "\n")
+                self.stream.flush()
+            except Exception as e:
+                logger.error(f"Ошибка отрисовки панели: {e}")
+
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="dashboard", daemon=True)
+        self._thread.start()
+
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
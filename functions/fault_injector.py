@@ -0,0 +1,144 @@
+import json
+import random
+import asyncio
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional, Awaitable
+from loguru import logger
+
+from eth_utils import keccak
+from hexbytes import HexBytes
+
+from observability.metrics import FAULTS_INJECTED
+
+
+@dataclass
+class FaultMix:
+    """Доли искусственных сбоев одного транспорта. Доли timeout, reset, server_error и rate_limit
+    взаимоисключающие, slow_body разыгрывается отдельно для успешных ответов"""
+    timeout_rate: float = 0
+    timeout_seconds: float = 5
+    reset_rate: float = 0
+    server_error_rate: float = 0
+    rate_limit_rate: float = 0
+    slow_body_rate: float = 0
+    slow_body_seconds: float = 2
+    drop_transaction_rate: float = 0
+
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "FaultMix":
+        return cls(**{key: value for key, value in (data or {}).items() if key in cls.__dataclass_fields__})
+
+
+class FaultResponse:
+    """Ответ с ошибкой, который подставляется вместо настоящего без обращения к сети"""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str]):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = json.dumps({"error": f"injected {status_code}"}).encode()
+
+
+    @property
+    def ok(self) -> bool:
+        return False
+
+
+    @property
+    def text(self) -> str:
+        return self.content.decode()
+
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class FaultInjector:
+    """Вносит сбои на стороне клиента: оборачивает запросы TLSClient и запросы провайдера web3 к каждому RPC"""
+
+    def __init__(self, http: Optional[FaultMix] = None, rpc: Optional[FaultMix] = None, seed: Optional[int] = None):
+        self.http_mix = http or FaultMix()
+        self.rpc_mix = rpc or FaultMix()
+        self._random = random.Random(seed)
+
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["FaultInjector"]:
+        if not config.get("enabled", False):
+            return None
+        injector = cls(FaultMix.from_dict(config.get("http")), FaultMix.from_dict(config.get("rpc")), config.get("seed"))
+        logger.warning(f"Включено внесение сбоев: HTTP {asdict(injector.http_mix)}, RPC {asdict(injector.rpc_mix)}")
+        return injector
+
+
+    def _roll(self, mix: FaultMix) -> Optional[str]:
+        roll = self._random.random()
+        for kind, rate in (
+            ("timeout", mix.timeout_rate),
+            ("reset", mix.reset_rate),
+            ("server_error", mix.server_error_rate),
+            ("rate_limit", mix.rate_limit_rate)
+        ):
+            if roll < rate:
+                return kind
+            roll -= rate
+        return None
+
+
+    async def _slow_body(self, transport: str, mix: FaultMix) -> None:
+        if mix.slow_body_rate and self._random.random() < mix.slow_body_rate:
+            FAULTS_INJECTED.inc(transport, "slow_body")
+            await asyncio.sleep(mix.slow_body_seconds)
+
+
+    async def http(self, request: Awaitable, url: str, timeout: float) -> Any:
+        """Выполняет запрос TLSClient или подменяет его сбоем"""
+        kind = self._roll(self.http_mix)
+        if kind is not None:
+            # Запрос не отправляется: корутина закрывается, чтобы не было предупреждения о неожиданной корутине
+            request.close()
+            FAULTS_INJECTED.inc("http", kind)
+
+        if kind == "timeout":
+            await asyncio.sleep(min(self.http_mix.timeout_seconds, timeout))
+            raise asyncio.TimeoutError()
+        if kind == "reset":
+            raise ConnectionResetError("Connection reset by peer (injected)")
+        if kind == "server_error":
+            return FaultResponse(url, 503, {})
+        if kind == "rate_limit":
+            return FaultResponse(url, 429, {"Retry-After": "1"})
+
+        response = await request
+        await self._slow_body("http", self.http_mix)
+        return response
+
+
+    async def rpc(self, request: Awaitable, method: str, params: Any, timeout: float) -> Any:
+        """Выполняет запрос провайдера к одному RPC или подменяет его сбоем"""
+        mix = self.rpc_mix
+        if method == "eth_sendRawTransaction" and mix.drop_transaction_rate \
+                and self._random.random() < mix.drop_transaction_rate:
+            # Узел ответил хешем, но транзакция до сети не дошла
+            request.close()
+            FAULTS_INJECTED.inc("rpc", "dropped_transaction")
+            return {"jsonrpc": "2.0", "id": 0, "result": "0x" + keccak(HexBytes(params[0])).hex()}
+
+        kind = self._roll(mix)
+        if kind is not None:
+            request.close()
+            FAULTS_INJECTED.inc("rpc", kind)
+        if kind == "timeout":
+            await asyncio.sleep(min(mix.timeout_seconds, timeout))
+            raise asyncio.TimeoutError()
+        if kind == "reset":
+            raise ConnectionResetError("Connection reset by peer (injected)")
+        if kind == "server_error":
+            return {"jsonrpc": "2.0", "id": 0, "error": {"code": -32603, "message": "injected 503"}}
+        if kind == "rate_limit":
+            return {"jsonrpc": "2.0", "id": 0, "error": {"code": -32005, "message": "injected rate limit exceeded"}}
+
+        response = await request
+        await self._slow_body("rpc", mix)
+        return response
@@ -0,0 +1,142 @@
+import os
+import time
+import random
+import socket
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional
+from loguru import logger
+
+
+def wallet_key(private_key: str) -> str:
+    """Идентификатор кошелька для общей базы: сами ключи в нее не попадают"""
+    return hashlib.sha256(private_key.strip().lower().encode()).hexdigest()
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseStore:
+    """Аренда кошельков в общей SQLite базе: каждый кошелек выполняется один раз за цикл на одном из узлов"""
+
+    def __init__(self, db_path: str, lease_ttl: float = 900, cycle_seconds: float = 86400):
+        self.db_path = db_path
+        self.lease_ttl = lease_ttl
+        self.cycle_seconds = cycle_seconds
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS wallets (
+                wallet_key TEXT PRIMARY KEY,
+                run_offset REAL NOT NULL,
+                done_cycle INTEGER NOT NULL DEFAULT -1,
+                lease_owner TEXT,
+                lease_expires REAL NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_wallets_pending ON wallets (done_cycle, lease_expires)")
+
+
+    def current_cycle(self, now: Optional[float] = None) -> int:
+        return int((now or time.time()) // self.cycle_seconds)
+
+
+    def register(self, keys: List[str]) -> None:
+        """Добавляет кошельки; смещение запуска внутри цикла выбирается случайно один раз"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO wallets (wallet_key, run_offset) VALUES (?, ?)",
+                [(key, random.uniform(0, self.cycle_seconds)) for key in keys]
+            )
+
+
+    def acquire(self, owner: str, batch_size: int, now: Optional[float] = None) -> List[str]:
+        now = now or time.time()
+        cycle = self.current_cycle(now)
+        cycle_elapsed = now - cycle * self.cycle_seconds
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    """
+                    SELECT wallet_key FROM wallets
+                    WHERE done_cycle < ? AND lease_expires < ? AND run_offset <= ?
+                    ORDER BY run_offset
+                    LIMIT ?
+                    """,
+                    (cycle, now, cycle_elapsed, batch_size)
+                ).fetchall()
+                keys = [row[0] for row in rows]
+
+                self._conn.executemany(
+                    "UPDATE wallets SET lease_owner = ?, lease_expires = ? WHERE wallet_key = ?",
+                    [(owner, now + self.lease_ttl, key) for key in keys]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return keys
+
+
+    def heartbeat(self, owner: str, keys: List[str]) -> int:
+        if not keys:
+            return 0
+
+        with self._lock:
+            cursor = self._conn.executemany(
+                "UPDATE wallets SET lease_expires = ? WHERE wallet_key = ? AND lease_owner = ?",
+                [(time.time() + self.lease_ttl, key, owner) for key in keys]
+            )
+        return cursor.rowcount
+
+
+    def complete(self, owner: str, key: str, cycle: int) -> None:
+        """Отмечает кошелек выполненным в цикле cycle - том, в котором он был взят в аренду"""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE wallets SET done_cycle = ?, lease_owner = NULL, lease_expires = 0
+                WHERE wallet_key = ? AND lease_owner = ?
+                """,
+                (cycle, key, owner)
+            )
+
+
+    def release(self, owner: str, keys: List[str], retry_at: float = 0) -> None:
+        """Возвращает невыполненные кошельки в общую очередь; до retry_at их не возьмет ни один узел"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE wallets SET lease_owner = NULL, lease_expires = ? WHERE wallet_key = ? AND lease_owner = ?",
+                [(retry_at, key, owner) for key in keys]
+            )
+
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            total, done, leased = self._conn.execute(
+                """
+                SELECT COUNT(*),
+                       SUM(CASE WHEN done_cycle >= ? THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN done_cycle < ? AND lease_owner IS NOT NULL AND lease_expires >= ? THEN 1 ELSE 0 END)
+                FROM wallets
+                """,
+                (self.current_cycle(now), self.current_cycle(now), now)
+            ).fetchone()
+        return {"total": total, "done": done or 0, "leased": leased or 0}
+
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
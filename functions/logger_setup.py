@@ -1,26 +1,193 @@
 import os
+import re
 import sys
+import json
+import inspect
+import time
+import logging
+import threading
+import traceback
+from typing import Callable, Dict, Any, Optional, Tuple
 from loguru import logger
 
 
-def setup_logging(log_dir="files", log_filename="app.log"):
+class InterceptHandler(logging.Handler):
+    """Перенаправляет записи стандартного logging (модули tasks и tls_client) в loguru"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+
+        frame, depth = inspect.currentframe(), 0
+        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+
+class ErrorRateLimiter:
+    """Пропускает не больше max_per_window одинаковых предупреждений и ошибок на этап за окно"""
+
+    _VARIABLE_PARTS = re.compile(r"0x[0-9a-fA-F]+|\d+")
+
+    def __init__(self, max_per_window: int = 20, window_seconds: float = 60):
+        self.max_per_window = max_per_window
+        self.window_seconds = window_seconds
+        self._windows: Dict[Tuple[str, str, str], list] = {}
+        self._lock = threading.Lock()
+        # Число подавленных перед пропущенной записью: loguru вызывает фильтр и формат sink подряд в одном потоке
+        self._local = threading.local()
+
+
+    @property
+    def suppressed(self) -> int:
+        return getattr(self._local, "suppressed", 0)
+
+
+    def __call__(self, record: Dict[str, Any]) -> bool:
+        self._local.suppressed = 0
+        if record["level"].no < logging.WARNING or self.max_per_window <= 0:
+            return True
+
+        key = (
+            record["extra"].get("stage", ""),
+            record["level"].name,
+            self._VARIABLE_PARTS.sub("#", record["message"])[:200]
+        )
+        now = time.monotonic()
+
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.window_seconds:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                self._local.suppressed = suppressed
+                return True
+
+            window[1] += 1
+            if window[1] <= self.max_per_window:
+                return True
+            window[2] += 1
+            return False
+
+
+class _JsonRecord:
+    """Запись лога для JSONL: сериализуется при форматировании sink, спецификация формата - число
+    подавленных фильтром этого sink сообщений ("{extra[json]:5}" добавляет поле suppressed)"""
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+
+
+    def __format__(self, spec: str) -> str:
+        payload = dict(self.payload, suppressed=int(spec)) if spec else self.payload
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+    def __str__(self) -> str:
+        return format(self)
+
+
+def _json_patcher(record: Dict[str, Any]) -> None:
+    extra = {key: value for key, value in record["extra"].items() if key != "json"}
+    payload = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+        **extra
+    }
+    if record["exception"] is not None:
+        exception = record["exception"]
+        payload["exception"] = repr(exception.value)
+        # Трассировка внутри записи: в JSONL каждая строка - ровно одна запись
+        payload["traceback"] = "".join(traceback.format_exception(exception.type, exception.value, exception.traceback))
+    record["extra"]["json"] = _JsonRecord(payload)
+
+
+def _escape(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _text_format(template: str, limiter: ErrorRateLimiter) -> Callable[[Dict[str, Any]], str]:
+    """Формат текстового sink: после сообщения - сколько таких же подавил фильтр этого sink"""
+    def format_record(record: Dict[str, Any]) -> str:
+        suppressed = limiter.suppressed
+        if suppressed:
+            note = f" (еще {suppressed} таких сообщений подавлено за {limiter.window_seconds:.0f} с)"
+            return template + _escape(note) + "\n{exception}"
+        return template + "\n{exception}"
+    return format_record
+
+
+def _json_format(limiter: ErrorRateLimiter) -> Callable[[Dict[str, Any]], str]:
+    """Формат JSONL sink: число подавленных сообщений - поле suppressed"""
+    def format_record(record: Dict[str, Any]) -> str:
+        suppressed = limiter.suppressed
+        if suppressed:
+            return f"{{extra[json]:{suppressed}}}\n"
+        return "{extra[json]}\n"
+    return format_record
+
+
+def setup_logging(
+    log_dir="files",
+    log_filename="app.log",
+    structured: bool = False,
+    level: str = "INFO",
+    rate_limit: Optional[Dict[str, Any]] = None
+):
     os.makedirs(log_dir, exist_ok=True)
     log_file = os.path.join(log_dir, log_filename)
-    
+
     logger.remove()
-    
-    logger.add(
-        log_file,
-        rotation="10 MB", 
-        retention="1 week",
-        level="INFO",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {name}:{function}:{line} - {message}"
+
+    rate_limit = rate_limit or {}
+    max_per_window = rate_limit.get("max_per_window", 20)
+    window_seconds = rate_limit.get("window_seconds", 60)
+
+    logger.configure(
+        extra={"account_index": None, "run_id": None, "stage": None},
+        patcher=_json_patcher if structured else None
     )
-    
+
+    # enqueue=True: запись в файл идет из отдельного потока и не блокирует event loop
+    file_limiter = ErrorRateLimiter(max_per_window, window_seconds)
+    if structured:
+        logger.add(
+            log_file.rsplit(".", 1)[0] + ".jsonl",
+            rotation="10 MB",
+            retention="1 week",
+            level=level,
+            format=_json_format(file_limiter),
+            filter=file_limiter,
+            enqueue=True
+        )
+    else:
+        logger.add(
+            log_file,
+            rotation="10 MB",
+            retention="1 week",
+            level=level,
+            format=_text_format("{time:YYYY-MM-DD HH:mm:ss} | {level} | {name}:{function}:{line} - {message}", file_limiter),
+            filter=file_limiter,
+            enqueue=True
+        )
+
+    stderr_limiter = ErrorRateLimiter(max_per_window, window_seconds)
     logger.add(
         sys.stderr,
         level="ERROR",
-        format="{level} | {message}"
+        format=_text_format("{level} | {message}", stderr_limiter),
+        filter=stderr_limiter,
+        enqueue=True
     )
-    
-    return logger
\ No newline at end of file
+
+    logging.basicConfig(handlers=[InterceptHandler()], level=logging.getLevelName(level), force=True)
+
+    return logger
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+from eth_utils import to_checksum_address
+from web3.exceptions import TransactionNotFound
+
+
+class MintStatus:
+    PENDING = "pending"
+    CONFIRMED = "confirmed"
+    REVERTED = "reverted"
+    # Ни одна транзакция записи не вошла в блок, а ее nonce уже занят другой транзакцией: минт можно повторить
+    LOST = "lost"
+
+
+class MintJournal:
+    """Журнал транзакций минта по (кошелек, metadataId). Транзакция записывается после подписи и до отправки в сеть,
+    поэтому после сбоя или таймаута ожидания известно, что метаданные уже минтились и какими транзакциями"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS mints (
+                wallet TEXT NOT NULL,
+                metadata_id TEXT NOT NULL,
+                nonce INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                tx TEXT NOT NULL,
+                tx_hashes TEXT NOT NULL,
+                landed_hash TEXT,
+                block_number INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (wallet, metadata_id)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_mints_status ON mints (status)")
+
+
+    @staticmethod
+    def _entry(row: Tuple) -> Dict[str, Any]:
+        wallet, metadata_id, nonce, status, tx, tx_hashes, landed_hash, block_number = row
+        return {
+            "wallet": wallet,
+            "metadata_id": metadata_id,
+            "nonce": nonce,
+            "status": status,
+            "tx": json.loads(tx),
+            "tx_hashes": json.loads(tx_hashes),
+            "landed_hash": landed_hash,
+            "block_number": block_number
+        }
+
+
+    def get(self, wallet: str, metadata_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT wallet, metadata_id, nonce, status, tx, tx_hashes, landed_hash, block_number "
+                "FROM mints WHERE wallet = ? AND metadata_id = ?",
+                (wallet.lower(), str(metadata_id))
+            ).fetchone()
+        return self._entry(row) if row is not None else None
+
+
+    def pending(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT wallet, metadata_id, nonce, status, tx, tx_hashes, landed_hash, block_number "
+                "FROM mints WHERE status = ?",
+                (MintStatus.PENDING,)
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+
+    def record(self, wallet: str, metadata_id: str, tx: Dict[str, Any], tx_hash: str) -> None:
+        """Подписанная транзакция (первая или замена) до отправки. Новый nonce означает новую попытку минта:
+        прежние хеши при этом остаются, в блок по-прежнему может войти любая из них"""
+        now = time.time()
+        wallet = wallet.lower()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tx_hashes FROM mints WHERE wallet = ? AND metadata_id = ?", (wallet, str(metadata_id))
+                ).fetchone()
+                tx_hashes = json.loads(row[0]) if row is not None else []
+                if tx_hash not in tx_hashes:
+                    tx_hashes.append(tx_hash)
+                self._conn.execute(
+                    """
+                    INSERT INTO mints (wallet, metadata_id, nonce, status, tx, tx_hashes, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (wallet, metadata_id) DO UPDATE SET
+                        nonce = excluded.nonce,
+                        status = excluded.status,
+                        tx = excluded.tx,
+                        tx_hashes = excluded.tx_hashes,
+                        landed_hash = NULL,
+                        block_number = NULL,
+                        updated_at = excluded.updated_at
+                    """,
+                    (wallet, str(metadata_id), tx["nonce"], MintStatus.PENDING, json.dumps(tx), json.dumps(tx_hashes), now, now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+    def finish(
+        self,
+        wallet: str,
+        metadata_id: str,
+        status: str,
+        landed_hash: Optional[str] = None,
+        block_number: Optional[int] = None
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE mints SET status = ?, landed_hash = ?, block_number = ?, updated_at = ? WHERE wallet = ? AND metadata_id = ?",
+                (status, landed_hash, block_number, time.time(), wallet.lower(), str(metadata_id))
+            )
+
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+async def _receipt(web3: Any, tx_hash: str) -> Optional[Dict[str, Any]]:
+    try:
+        return await web3.eth.get_transaction_receipt(tx_hash)
+    except TransactionNotFound:
+        return None
+
+
+async def reconcile(journal: MintJournal, web3: Any, entries: List[Dict[str, Any]], batch_size: int = 100) -> List[Dict[str, Any]]:
+    """Сверяет незавершенные записи с сетью: квитанции всех хешей запрашиваются параллельно пачками,
+    для записей без квитанции проверяется, занят ли их nonce. Возвращает записи с обновленным статусом"""
+    entries = [entry for entry in entries if entry["status"] == MintStatus.PENDING]
+    # Nonce запрашивается раньше квитанций: если он уже занят, квитанция вошедшей транзакции записи тоже найдется
+    wallets = list(dict.fromkeys(to_checksum_address(entry["wallet"]) for entry in entries))
+    confirmed_nonces: Dict[str, int] = {}
+    for start in range(0, len(wallets), batch_size):
+        batch = wallets[start:start + batch_size]
+        counts = await asyncio.gather(*(web3.eth.get_transaction_count(wallet, "latest") for wallet in batch))
+        confirmed_nonces.update((wallet.lower(), count) for wallet, count in zip(batch, counts))
+
+    hashes = list(dict.fromkeys(tx_hash for entry in entries for tx_hash in entry["tx_hashes"]))
+    receipts: Dict[str, Dict[str, Any]] = {}
+    for start in range(0, len(hashes), batch_size):
+        batch = hashes[start:start + batch_size]
+        for tx_hash, receipt in zip(batch, await asyncio.gather(*(_receipt(web3, tx_hash) for tx_hash in batch))):
+            if receipt is not None:
+                receipts[tx_hash] = receipt
+
+    for entry in entries:
+        landed = next((tx_hash for tx_hash in entry["tx_hashes"] if tx_hash in receipts), None)
+        if landed is not None:
+            receipt = receipts[landed]
+            entry["status"] = MintStatus.CONFIRMED if receipt["status"] == 1 else MintStatus.REVERTED
+            entry["landed_hash"] = landed
+            entry["block_number"] = receipt["blockNumber"]
+        elif confirmed_nonces[entry["wallet"]] > entry["nonce"]:
+            # Nonce занят другой транзакцией кошелька: транзакции записи в блок уже не войдут
+            entry["status"] = MintStatus.LOST
+        else:
+            continue
+        journal.finish(entry["wallet"], entry["metadata_id"], entry["status"], entry["landed_hash"], entry["block_number"])
+        logger.info(f"Журнал минтов: {entry['wallet']} / {entry['metadata_id']} -> {entry['status']}")
+
+    return entries
@@ -0,0 +1,130 @@
+import time
+import uuid
+import asyncio
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple
+from loguru import logger
+
+from observability import tracing
+
+
+class PipelineJob:
+
+    def __init__(self, account_index: int, private_key: str, proxy: Optional[str]):
+        self.account_index = account_index
+        self.private_key = private_key
+        self.proxy = proxy
+        self.run_id = uuid.uuid4().hex[:12]
+        self.context: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.trace: Optional[tracing.Trace] = None
+        self.enqueued_at = 0.0
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+    def finish(self, result: Dict[str, Any]) -> None:
+        self.result = result
+        if not self.future.done():
+            self.future.set_result(result)
+
+
+# Обработчик этапа возвращает None, чтобы передать задачу дальше,
+# или итоговый результат, чтобы завершить ее на текущем этапе
+StageHandler = Callable[[PipelineJob], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class PipelineStage:
+
+    def __init__(self, name: str, handler: StageHandler, workers: int, queue_size: int):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed
+        }
+
+
+class StagePipeline:
+    """Этапы прогона, связанные ограниченными очередями, у каждого этапа свой пул воркеров"""
+
+    def __init__(self, stages: List[Tuple[str, StageHandler, int]], queue_size: int = 100):
+        self.stages = [PipelineStage(name, handler, workers, queue_size) for name, handler, workers in stages]
+        self._workers: List[asyncio.Task] = []
+
+
+    def start(self) -> None:
+        for position, stage in enumerate(self.stages):
+            next_stage = self.stages[position + 1] if position + 1 < len(self.stages) else None
+            for worker_id in range(stage.workers):
+                self._workers.append(asyncio.create_task(
+                    self._worker(stage, next_stage),
+                    name=f"pipeline-{stage.name}-{worker_id}"
+                ))
+
+        logger.info("Конвейер запущен: " + ", ".join(f"{stage.name}={stage.workers}" for stage in self.stages))
+
+
+    async def submit(self, job: PipelineJob) -> Dict[str, Any]:
+        """Ставит задачу в первую очередь (ожидая свободного места) и ждет ее результата"""
+        job.enqueued_at = time.perf_counter()
+        await self.stages[0].queue.put(job)
+        return await job.future
+
+
+    async def _worker(self, stage: PipelineStage, next_stage: Optional[PipelineStage]) -> None:
+        while True:
+            job = await stage.queue.get()
+            stage.in_flight += 1
+            try:
+                with logger.contextualize(account_index=job.account_index, run_id=job.run_id, stage=stage.name), \
+                        tracing.activate(job.trace):
+                    if job.trace is not None:
+                        # Ожидание в очереди видно на таймлайне отдельным спаном
+                        waited = job.trace.open_span(f"queue {stage.name}", job.trace.root.span_id, {})
+                        waited.start -= time.perf_counter() - job.enqueued_at
+                        job.trace.close_span(waited)
+                    with tracing.span(f"stage {stage.name}"):
+                        result = await stage.handler(job)
+            except Exception as e:
+                logger.error(f"Аккаунт #{job.account_index+1}: Ошибка на этапе {stage.name}: {e}")
+                result = {"success": False, "error": str(e), "stage": stage.name}
+            finally:
+                stage.in_flight -= 1
+                stage.queue.task_done()
+
+            if result is None and next_stage is None:
+                result = {"success": False, "error": f"Этап {stage.name} не вернул результат"}
+
+            if result is not None:
+                stage.processed += 1
+                if not result.get("success", False):
+                    stage.failed += 1
+                job.finish(result)
+                continue
+
+            stage.processed += 1
+            job.enqueued_at = time.perf_counter()
+            # put блокирует воркер, пока следующий этап перегружен - так работает обратное давление
+            await next_stage.queue.put(job)
+
+
+    def metrics(self) -> Dict[str, Dict[str, int]]:
+        return {stage.name: stage.metrics() for stage in self.stages}
+
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
@@ -0,0 +1,80 @@
+import os
+import json
+import time
+import threading
+from typing import Dict, List, Any, Optional
+from loguru import logger
+
+
+class PointsTracker:
+    """Запоминает заклеймленные балансы поинтов и предсказывает, когда кошелек накопит нужное количество"""
+
+    def __init__(self, points_dir: str = "files/points", required_points: int = 40, history_size: int = 10):
+        self.points_dir = points_dir
+        self.required_points = required_points
+        self.history_size = history_size
+        self._lock = threading.Lock()
+        self._wallets: Dict[str, Dict[str, Any]] = {}
+        os.makedirs(self.points_dir, exist_ok=True)
+
+
+    def _path(self, wallet: str) -> str:
+        return os.path.join(self.points_dir, f"{wallet}.json")
+
+
+    def _record(self, wallet: str) -> Dict[str, Any]:
+        if wallet not in self._wallets:
+            record = {"observations": [], "rate": None}
+            path = self._path(wallet)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        record = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    logger.error(f"Ошибка при чтении истории поинтов {path}: {e}")
+            self._wallets[wallet] = record
+        return self._wallets[wallet]
+
+
+    def observe(self, wallet: str, points: int, spent: int = 0, timestamp: Optional[float] = None) -> None:
+        """Сохраняет баланс после клейма; spent - сколько поинтов потрачено в этом же прогоне"""
+        timestamp = timestamp or time.time()
+        wallet = wallet.lower()
+
+        with self._lock:
+            record = self._record(wallet)
+            observations: List[List[float]] = record["observations"]
+
+            if observations:
+                last_time, last_points = observations[-1]
+                # Скорость начисления считаем только по интервалам без трат
+                if points > last_points and timestamp > last_time:
+                    rate = (points - last_points) / (timestamp - last_time)
+                    record["rate"] = rate if record["rate"] is None else (record["rate"] + rate) / 2
+
+            observations.append([timestamp, points - spent])
+            del observations[:-self.history_size]
+
+            path = self._path(wallet)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+
+
+    def predict_ready_at(self, wallet: str) -> Optional[float]:
+        """Время, когда баланс достигнет порога, или None, если данных для прогноза нет"""
+        with self._lock:
+            record = self._record(wallet.lower())
+            if not record["observations"]:
+                return None
+
+            last_time, last_points = record["observations"][-1]
+            if last_points >= self.required_points:
+                return last_time
+
+            rate = record["rate"]
+            if not rate:
+                return None
+
+            return last_time + (self.required_points - last_points) / rate
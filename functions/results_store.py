@@ -0,0 +1,340 @@
+import os
+import sys
+import json
+import time
+import queue
+import sqlite3
+import argparse
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+from loguru import logger
+
+
+COLUMNS = [
+    "finished_at", "day", "account_index", "wallet", "run_id", "outcome", "stage", "error", "skip_reason",
+    "resumed_from", "prompt", "seed", "image_url", "transaction_hash", "block_number", "token_id",
+    "ip_id", "gas_used", "effective_gas_price", "current_points", "points_spent", "metadata"
+]
+
+
+def _outcome(result: Dict[str, Any]) -> str:
+    if result.get("skip_reason"):
+        return "skipped"
+    return "success" if result.get("success", False) else "failed"
+
+
+def result_row(account_index: int, result: Dict[str, Any], run_id: Optional[str] = None,
+               finished_at: Optional[float] = None) -> Tuple:
+    finished_at = finished_at or time.time()
+    image = result.get("image") or {}
+    blockchain = result.get("blockchain") or {}
+    metadata = result.get("metadata")
+
+    return (
+        finished_at,
+        time.strftime("%Y-%m-%d", time.localtime(finished_at)),
+        account_index,
+        result.get("wallet"),
+        run_id,
+        _outcome(result),
+        result.get("stage"),
+        result.get("error"),
+        result.get("skip_reason"),
+        result.get("resumed_from"),
+        image.get("prompt"),
+        image.get("seed"),
+        image.get("url"),
+        blockchain.get("transaction_hash"),
+        blockchain.get("block_number"),
+        None if blockchain.get("token_id") is None else str(blockchain["token_id"]),
+        blockchain.get("ip_id"),
+        blockchain.get("gas_used"),
+        blockchain.get("effective_gas_price"),
+        result.get("current_points"),
+        result.get("points_spent"),
+        None if metadata is None else json.dumps(metadata, ensure_ascii=False, default=str)
+    )
+
+
+class ResultsStore:
+    """Копит итоги прогонов в памяти и пишет их в SQLite пачками из фонового потока"""
+
+    def __init__(self, db_path: str, batch_size: int = 100, flush_interval: float = 5):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._conn = connect(db_path)
+        self._writer = threading.Thread(target=self._write_loop, name="results-writer", daemon=True)
+        self._writer.start()
+
+
+    def record(self, account_index: int, result: Dict[str, Any], run_id: Optional[str] = None) -> None:
+        self._queue.put(result_row(account_index, result, run_id))
+
+
+    def _take_batch(self) -> List[Tuple]:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+
+    def _drain(self) -> List[Tuple]:
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+
+    def _write(self, batch: List[Tuple]) -> None:
+        if not batch:
+            return
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    batch
+                )
+            logger.debug(f"Записано результатов прогонов: {len(batch)}")
+        except sqlite3.Error as e:
+            logger.error(f"Не удалось записать {len(batch)} результатов в {self.db_path}: {e}")
+
+
+    def _write_loop(self) -> None:
+        while not self._stop.is_set():
+            self._write(self._take_batch())
+        self._write(self._drain())
+
+
+    def close(self, timeout: float = 10) -> None:
+        """Дописывает накопленные записи и закрывает базу"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._writer.join(timeout=timeout)
+        self._conn.close()
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    # Несколько процессов пишут в одну базу: WAL не блокирует чтение на время записи
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            finished_at REAL NOT NULL,
+            day TEXT NOT NULL,
+            account_index INTEGER,
+            wallet TEXT,
+            run_id TEXT,
+            outcome TEXT NOT NULL,
+            stage TEXT,
+            error TEXT,
+            skip_reason TEXT,
+            resumed_from TEXT,
+            prompt TEXT,
+            seed INTEGER,
+            image_url TEXT,
+            transaction_hash TEXT,
+            block_number INTEGER,
+            token_id TEXT,
+            ip_id TEXT,
+            gas_used INTEGER,
+            effective_gas_price INTEGER,
+            current_points INTEGER,
+            points_spent INTEGER,
+            metadata TEXT
+        )
+    """)
+    # Базы, созданные до появления колонки
+    if "ip_id" not in {row[1] for row in conn.execute("PRAGMA table_info(runs)")}:
+        conn.execute("ALTER TABLE runs ADD COLUMN ip_id TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_wallet ON runs (wallet, finished_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_transaction ON runs (transaction_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_day ON runs (day, outcome)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_outcome ON runs (outcome, finished_at)")
+    return conn
+
+
+def _since_day(days: int) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(time.time() - (days - 1) * 86400))
+
+
+def success_rate(conn: sqlite3.Connection, days: int = 7) -> Dict[str, Any]:
+    counts = dict(conn.execute(
+        "SELECT outcome, COUNT(*) FROM runs WHERE day >= ? GROUP BY outcome", (_since_day(days),)
+    ).fetchall())
+    attempted = counts.get("success", 0) + counts.get("failed", 0)
+    return {
+        "days": days,
+        "success": counts.get("success", 0),
+        "failed": counts.get("failed", 0),
+        "skipped": counts.get("skipped", 0),
+        "success_rate": counts.get("success", 0) / attempted if attempted else None
+    }
+
+
+def mints_per_day(conn: sqlite3.Connection, days: int = 7) -> List[Tuple]:
+    return conn.execute(
+        """
+        SELECT day,
+               SUM(outcome = 'success') AS mints,
+               SUM(outcome = 'failed') AS failed,
+               SUM(outcome = 'skipped') AS skipped,
+               COALESCE(SUM(gas_used), 0) AS gas_used
+        FROM runs WHERE day >= ?
+        GROUP BY day ORDER BY day
+        """,
+        (_since_day(days),)
+    ).fetchall()
+
+
+def gas_per_wallet(conn: sqlite3.Connection, days: int = 7, top: int = 20) -> List[Tuple]:
+    return conn.execute(
+        """
+        SELECT wallet,
+               SUM(outcome = 'success') AS mints,
+               COALESCE(SUM(gas_used), 0) AS gas_used,
+               COALESCE(SUM(gas_used * effective_gas_price), 0) / 1e18 AS fee
+        FROM runs WHERE day >= ? AND wallet IS NOT NULL
+        GROUP BY wallet ORDER BY gas_used DESC LIMIT ?
+        """,
+        (_since_day(days), top)
+    ).fetchall()
+
+
+def export(conn: sqlite3.Connection, path: str, days: Optional[int] = None) -> int:
+    """Выгружает прогоны в JSONL или Parquet (по расширению файла). Возвращает число записей"""
+    query, params = "SELECT * FROM runs", ()
+    if days:
+        query, params = "SELECT * FROM runs WHERE day >= ?", (_since_day(days),)
+    query += " ORDER BY id"
+
+    if path.endswith(".parquet"):
+        import pandas as pd
+        frame = pd.read_sql_query(query, conn, params=params)
+        frame.to_parquet(path, index=False)
+        return len(frame)
+
+    cursor = conn.execute(query, params)
+    names = [column[0] for column in cursor.description]
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in cursor:
+            f.write(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def backfill_mints(conn: sqlite3.Connection, rpc_url: Optional[str] = None, block_chunk: int = 10_000) -> int:
+    """Заполняет token_id и ip_id успешных минтов, у которых их нет, из логов сети: один проход eth_getLogs
+    по всем таким кошелькам в диапазоне их блоков. Возвращает число обновленных записей"""
+    import asyncio
+    import dataclasses
+    from evm.events import fetch_mints
+    from evm.networks import Networks
+    from evm.provider_pool import provider_pool
+    from tasks.blockchain import SPG_NFT_CONTRACT
+
+    wallets, from_block, to_block = [], None, None
+    for wallet, first_block, last_block in conn.execute("""
+        SELECT wallet, MIN(block_number), MAX(block_number) FROM runs
+        WHERE outcome = 'success' AND block_number IS NOT NULL AND wallet IS NOT NULL
+          AND (token_id IS NULL OR ip_id IS NULL)
+        GROUP BY wallet
+    """):
+        wallets.append(wallet)
+        from_block = first_block if from_block is None else min(from_block, first_block)
+        to_block = last_block if to_block is None else max(to_block, last_block)
+    if not wallets:
+        return 0
+
+    network = Networks.STORY
+    if rpc_url:
+        network = dataclasses.replace(network, rpc_url=rpc_url, rpc_urls=[rpc_url], write_rpc_urls=[])
+    web3, _ = provider_pool.web3(network)
+
+    async def fetch():
+        try:
+            return await fetch_mints(web3, SPG_NFT_CONTRACT, wallets, from_block, to_block, block_chunk)
+        finally:
+            await provider_pool.close_loop_sessions()
+
+    updated = 0
+    with conn:
+        for mint in asyncio.run(fetch()):
+            updated += conn.execute(
+                "UPDATE runs SET token_id = ?, ip_id = ? WHERE transaction_hash = ?",
+                (str(mint.token_id), mint.ip_id, mint.transaction_hash)
+            ).rowcount
+    return updated
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="История прогонов: доля успехов, минты по дням, газ по кошелькам")
+    parser.add_argument("--db", default="files/results.db", help="база результатов")
+    parser.add_argument("--days", type=int, help="за сколько последних дней (по умолчанию 7, export - вся история)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("summary", help="доля успешных прогонов")
+    subparsers.add_parser("daily", help="минты и газ по дням")
+    gas_parser = subparsers.add_parser("gas", help="газ по кошелькам")
+    gas_parser.add_argument("--top", type=int, default=20, help="сколько кошельков показать")
+    export_parser = subparsers.add_parser("export", help="выгрузка в .jsonl или .parquet")
+    export_parser.add_argument("path", help="файл для выгрузки")
+    backfill_parser = subparsers.add_parser("backfill", help="token id и IP id минтов из логов сети")
+    backfill_parser.add_argument("--rpc-url", help="RPC вместо RPC сети по умолчанию")
+    backfill_parser.add_argument("--block-chunk", type=int, default=10_000, help="блоков в одном запросе eth_getLogs")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"База {args.db} не найдена")
+        return 1
+
+    # Выгрузка без --days - вся история, отчеты - последняя неделя
+    days = args.days if args.command == "export" else args.days or 7
+    conn = connect(args.db) if args.command == "backfill" else sqlite3.connect(args.db)
+    try:
+        if args.command == "summary":
+            stats = success_rate(conn, days)
+            rate = "-" if stats["success_rate"] is None else f"{stats['success_rate'] * 100:.1f}%"
+            print(f"За {days} дн.: успешно {stats['success']}, с ошибкой {stats['failed']}, "
+                  f"пропущено {stats['skipped']}, доля успехов {rate}")
+        elif args.command == "daily":
+            print(f"{'день':<12}{'минты':>8}{'ошибки':>8}{'пропуски':>10}{'газ':>14}")
+            for day, mints, failed, skipped, gas_used in mints_per_day(conn, days):
+                print(f"{day:<12}{mints:>8}{failed:>8}{skipped:>10}{gas_used:>14}")
+        elif args.command == "gas":
+            print(f"{'кошелек':<44}{'минты':>8}{'газ':>14}{'комиссия':>14}")
+            for wallet, mints, gas_used, fee in gas_per_wallet(conn, days, args.top):
+                print(f"{wallet:<44}{mints:>8}{gas_used:>14}{fee:>14.6f}")
+        elif args.command == "backfill":
+            print(f"Обновлено записей: {backfill_mints(conn, args.rpc_url, args.block_chunk)}")
+        elif args.command == "export":
+            try:
+                print(f"Выгружено записей: {export(conn, args.path, days)} -> {args.path}")
+            except ImportError as e:
+                print(f"Для выгрузки в Parquet установите pyarrow: {e}")
+                return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import datetime
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+WEI = 10 ** 18
+
+
+def _day(timestamp: Optional[float] = None) -> str:
+    return time.strftime("%Y-%m-%d", time.localtime(timestamp or time.time()))
+
+
+def _since_day(days: int) -> str:
+    return _day(time.time() - (days - 1) * 86400)
+
+
+def _hex(value: Any) -> str:
+    return value.hex() if isinstance(value, (bytes, bytearray)) else str(value)
+
+
+class SpendLedger:
+    """Расходы на газ по транзакциям из квитанций: газ, фактическая цена газа, value. Итоги по кошельку за день
+    и по дню пересчитываются при каждой записи, поэтому проверка бюджета не суммирует всю историю"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._conn = connect(db_path)
+
+
+    def record(self, wallet: str, receipt: Dict[str, Any], value: int = 0, timestamp: Optional[float] = None) -> bool:
+        """Учитывает транзакцию по квитанции. Возвращает False, если она уже учтена (та же квитанция пришла повторно)"""
+        timestamp = timestamp or time.time()
+        wallet = wallet.lower()
+        day = _day(timestamp)
+        gas_used = int(receipt["gasUsed"])
+        gas_price = int(receipt.get("effectiveGasPrice") or 0)
+        fee = gas_used * gas_price
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                inserted = self._conn.execute(
+                    """
+                    INSERT OR IGNORE INTO spend (tx_hash, wallet, day, block_number, status, gas_used, gas_price, fee, value, recorded_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (_hex(receipt["transactionHash"]), wallet, day, receipt.get("blockNumber"), receipt.get("status"),
+                     gas_used, gas_price, fee, value, timestamp)
+                ).rowcount
+                if inserted:
+                    for table, key_columns, key in (
+                        ("spend_wallet_day", "wallet, day", (wallet, day)),
+                        ("spend_day", "day", (day,))
+                    ):
+                        self._conn.execute(
+                            f"""
+                            INSERT INTO {table} ({key_columns}, transactions, gas_used, fee, value)
+                            VALUES ({', '.join('?' * len(key))}, 1, ?, ?, ?)
+                            ON CONFLICT ({key_columns}) DO UPDATE SET
+                                transactions = transactions + 1,
+                                gas_used = gas_used + excluded.gas_used,
+                                fee = fee + excluded.fee,
+                                value = value + excluded.value
+                            """,
+                            (*key, gas_used, fee, value)
+                        )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return bool(inserted)
+
+
+    def wallet_spent(self, wallet: str, day: Optional[str] = None) -> int:
+        """Комиссии и value кошелька за день в wei"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fee + value FROM spend_wallet_day WHERE wallet = ? AND day = ?", (wallet.lower(), day or _day())
+            ).fetchone()
+        return int(row[0]) if row is not None else 0
+
+
+    def fleet_spent(self, day: Optional[str] = None) -> int:
+        """Комиссии и value всех кошельков за день в wei"""
+        with self._lock:
+            row = self._conn.execute("SELECT fee + value FROM spend_day WHERE day = ?", (day or _day(),)).fetchone()
+        return int(row[0]) if row is not None else 0
+
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS spend (
+            tx_hash TEXT PRIMARY KEY,
+            wallet TEXT NOT NULL,
+            day TEXT NOT NULL,
+            block_number INTEGER,
+            status INTEGER,
+            gas_used INTEGER NOT NULL,
+            gas_price INTEGER NOT NULL,
+            fee INTEGER NOT NULL,
+            value INTEGER NOT NULL,
+            recorded_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    # Суммы в итогах REAL: за день по всему парку они могут не поместиться в INTEGER (больше 9.2 * 10^18 wei)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS spend_wallet_day (
+            wallet TEXT NOT NULL,
+            day TEXT NOT NULL,
+            transactions INTEGER NOT NULL,
+            gas_used INTEGER NOT NULL,
+            fee REAL NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (wallet, day)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS spend_day (
+            day TEXT PRIMARY KEY,
+            transactions INTEGER NOT NULL,
+            gas_used INTEGER NOT NULL,
+            fee REAL NOT NULL,
+            value REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_spend_wallet_day_day ON spend_wallet_day (day)")
+    return conn
+
+
+class GasBudget:
+    """Дневные лимиты расходов (в wei; 0 - без лимита) и потолок цены газа для новых минтов"""
+
+    def __init__(self, ledger: SpendLedger, wallet_daily: int = 0, fleet_daily: int = 0, max_gas_price: int = 0):
+        self.ledger = ledger
+        self.wallet_daily = wallet_daily
+        self.fleet_daily = fleet_daily
+        self.max_gas_price = max_gas_price
+
+
+    @classmethod
+    def from_config(cls, ledger: SpendLedger, config: Dict[str, Any]) -> "GasBudget":
+        return cls(
+            ledger,
+            wallet_daily=int(config.get("wallet_daily", 0) * WEI),
+            fleet_daily=int(config.get("fleet_daily", 0) * WEI),
+            max_gas_price=int(config.get("max_gas_price_gwei", 0) * 10 ** 9)
+        )
+
+
+    def exceeded(self, wallet: str) -> Optional[str]:
+        """Причина паузы кошелька до конца дня или None, если дневные лимиты не исчерпаны"""
+        if self.wallet_daily and self.ledger.wallet_spent(wallet) >= self.wallet_daily:
+            return f"дневной лимит кошелька {self.wallet_daily / WEI:g} исчерпан"
+        if self.fleet_daily and self.ledger.fleet_spent() >= self.fleet_daily:
+            return f"дневной лимит всех кошельков {self.fleet_daily / WEI:g} исчерпан"
+        return None
+
+
+    def gas_price_too_high(self, gas_price: int) -> bool:
+        return bool(self.max_gas_price) and gas_price > self.max_gas_price
+
+
+    @staticmethod
+    def resume_at(now: Optional[float] = None) -> float:
+        """Начало следующего дня: дневные лимиты считаются по локальной дате"""
+        tomorrow = datetime.date.fromtimestamp(now or time.time()) + datetime.timedelta(days=1)
+        return time.mktime(tomorrow.timetuple())
+
+
+def spend_per_day(conn: sqlite3.Connection, days: int = 7) -> List[Tuple]:
+    return conn.execute(
+        "SELECT day, transactions, gas_used, fee / 1e18, value / 1e18 FROM spend_day WHERE day >= ? ORDER BY day",
+        (_since_day(days),)
+    ).fetchall()
+
+
+def spend_per_wallet(conn: sqlite3.Connection, days: int = 7, top: int = 20) -> List[Tuple]:
+    return conn.execute(
+        """
+        SELECT wallet, SUM(transactions), SUM(gas_used), SUM(fee) / 1e18, SUM(value) / 1e18
+        FROM spend_wallet_day WHERE day >= ?
+        GROUP BY wallet ORDER BY SUM(fee) DESC LIMIT ?
+        """,
+        (_since_day(days), top)
+    ).fetchall()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Расходы на газ: по дням и по кошелькам")
+    parser.add_argument("--db", default="files/spend.db", help="база расходов")
+    parser.add_argument("--days", type=int, default=7, help="за сколько последних дней")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("daily", help="расходы по дням")
+    wallets_parser = subparsers.add_parser("wallets", help="расходы по кошелькам")
+    wallets_parser.add_argument("--top", type=int, default=20, help="сколько кошельков показать")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"База {args.db} не найдена")
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "daily":
+            print(f"{'день':<12}{'транзакции':>12}{'газ':>14}{'комиссия':>14}{'value':>14}")
+            for day, transactions, gas_used, fee, value in spend_per_day(conn, args.days):
+                print(f"{day:<12}{transactions:>12}{gas_used:>14}{fee:>14.6f}{value:>14.6f}")
+        elif args.command == "wallets":
+            print(f"{'кошелек':<44}{'транзакции':>12}{'газ':>14}{'комиссия':>14}{'value':>14}")
+            for wallet, transactions, gas_used, fee, value in spend_per_wallet(conn, args.days, args.top):
+                print(f"{wallet:<44}{transactions:>12}{gas_used:>14}{fee:>14.6f}{value:>14.6f}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import bisect
+import hashlib
+import queue
+import signal
+import threading
+import time
+import multiprocessing
+from typing import Dict, List, Any, Optional
+from loguru import logger
+
+
+class HashRing:
+    """Консистентное хеширование: при изменении числа процессов переезжает лишь малая часть кошельков"""
+
+    def __init__(self, nodes: List[int], replicas: int = 100, salt: str = ""):
+        # Соль дает уровню разбиения свое хеш-пространство: иначе вложенное разбиение на том же кольце
+        # отдает почти весь шард одному процессу
+        self._salt = salt
+        self._ring: List[int] = []
+        self._owners: Dict[int, int] = {}
+
+        for node in nodes:
+            for replica in range(replicas):
+                point = self._hash(f"{node}:{replica}")
+                self._owners[point] = node
+                bisect.insort(self._ring, point)
+
+
+    def _hash(self, key: str) -> int:
+        return int.from_bytes(hashlib.md5(f"{self._salt}{key}".encode()).digest()[:8], "big")
+
+
+    def get_node(self, key: str) -> int:
+        position = bisect.bisect(self._ring, self._hash(key)) % len(self._ring)
+        return self._owners[self._ring[position]]
+
+
+def shard_accounts(accounts: List[Dict[str, Any]], processes: int, salt: str = "") -> List[List[Dict[str, Any]]]:
+    ring = HashRing(list(range(processes)), salt=salt)
+    shards: List[List[Dict[str, Any]]] = [[] for _ in range(processes)]
+
+    for i, account in enumerate(accounts):
+        account = dict(account)
+        account.setdefault("index", i)
+        private_key = str(account.get("private_key", "")).strip().lower()
+        shards[ring.get_node(private_key)].append(account)
+
+    return shards
+
+
+# Изменения состояния кошельков, которые рабочий процесс пересылает в FleetState панели родительского процесса
+FLEET_EVENTS = ("set_status", "scheduled", "run_started", "run_finished")
+
+
+class FleetForwarder:
+    """FleetState рабочего процесса: каждое изменение состояния кошелька применяется локально
+    и уходит в очередь событий supervisor. Итог обычного прогона приходит событием result и сюда не попадает:
+    обработчик результатов держит ссылку на локальный FleetState"""
+
+    def __init__(self, fleet, events: multiprocessing.Queue, worker_id: int):
+        self.fleet = fleet
+        self.events = events
+        self.worker_id = worker_id
+
+
+    def _forward(self, method: str, *args: Any) -> None:
+        getattr(self.fleet, method)(*args)
+        self.events.put(("fleet", self.worker_id, {"method": method, "args": args}))
+
+
+    def set_status(self, account_index: int, status: str) -> None:
+        self._forward("set_status", account_index, status)
+
+
+    def scheduled(self, account_index: int, run_at: float) -> None:
+        self._forward("scheduled", account_index, run_at)
+
+
+    def run_started(self, account_index: int, proxy: Optional[str]) -> None:
+        self._forward("run_started", account_index, proxy)
+
+
+    def run_finished(self, account_index: int, result: Dict[str, Any]) -> None:
+        self._forward("run_finished", account_index, result)
+
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.fleet, name)
+
+
+def _worker_main(
+    worker_id: int,
+    files_dir: str,
+    config: Dict[str, Any],
+    accounts: List[Dict[str, Any]],
+    events: multiprocessing.Queue,
+    stop_event,
+    metrics_interval: float
+) -> None:
+    from functions.logger_setup import setup_logging
+    from functions.config_manager import ConfigManager
+    from functions.account_manager import AccountManager
+    from observability.metrics import start_metrics_server
+
+    logging_config = config.get("logging", {})
+    setup_logging(
+        files_dir,
+        f"app.worker{worker_id}.log",
+        structured=logging_config.get("structured", False),
+        level=logging_config.get("level", "INFO"),
+        rate_limit=logging_config.get("rate_limit")
+    )
+
+    metrics_config = config.get("metrics", {})
+    if metrics_config.get("enabled", False):
+        # Каждый процесс отдает свои метрики на отдельном порту: port + 1 + номер процесса
+        start_metrics_server(metrics_config.get("port", 9108) + 1 + worker_id, metrics_config.get("host", "127.0.0.1"))
+
+    config_manager = ConfigManager(files_dir)
+    config_manager.config = dict(config, pipeline=dict(config.get("pipeline", {}), enabled=True))
+    config_manager.accounts = accounts
+
+    account_manager = AccountManager(config_manager)
+    account_manager.fleet = FleetForwarder(account_manager.fleet, events, worker_id)
+    # Ctrl+C и SIGTERM (systemd шлет его всей группе процессов) обрабатывает только родительский процесс,
+    # он же просит процессы завершить текущие прогоны
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    def on_result(account_index: int, result: Dict[str, Any]) -> None:
+        events.put(("result", worker_id, {
+            "account_index": account_index,
+            "success": result.get("success", False),
+            "skip_reason": result.get("skip_reason"),
+            "error": result.get("error"),
+            "transaction_hash": result.get("blockchain", {}).get("transaction_hash")
+        }))
+
+    account_manager.result_callbacks.append(on_result)
+
+    def watch_stop() -> None:
+        last_metrics = time.time()
+        while not stop_event.wait(1):
+            if time.time() - last_metrics >= metrics_interval and account_manager.pipeline is not None:
+                last_metrics = time.time()
+                events.put(("metrics", worker_id, account_manager.pipeline.metrics()))
+        account_manager.shutdown_event.set()
+
+    threading.Thread(target=watch_stop, daemon=True).start()
+
+    logger.info(f"Процесс #{worker_id}: запуск для {len(accounts)} аккаунтов")
+    events.put(("started", worker_id, {"accounts": len(accounts)}))
+    account_manager.pipeline_loop()
+    account_manager.close()
+    events.put(("stopped", worker_id, {}))
+
+
+class Supervisor:
+    """Распределяет аккаунты по N процессам, в каждом свой асинхронный конвейер"""
+
+    def __init__(self, account_manager, processes: int):
+        self.account_manager = account_manager
+        self.processes = processes
+        self.metrics_interval = account_manager.pipeline_config.get("metrics_interval_seconds", 60)
+        self._context = multiprocessing.get_context("spawn")
+        self._events = self._context.Queue()
+        self._stop_event = self._context.Event()
+        self._workers: List[multiprocessing.Process] = []
+        self.stats: Dict[int, Dict[str, Any]] = {}
+        self.stats_lock = threading.Lock()
+
+
+    def start(self) -> None:
+        shards = shard_accounts(self.account_manager.accounts, self.processes)
+
+        for worker_id, shard in enumerate(shards):
+            if not shard:
+                continue
+
+            self.stats[worker_id] = {"accounts": len(shard), "success": 0, "failed": 0, "skipped": 0, "pipeline": {}}
+            process = self._context.Process(
+                target=_worker_main,
+                args=(
+                    worker_id,
+                    self.account_manager.config_manager.files_dir,
+                    self.account_manager.config,
+                    shard,
+                    self._events,
+                    self._stop_event,
+                    self.metrics_interval
+                ),
+                name=f"mahojin-worker-{worker_id}",
+                daemon=True
+            )
+            process.start()
+            self._workers.append(process)
+
+        logger.info(f"Запущено процессов: {len(self._workers)}, распределение: {[len(shard) for shard in shards]}")
+        print(f"\033[92mЗапущено процессов: {len(self._workers)}\033[0m")
+
+
+    def _handle_event(self, kind: str, worker_id: int, payload: Dict[str, Any]) -> None:
+        with self.stats_lock:
+            stats = self.stats.setdefault(worker_id, {"success": 0, "failed": 0, "skipped": 0, "pipeline": {}})
+
+            if kind == "result":
+                if payload.get("skip_reason"):
+                    stats["skipped"] += 1
+                elif payload.get("success"):
+                    stats["success"] += 1
+                else:
+                    stats["failed"] += 1
+                self.account_manager.notify_result(payload["account_index"], payload)
+            elif kind == "fleet" and payload["method"] in FLEET_EVENTS:
+                getattr(self.account_manager.fleet, payload["method"])(*payload["args"])
+            elif kind == "metrics":
+                stats["pipeline"] = payload
+            elif kind == "stopped":
+                logger.info(f"Процесс #{worker_id} завершил работу")
+
+
+    def run(self) -> None:
+        self.start()
+        last_report = time.time()
+
+        try:
+            while not self.account_manager.shutdown_event.is_set():
+                try:
+                    kind, worker_id, payload = self._events.get(timeout=1)
+                    self._handle_event(kind, worker_id, payload)
+                except queue.Empty:
+                    pass
+
+                if not any(worker.is_alive() for worker in self._workers):
+                    logger.warning("Все рабочие процессы завершились")
+                    break
+
+                if time.time() - last_report >= self.metrics_interval:
+                    last_report = time.time()
+                    with self.stats_lock:
+                        logger.info(f"Метрики процессов: {self.stats}")
+        finally:
+            self.stop()
+
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop_event.set()
+        if timeout is None:
+            # Процессам нужно время на завершение текущих прогонов и запуск интерпретатора при остановке
+            timeout = self.account_manager.drain_timeout + 30
+
+        # Очередь событий читается до выхода всех процессов: иначе при заполненном канале поток отправки
+        # в рабочем процессе блокируется, процесс не может завершиться, а итоги прогонов теряются
+        deadline = time.time() + timeout
+        while any(worker.is_alive() for worker in self._workers) and time.time() < deadline:
+            try:
+                kind, worker_id, payload = self._events.get(timeout=min(1, max(0.01, deadline - time.time())))
+                self._handle_event(kind, worker_id, payload)
+            except queue.Empty:
+                pass
+
+        for worker in self._workers:
+            if worker.is_alive():
+                logger.warning(f"Процесс {worker.name} не завершился вовремя, останавливаем принудительно")
+                worker.terminate()
+            worker.join()
+
+        while True:
+            try:
+                kind, worker_id, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            self._handle_event(kind, worker_id, payload)
+
+        self._workers = []
@@ -1,5 +1,3 @@
-import os
-import sys
 import threading
 from typing import Dict, Callable
 
@@ -19,7 +17,8 @@ class UIManager:
  ██║ ╚═╝ ██║██║  ██║██║  ██║╚██████╔╝╚█████╔╝██║██║ ╚████║
  ╚═╝     ╚═╝╚═╝  ╚═╝╚═╝  ╚═╝ ╚═════╝  ╚════╝ ╚═╝╚═╝  ╚═══╝
 """
-        os.system('cls' if sys.platform.startswith('win') else 'clear')
+        # ANSI очистка экрана вместо запуска отдельного процесса; в Windows ее понимает colorama
+        print("\033[H\033[2J", end="")
         
         print("\033[36m" + header + "\033[0m")
         print("\033[92m{:=^80}\033[0m".format(""))
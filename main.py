@@ -1,5 +1,5 @@
 import sys
-import time
+import argparse
 import colorama
 import signal
 from loguru import logger
@@ -8,6 +8,9 @@ from functions.logger_setup import setup_logging
 from functions.config_manager import ConfigManager
 from functions.ui_manager import UIManager
 from functions.account_manager import AccountManager
+from functions.supervisor import shard_accounts
+from functions import results_store, spend_ledger
+from observability import tracing
 
 colorama.init()
 
@@ -50,23 +53,119 @@ def exit_action(account_manager):
     """Действие при выборе пункта выхода"""
     print("\033[93mЗавершение программы...\033[0m")
     account_manager.shutdown_event.set()
+    account_manager.close()
 
 
-def main():
-    setup_logging()
-    logger.info("Запуск программы")
+def apply_overrides(config_manager, args):
+    """Параметры командной строки поверх config.json"""
+    config = config_manager.config
     
-    def global_signal_handler(sig, frame):
-        logger.info("Получен сигнал прерывания на уровне main")
-        print("\n\033[93mПрограмма завершена пользователем (Ctrl+C)\033[0m")
-        sys.exit(0)
+    if args.processes is not None:
+        config["processes"] = args.processes
+    if args.pipeline:
+        config["pipeline"] = dict(config.get("pipeline", {}), enabled=True)
+    if args.drain_timeout is not None:
+        config["drain_timeout_seconds"] = args.drain_timeout
+    if args.no_dashboard:
+        config["dashboard"] = dict(config.get("dashboard", {}), enabled=False)
+    if args.structured_logs:
+        config["logging"] = dict(config.get("logging", {}), structured=True)
+    if args.log_level:
+        config["logging"] = dict(config.get("logging", {}), level=args.log_level)
+    
+    if args.shard:
+        index, count = args.shard
+        # Консистентный хеш со своей солью: при изменении числа шардов переезжает мало кошельков,
+        # а разбиение шарда между процессами остается равномерным
+        config_manager.accounts = shard_accounts(config_manager.accounts, count, salt="shard:")[index]
+        logger.info(f"Шард {index}/{count}: {len(config_manager.accounts)} аккаунтов")
+
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("ожидается формат N/M, например 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("номер шарда должен быть от 0 до M-1")
+    return index, count
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Генератор и минтер изображений Mahojin AI")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    run_parser = subparsers.add_parser("run", help="запуск без интерактивного меню (для systemd и серверов)")
+    run_parser.add_argument("--files-dir", default="files", help="каталог с данными программы")
+    run_parser.add_argument("--config", help="путь к config.json")
+    run_parser.add_argument("--accounts", help="путь к accounts.csv")
+    run_parser.add_argument("--processes", type=int, help="число рабочих процессов")
+    run_parser.add_argument("--pipeline", action="store_true", help="конвейерный режим в одном процессе")
+    run_parser.add_argument("--shard", type=parse_shard, help="запускать только шард N из M (формат N/M)")
+    run_parser.add_argument("--drain-timeout", type=float, help="сколько секунд ждать текущие прогоны при остановке")
+    run_parser.add_argument("--no-dashboard", action="store_true", help="не показывать панель в терминале")
+    run_parser.add_argument("--structured-logs", action="store_true", help="писать лог в JSONL")
+    run_parser.add_argument("--log-level", help="уровень логирования (INFO, DEBUG, ...)")
+    
+    # Аргументы этих команд разбирают сами модули, см. main()
+    subparsers.add_parser("traces", help="отчет по самым медленным прогонам", add_help=False)
+    subparsers.add_parser("results", help="история прогонов", add_help=False)
+    subparsers.add_parser("spend", help="расходы на газ", add_help=False)
+    
+    return parser
+
+
+def setup_configured_logging(config_manager):
+    logging_config = config_manager.config.get("logging", {})
+    setup_logging(
+        config_manager.files_dir,
+        structured=logging_config.get("structured", False),
+        level=logging_config.get("level", "INFO"),
+        rate_limit=logging_config.get("rate_limit")
+    )
+
+
+def run_headless(args):
+    config_manager = ConfigManager(args.files_dir, config_path=args.config, accounts_path=args.accounts)
+    apply_overrides(config_manager, args)
+    setup_configured_logging(config_manager)
+    logger.info("Запуск без интерактивного меню")
+    
+    account_manager = AccountManager(config_manager)
+    signal.signal(signal.SIGINT, account_manager.signal_handler)
+    signal.signal(signal.SIGTERM, account_manager.signal_handler)
     
-    signal.signal(signal.SIGINT, global_signal_handler)
+    is_valid, errors = account_manager.validate_accounts()
+    if not is_valid:
+        for error in errors:
+            logger.error(error)
+            print(f"\033[91m - {error}\033[0m")
+        return 2
     
+    try:
+        account_manager.start_tasks()
+    except KeyboardInterrupt:
+        logger.warning("Ожидание текущих прогонов прервано")
+    finally:
+        account_manager.close()
+        logger.info("Программа завершена")
+        logger.complete()
+    return 0
+
+
+def run_interactive():
+    setup_logging()
+    logger.info("Запуск программы")
+    
+    account_manager = None
     try:
         config_manager = ConfigManager()
+        setup_configured_logging(config_manager)
         ui_manager = UIManager(config_manager)
         account_manager = AccountManager(config_manager)
+        # Один обработчик на оба сигнала: во время работы он останавливает прогоны, в меню завершает программу
+        signal.signal(signal.SIGINT, account_manager.signal_handler)
+        signal.signal(signal.SIGTERM, account_manager.signal_handler)
         
         action_handlers = {
             'validate': lambda: validate_action(account_manager),
@@ -78,15 +177,33 @@ def main():
     except KeyboardInterrupt:
         logger.info("Программа остановлена пользователем")
         print("\n\033[93mПрограмма завершена пользователем (Ctrl+C)\033[0m")
-        sys.exit(0)
     except Exception as e:
         logger.exception(f"Необработанная ошибка: {e}")
         print(f"\n\033[91mНеобработанная ошибка: {e}\033[0m")
-        sys.exit(1)
+        return 1
     finally:
+        if account_manager is not None:
+            account_manager.close()
         logger.info("Программа завершена")
         print("\033[93mПрограмма завершена\033[0m")
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    
+    if argv and argv[0] == "traces":
+        return tracing.main(argv[1:])
+    if argv and argv[0] == "results":
+        return results_store.main(argv[1:])
+    if argv and argv[0] == "spend":
+        return spend_ledger.main(argv[1:])
+    
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        return run_headless(args)
+    return run_interactive()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
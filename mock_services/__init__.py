@@ -0,0 +1,11 @@
+from .faults import FaultConfig
+from .mahojin import MahojinMock
+from .chain import ChainMock
+from .server import MockServices
+
+__all__ = [
+    "FaultConfig",
+    "MahojinMock",
+    "ChainMock",
+    "MockServices"
+]
@@ -0,0 +1,54 @@
+import sys
+import json
+import asyncio
+import argparse
+
+from .server import MockServices
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Локальные заглушки Mahojin, Dynamic auth и JSON-RPC для нагрузочных тестов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--config", help="JSON с настройками заглушек (порты, задержки, доли ошибок)")
+    parser.add_argument("--mahojin-port", type=int)
+    parser.add_argument("--rpc-port", type=int)
+    parser.add_argument("--latency-ms", type=float, help="задержка каждого ответа обеих заглушек")
+    parser.add_argument("--error-rate", type=float, help="доля ответов 500")
+    parser.add_argument("--rate-limit-rate", type=float, help="доля ответов 429")
+    parser.add_argument("--generation-seconds", type=float, help="время генерации изображения")
+    parser.add_argument("--block-time", type=float, help="интервал между блоками")
+    args = parser.parse_args(argv)
+
+    config = {}
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+    if args.mahojin_port:
+        config["mahojin_port"] = args.mahojin_port
+    if args.rpc_port:
+        config["rpc_port"] = args.rpc_port
+
+    for section in ("mahojin", "chain"):
+        faults = config.setdefault(section, {}).setdefault("faults", {})
+        for key in ("latency_ms", "error_rate", "rate_limit_rate"):
+            if getattr(args, key) is not None:
+                faults[key] = getattr(args, key)
+    if args.generation_seconds is not None:
+        config["mahojin"]["generation_seconds"] = args.generation_seconds
+    if args.block_time is not None:
+        config["chain"]["block_time"] = args.block_time
+
+    services = MockServices(config, host=args.host)
+    print("Секция endpoints для config.json:")
+    print(json.dumps(services.endpoints(), indent=4))
+
+    try:
+        asyncio.run(services.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+import time
+import random
+import asyncio
+from typing import Dict, List, Any, Optional, Tuple
+
+import rlp
+from aiohttp import web
+from eth_abi import encode
+from eth_account import Account
+from eth_utils import keccak, to_checksum_address
+
+from .faults import FaultConfig, fault_middleware
+
+
+def _hex(value: int) -> str:
+    return hex(value)
+
+
+def _int(value: bytes) -> int:
+    return int.from_bytes(value, "big") if value else 0
+
+
+def _topic(value: Any) -> str:
+    """32-байтный topic из числа или адреса"""
+    if isinstance(value, str):
+        value = int(value, 16)
+    return "0x" + value.to_bytes(32, "big").hex()
+
+
+TRANSFER_TOPIC = "0x" + keccak(text="Transfer(address,address,uint256)").hex()
+IP_REGISTERED_TOPIC = "0x" + keccak(text="IPRegistered(address,uint256,address,uint256,string,string,uint256)").hex()
+
+
+class RpcError(Exception):
+
+    def __init__(self, message: str, code: int = -32000):
+        super().__init__(message)
+        self.code = code
+
+
+class ChainMock:
+    """Минимальная EVM-цепочка для JSON-RPC: принимает подписанные транзакции и раз в block_time собирает блоки"""
+
+    def __init__(
+        self,
+        faults: Optional[FaultConfig] = None,
+        chain_id: int = 1514,
+        block_time: float = 2,
+        base_fee: int = 10**9,
+        priority_fee: int = 10**8,
+        gas_used: int = 350_000,
+        initial_balance: int = 10 * 10**18,
+        revert_rate: float = 0,
+        drop_rate: float = 0,
+        max_block_transactions: int = 1000,
+        base_fee_growth: float = 0,
+        min_priority_fee: int = 0,
+        nft_contract: str = "0xb4D6411f44767a4C093CEFbf584cA9369849DB01",
+        ip_asset_registry: str = "0x77319B4031e6eF1250907aa00018B8B1c67a244b"
+    ):
+        self.faults = faults or FaultConfig()
+        self.chain_id = chain_id
+        self.block_time = block_time
+        self.base_fee = base_fee
+        self.priority_fee = priority_fee
+        self.gas_used = gas_used
+        self.initial_balance = initial_balance
+        self.revert_rate = revert_rate
+        self.drop_rate = drop_rate
+        self.max_block_transactions = max_block_transactions
+        # Перегрузка сети: base fee растет на эту долю каждый блок, а транзакции с tip ниже min_priority_fee не берутся в блок
+        self.base_fee_growth = base_fee_growth
+        self.min_priority_fee = min_priority_fee
+        # Успешная транзакция с calldata считается минтом: в квитанции Transfer NFT и IPRegistered
+        self.nft_contract = to_checksum_address(nft_contract)
+        self.ip_asset_registry = to_checksum_address(ip_asset_registry)
+        self.minted_tokens = 0
+
+        self.blocks: List[Dict[str, Any]] = []
+        self.transactions: Dict[str, Dict[str, Any]] = {}
+        self.receipts: Dict[str, Dict[str, Any]] = {}
+        self.nonces: Dict[str, int] = {}
+        self.balances: Dict[str, int] = {}
+        # Ожидающие транзакции по отправителю: nonce -> hash
+        self.pending: Dict[str, Dict[int, str]] = {}
+        self._miner: Optional[asyncio.Task] = None
+        self._mine_block([])
+
+        self.methods = {
+            "eth_chainId": lambda: _hex(self.chain_id),
+            "net_version": lambda: str(self.chain_id),
+            "eth_blockNumber": lambda: _hex(len(self.blocks) - 1),
+            "eth_gasPrice": lambda: _hex(self.base_fee + self.priority_fee),
+            "eth_maxPriorityFeePerGas": lambda: _hex(self.priority_fee),
+            "eth_getBlockByNumber": self.get_block_by_number,
+            "eth_getBlockByHash": self.get_block_by_hash,
+            "eth_getTransactionCount": self.get_transaction_count,
+            "eth_getBalance": self.get_balance,
+            "eth_estimateGas": lambda tx, *args: _hex(self.gas_used),
+            "eth_call": lambda tx, *args: "0x",
+            "eth_getCode": lambda address, *args: "0x",
+            "eth_sendRawTransaction": self.send_raw_transaction,
+            "eth_getTransactionByHash": self.get_transaction,
+            "eth_getTransactionReceipt": lambda tx_hash: self.receipts.get(tx_hash.lower()),
+            "eth_getLogs": self.get_logs
+        }
+
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[fault_middleware(self.faults)])
+        app.router.add_post("/", self.handle)
+        app.on_startup.append(self._start_miner)
+        app.on_cleanup.append(self._stop_miner)
+        return app
+
+
+    async def _start_miner(self, app: web.Application) -> None:
+        self._miner = asyncio.create_task(self._mine_loop())
+
+
+    async def _stop_miner(self, app: web.Application) -> None:
+        if self._miner is not None:
+            self._miner.cancel()
+            await asyncio.gather(self._miner, return_exceptions=True)
+
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if isinstance(body, list):
+            return web.json_response([self._dispatch(call) for call in body])
+        return web.json_response(self._dispatch(body))
+
+
+    def _dispatch(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        response = {"jsonrpc": "2.0", "id": call.get("id")}
+        method = self.methods.get(call.get("method"))
+        if method is None:
+            response["error"] = {"code": -32601, "message": f"method {call.get('method')} not supported"}
+            return response
+
+        try:
+            response["result"] = method(*call.get("params", []))
+        except RpcError as e:
+            response["error"] = {"code": e.code, "message": str(e)}
+        return response
+
+
+    def _block(self, tag: Any) -> Optional[Dict[str, Any]]:
+        if tag in ("latest", "pending", "safe", "finalized"):
+            return self.blocks[-1]
+        if tag == "earliest":
+            return self.blocks[0]
+        number = int(tag, 16)
+        return self.blocks[number] if number < len(self.blocks) else None
+
+
+    def _with_transactions(self, block: Optional[Dict[str, Any]], full: bool) -> Optional[Dict[str, Any]]:
+        if block is None or not full:
+            return block
+        return dict(block, transactions=[self.get_transaction(tx_hash) for tx_hash in block["transactions"]])
+
+
+    def get_block_by_number(self, tag: Any, full: bool = False) -> Optional[Dict[str, Any]]:
+        return self._with_transactions(self._block(tag), full)
+
+
+    def get_block_by_hash(self, block_hash: str, full: bool = False) -> Optional[Dict[str, Any]]:
+        block = next((block for block in self.blocks if block["hash"] == block_hash.lower()), None)
+        return self._with_transactions(block, full)
+
+
+    def get_transaction(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        tx = self.transactions.get(tx_hash.lower())
+        if tx is None:
+            return None
+        # Внутри числа хранятся как int, наружу отдаются в hex, как у настоящего узла
+        return {key: _hex(value) if isinstance(value, int) else value for key, value in tx.items()}
+
+
+    def get_transaction_count(self, address: str, tag: str = "latest") -> str:
+        address = address.lower()
+        nonce = self.nonces.get(address, 0)
+        if tag == "pending":
+            pending = self.pending.get(address, {})
+            while nonce in pending:
+                nonce += 1
+        return _hex(nonce)
+
+
+    def get_balance(self, address: str, tag: str = "latest") -> str:
+        return _hex(self.balances.get(address.lower(), self.initial_balance))
+
+
+    def _decode(self, raw: bytes) -> Dict[str, Any]:
+        if raw[0] == 2:
+            (chain_id, nonce, max_priority_fee, max_fee, gas, to, value, data,
+             access_list, v, r, s) = rlp.decode(raw[1:])
+            tx_type = 2
+        else:
+            nonce, gas_price, gas, to, value, data, v, r, s = rlp.decode(raw)
+            max_fee = max_priority_fee = gas_price
+            tx_type = 0
+
+        return {
+            "type": _hex(tx_type),
+            "nonce": _int(nonce),
+            "maxFeePerGas": _int(max_fee),
+            "maxPriorityFeePerGas": _int(max_priority_fee),
+            "gas": _int(gas),
+            "to": to_checksum_address(to) if to else None,
+            "value": _int(value),
+            "input": "0x" + data.hex(),
+            "v": _hex(_int(v)),
+            "r": _hex(_int(r)),
+            "s": _hex(_int(s))
+        }
+
+
+    def send_raw_transaction(self, raw_hex: str) -> str:
+        raw = bytes.fromhex(raw_hex[2:] if raw_hex.startswith("0x") else raw_hex)
+        try:
+            sender = Account.recover_transaction(raw)
+            decoded = self._decode(raw)
+        except Exception as e:
+            raise RpcError(f"invalid transaction: {e}")
+
+        address = sender.lower()
+        nonce = decoded["nonce"]
+        if nonce < self.nonces.get(address, 0):
+            raise RpcError("nonce too low")
+        if decoded["maxFeePerGas"] < self.base_fee:
+            raise RpcError("max fee per gas less than block base fee")
+
+        pending = self.pending.setdefault(address, {})
+        replaced = pending.get(nonce)
+        if replaced is not None and self.transactions[replaced]["maxFeePerGas"] * 110 // 100 > decoded["maxFeePerGas"]:
+            raise RpcError("replacement transaction underpriced")
+
+        tx_hash = "0x" + keccak(raw).hex()
+        self.transactions[tx_hash] = dict(
+            decoded,
+            hash=tx_hash,
+            gasPrice=decoded["maxFeePerGas"],
+            chainId=_hex(self.chain_id),
+            blockHash=None,
+            blockNumber=None,
+            transactionIndex=None,
+            **{"from": sender}
+        )
+        if replaced is not None:
+            self.transactions.pop(replaced, None)
+
+        if random.random() < self.drop_rate:
+            # Узел принял транзакцию и потерял ее: клиент должен сам заметить пропажу
+            self.transactions.pop(tx_hash)
+            return tx_hash
+
+        pending[nonce] = tx_hash
+        return tx_hash
+
+
+    def get_logs(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        from_block = self._block(params.get("fromBlock", "earliest")) or self.blocks[-1]
+        to_block = self._block(params.get("toBlock", "latest")) or self.blocks[-1]
+        addresses = params.get("address")
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        addresses = {address.lower() for address in addresses} if addresses else None
+        topics = params.get("topics") or []
+
+        logs = []
+        for block in self.blocks[int(from_block["number"], 16):int(to_block["number"], 16) + 1]:
+            for tx_hash in block["transactions"]:
+                for log in self.receipts[tx_hash]["logs"]:
+                    if addresses is not None and log["address"].lower() not in addresses:
+                        continue
+                    if not all(
+                        expected is None or (log["topics"][i] if i < len(log["topics"]) else None) in
+                        (expected if isinstance(expected, list) else [expected])
+                        for i, expected in enumerate(topics)
+                    ):
+                        continue
+                    logs.append(log)
+        return logs
+
+
+    def _mint_logs(self, tx: Dict[str, Any], log_index: int) -> List[Dict[str, Any]]:
+        self.minted_tokens += 1
+        token_id = self.minted_tokens
+        ip_id = to_checksum_address(keccak(self.chain_id.to_bytes(32, "big") + bytes.fromhex(self.nft_contract[2:]) + token_id.to_bytes(32, "big"))[12:])
+        data = encode(["address", "string", "string", "uint256"], [ip_id, f"Mahojin #{token_id}", "", int(time.time())])
+        return [
+            {
+                "address": self.nft_contract,
+                "topics": [TRANSFER_TOPIC, _topic(0), _topic(tx["from"]), _topic(token_id)],
+                "data": "0x",
+                "transactionHash": tx["hash"],
+                "logIndex": _hex(log_index),
+                "removed": False
+            },
+            {
+                "address": self.ip_asset_registry,
+                "topics": [IP_REGISTERED_TOPIC, _topic(self.chain_id), _topic(self.nft_contract), _topic(token_id)],
+                "data": "0x" + data.hex(),
+                "transactionHash": tx["hash"],
+                "logIndex": _hex(log_index + 1),
+                "removed": False
+            }
+        ]
+
+
+    def _take_pending(self) -> List[Tuple[str, Dict[str, Any]]]:
+        included = []
+        for address, pending in self.pending.items():
+            nonce = self.nonces.get(address, 0)
+            while nonce in pending and len(included) < self.max_block_transactions:
+                tx = self.transactions[pending[nonce]]
+                if tx["maxFeePerGas"] < self.base_fee or tx["maxPriorityFeePerGas"] < self.min_priority_fee:
+                    break
+                included.append((address, self.transactions[pending.pop(nonce)]))
+                nonce += 1
+            self.nonces[address] = nonce
+        return included
+
+
+    def _mine_block(self, included: List[Tuple[str, Dict[str, Any]]]) -> None:
+        number = len(self.blocks)
+        block_hash = "0x" + keccak(number.to_bytes(8, "big") + str(time.time()).encode()).hex()
+        cumulative_gas = 0
+        hashes = []
+        logs_in_block: List[Dict[str, Any]] = []
+
+        for index, (address, tx) in enumerate(included):
+            gas_used = min(self.gas_used, tx["gas"])
+            cumulative_gas += gas_used
+            effective_price = min(tx["maxFeePerGas"], self.base_fee + tx["maxPriorityFeePerGas"])
+            self.balances[address] = self.balances.get(address, self.initial_balance) - gas_used * effective_price - tx["value"]
+
+            tx.update(blockHash=block_hash, blockNumber=_hex(number), transactionIndex=_hex(index))
+            status = "0x0" if random.random() < self.revert_rate else "0x1"
+            logs = []
+            if status == "0x1" and tx["input"] != "0x":
+                logs = self._mint_logs(tx, len(logs_in_block))
+                for log in logs:
+                    log.update(blockHash=block_hash, blockNumber=_hex(number), transactionIndex=_hex(index))
+                logs_in_block.extend(logs)
+            self.receipts[tx["hash"]] = {
+                "transactionHash": tx["hash"],
+                "transactionIndex": _hex(index),
+                "blockHash": block_hash,
+                "blockNumber": _hex(number),
+                "from": tx["from"],
+                "to": tx["to"],
+                "cumulativeGasUsed": _hex(cumulative_gas),
+                "gasUsed": _hex(gas_used),
+                "effectiveGasPrice": _hex(effective_price),
+                "contractAddress": None,
+                "logs": logs,
+                "logsBloom": "0x" + "00" * 256,
+                "status": status,
+                "type": tx["type"]
+            }
+            hashes.append(tx["hash"])
+
+        self.blocks.append({
+            "number": _hex(number),
+            "hash": block_hash,
+            "parentHash": self.blocks[-1]["hash"] if self.blocks else "0x" + "00" * 32,
+            "timestamp": _hex(int(time.time())),
+            "miner": "0x" + "00" * 20,
+            "difficulty": "0x0",
+            "extraData": "0x",
+            "gasLimit": _hex(30_000_000),
+            "gasUsed": _hex(cumulative_gas),
+            "baseFeePerGas": _hex(self.base_fee),
+            "logsBloom": "0x" + "00" * 256,
+            "transactions": hashes
+        })
+
+
+    async def _mine_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.block_time)
+            self._mine_block(self._take_pending())
+            self.base_fee = int(self.base_fee * (1 + self.base_fee_growth))
@@ -0,0 +1,49 @@
+import random
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Any
+
+from aiohttp import web
+
+
+@dataclass
+class FaultConfig:
+    """Задержка ответа и доля искусственных ошибок для заглушки"""
+    latency_ms: float = 0
+    latency_jitter_ms: float = 0
+    error_rate: float = 0
+    rate_limit_rate: float = 0
+    retry_after_seconds: int = 1
+
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FaultConfig":
+        return cls(**{key: value for key, value in data.items() if key in cls.__dataclass_fields__})
+
+
+    async def delay(self) -> None:
+        latency = self.latency_ms + random.uniform(0, self.latency_jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+
+def fault_middleware(faults: FaultConfig):
+    """Middleware aiohttp: задержка, затем 429 или 500 с заданной вероятностью"""
+
+    @web.middleware
+    async def middleware(request: web.Request, handler):
+        await faults.delay()
+
+        roll = random.random()
+        if roll < faults.rate_limit_rate:
+            return web.json_response(
+                {"error": "Too Many Requests"},
+                status=429,
+                headers={"Retry-After": str(faults.retry_after_seconds)}
+            )
+        if roll < faults.rate_limit_rate + faults.error_rate:
+            return web.json_response({"error": "Internal Server Error"}, status=500)
+
+        return await handler(request)
+
+    return middleware
@@ -0,0 +1,199 @@
+import time
+import uuid
+import random
+import secrets
+from typing import Dict, Any, Optional
+
+from aiohttp import web
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from .faults import FaultConfig, fault_middleware
+
+
+SESSION_COOKIE = "next-auth.session-token"
+CSRF_COOKIE = "next-auth.csrf-token"
+
+
+class MahojinMock:
+    """Заглушка app.mahojin.ai и app.dynamicauth.com: авторизация, поинты, генерация и публикация изображений"""
+
+    def __init__(
+        self,
+        faults: Optional[FaultConfig] = None,
+        generation_seconds: float = 5,
+        initial_points: int = 200,
+        points_per_hour: float = 40,
+        generation_cost: int = 40,
+        verify_signatures: bool = True
+    ):
+        self.faults = faults or FaultConfig()
+        self.generation_seconds = generation_seconds
+        self.initial_points = initial_points
+        self.points_per_hour = points_per_hour
+        self.generation_cost = generation_cost
+        self.verify_signatures = verify_signatures
+
+        self.jwts: Dict[str, str] = {}
+        self.sessions: Dict[str, str] = {}
+        self.wallets: Dict[str, Dict[str, float]] = {}
+        self.generations: Dict[str, Dict[str, Any]] = {}
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[fault_middleware(self.faults)])
+        app.add_routes([
+            web.get("/api/v0/sdk/{environment}/nonce", self.nonce),
+            web.post("/api/v0/sdk/{environment}/verify", self.verify),
+            web.get("/api/auth/session", self.session),
+            web.get("/api/auth/csrf", self.csrf),
+            web.post("/api/auth/callback/dynamic_labs", self.callback),
+            web.post("/api/point/claim", self.claim),
+            web.post("/api/generate-image", self.generate_image),
+            web.post("/api/generate-image/requests/sync-state", self.sync_state),
+            web.post("/api/upload/signed-url", self.signed_url),
+            web.post("/api/images/moderations", self.moderation),
+            web.post("/api/metadata/image", self.create_metadata),
+            web.get("/api/metadata/image/{metadata_id}", self.get_metadata)
+        ])
+        return app
+
+
+    def _wallet(self, request: web.Request) -> Optional[str]:
+        return self.sessions.get(request.cookies.get(SESSION_COOKIE, ""))
+
+
+    def _points(self, wallet: str) -> Dict[str, float]:
+        now = time.time()
+        state = self.wallets.setdefault(wallet, {"points": self.initial_points, "updated_at": now})
+        state["points"] += (now - state["updated_at"]) / 3600 * self.points_per_hour
+        state["updated_at"] = now
+        return state
+
+
+    async def nonce(self, request: web.Request) -> web.Response:
+        return web.json_response({"nonce": secrets.token_hex(16)})
+
+
+    async def verify(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        wallet = data.get("publicWalletAddress", "")
+
+        if self.verify_signatures:
+            try:
+                signer = Account.recover_message(encode_defunct(text=data["messageToSign"]), signature=data["signedMessage"])
+            except Exception as e:
+                return web.json_response({"error": f"bad signature: {e}"}, status=400)
+            if signer.lower() != wallet.lower():
+                return web.json_response({"error": "signature does not match wallet"}, status=400)
+
+        jwt = secrets.token_urlsafe(32)
+        self.jwts[jwt] = wallet
+        return web.json_response({"jwt": jwt, "user": {"id": str(uuid.uuid5(uuid.NAMESPACE_OID, wallet.lower()))}})
+
+
+    async def session(self, request: web.Request) -> web.Response:
+        wallet = self._wallet(request)
+        if wallet is None:
+            return web.json_response({})
+        return web.json_response({"user": {"wallet_address": wallet}, "expires": "2099-01-01T00:00:00.000Z"})
+
+
+    async def csrf(self, request: web.Request) -> web.Response:
+        token = secrets.token_hex(32)
+        response = web.json_response({"csrfToken": token})
+        response.set_cookie(CSRF_COOKIE, token)
+        return response
+
+
+    async def callback(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        wallet = self.jwts.pop(form.get("token", ""), None)
+        if wallet is None:
+            return web.json_response({"error": "invalid token"}, status=401)
+
+        session_id = secrets.token_urlsafe(32)
+        self.sessions[session_id] = wallet
+        response = web.json_response({"url": form.get("callbackUrl", "")})
+        response.set_cookie(SESSION_COOKIE, session_id)
+        return response
+
+
+    async def claim(self, request: web.Request) -> web.Response:
+        wallet = self._wallet(request)
+        if wallet is None:
+            return web.json_response({"error": "unauthorized"}, status=401)
+        return web.json_response({"point": int(self._points(wallet)["points"])})
+
+
+    async def generate_image(self, request: web.Request) -> web.Response:
+        wallet = self._wallet(request)
+        if wallet is None:
+            return web.json_response({"error": "unauthorized"}, status=401)
+
+        points = self._points(wallet)
+        if points["points"] < self.generation_cost:
+            return web.json_response({"error": "not enough points"}, status=400)
+        points["points"] -= self.generation_cost
+
+        data = await request.json()
+        request_id = uuid.uuid4().hex
+        self.generations[request_id] = {
+            "ready_at": time.time() + self.generation_seconds,
+            "prompt": data.get("prompt", ""),
+            "seed": random.randint(0, 2**32 - 1)
+        }
+        return web.json_response({"request": {"requestId": request_id, "state": "QUEUED"}})
+
+
+    async def sync_state(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        requests = []
+        for request_id in data.get("requestIds", []):
+            generation = self.generations.get(request_id)
+            if generation is None:
+                continue
+
+            if time.time() < generation["ready_at"]:
+                requests.append({"requestId": request_id, "state": "PROCESSING", "jobs": []})
+                continue
+
+            requests.append({
+                "requestId": request_id,
+                "state": "DONE",
+                "jobs": [{
+                    "imageUrl": f"{request.url.origin()}/images/{request_id}.png",
+                    "seed": generation["seed"]
+                }]
+            })
+        return web.json_response({"requests": requests})
+
+
+    async def signed_url(self, request: web.Request) -> web.Response:
+        image_id = uuid.uuid4().hex
+        return web.json_response({"data": {
+            "imageId": image_id,
+            "uploadUrl": f"{request.url.origin()}/upload/{image_id}",
+            "readUrl": f"{request.url.origin()}/images/{image_id}.png"
+        }})
+
+
+    async def moderation(self, request: web.Request) -> web.Response:
+        if "imageId" not in request.query:
+            return web.json_response({"error": "imageId is required"}, status=400)
+        return web.json_response({"key": f"images/{request.query['imageId']}.png", "hasNSFW": False})
+
+
+    async def create_metadata(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        metadata_id = uuid.uuid4().hex
+        self.metadata[metadata_id] = data
+        return web.json_response({"metadataId": metadata_id, "metadataHash": "0x" + secrets.token_hex(32)})
+
+
+    async def get_metadata(self, request: web.Request) -> web.Response:
+        metadata = self.metadata.get(request.match_info["metadata_id"])
+        if metadata is None:
+            return web.json_response({"error": "not found"}, status=404)
+        return web.json_response(metadata)
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Dict, Any, Optional, List
+
+from aiohttp import web
+from loguru import logger
+
+from .faults import FaultConfig
+from .mahojin import MahojinMock
+from .chain import ChainMock
+
+
+class MockServices:
+    """Запускает заглушки Mahojin/Dynamic auth и JSON-RPC на локальных портах в текущем event loop"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, host: str = "127.0.0.1"):
+        config = config or {}
+        self.host = host
+        self.mahojin_port = config.get("mahojin_port", 8080)
+        self.rpc_port = config.get("rpc_port", 8545)
+
+        mahojin_config = dict(config.get("mahojin", {}))
+        chain_config = dict(config.get("chain", {}))
+        self.mahojin = MahojinMock(faults=FaultConfig.from_dict(mahojin_config.pop("faults", {})), **mahojin_config)
+        self.chain = ChainMock(faults=FaultConfig.from_dict(chain_config.pop("faults", {})), **chain_config)
+        self._runners: List[web.AppRunner] = []
+
+
+    @property
+    def mahojin_url(self) -> str:
+        return f"http://{self.host}:{self.mahojin_port}"
+
+
+    @property
+    def rpc_url(self) -> str:
+        return f"http://{self.host}:{self.rpc_port}"
+
+
+    def endpoints(self) -> Dict[str, str]:
+        """Секция endpoints для config.json, направляющая программу на заглушки"""
+        return {"mahojin_url": self.mahojin_url, "dynamic_auth_url": self.mahojin_url, "rpc_url": self.rpc_url}
+
+
+    async def start(self) -> None:
+        for app, port in ((self.mahojin.app(), self.mahojin_port), (self.chain.app(), self.rpc_port)):
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            site = web.TCPSite(runner, self.host, port)
+            await site.start()
+            self._runners.append(runner)
+
+        logger.info(f"Заглушки запущены: Mahojin и Dynamic auth {self.mahojin_url}, JSON-RPC {self.rpc_url}")
+
+
+    async def stop(self) -> None:
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners = []
+
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
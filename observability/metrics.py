@@ -0,0 +1,334 @@
+import re
+import time
+import bisect
+import functools
+import threading
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterable
+from urllib.parse import urlsplit
+from loguru import logger
+
+from observability.tracing import span
+
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class _Metric(ABC):
+    """Значения пишутся в шард текущего потока без блокировок; блокировка берется только при регистрации шарда"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[Tuple[str, ...], Any]] = []
+        self._shards_lock = threading.Lock()
+
+
+    def _shard(self) -> Dict[Tuple[str, ...], Any]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+
+    def _snapshot(self) -> List[Dict[Tuple[str, ...], Any]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict() копирует шард целиком под GIL, поэтому читать его можно без участия потока-владельца
+        return [dict(shard) for shard in shards]
+
+
+    def _format_labels(self, labels: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, labels))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+
+    @abstractmethod
+    def _render_samples(self) -> List[str]:
+        """Строки значений метрики в текстовом формате Prometheus"""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+    def value(self, *labels: str) -> float:
+        return sum(shard.get(labels, 0) for shard in self._snapshot())
+
+
+    def totals(self) -> Dict[Tuple[str, ...], float]:
+        totals: Dict[Tuple[str, ...], float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{self._format_labels(labels)} {value}" for labels, value in sorted(self.totals().items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self.callback = callback
+
+
+    def set(self, *labels: str, value: float) -> None:
+        self._values[labels] = value
+
+
+    def _render_samples(self) -> List[str]:
+        values = dict(self._values)
+        if self.callback is not None:
+            try:
+                values.update(self.callback())
+            except Exception as e:
+                logger.error(f"Ошибка при чтении метрики {self.name}: {e}")
+        return [f"{self.name}{self._format_labels(labels)} {value}" for labels, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+
+    def observe(self, *labels: str, value: float) -> None:
+        shard = self._shard()
+        data = shard.get(labels)
+        if data is None:
+            # счетчики корзин + последняя корзина +Inf, затем сумма и количество
+            data = shard[labels] = [0] * (len(self.buckets) + 3)
+        data[bisect.bisect_left(self.buckets, value)] += 1
+        data[-2] += value
+        data[-1] += 1
+
+
+    def totals(self) -> Dict[Tuple[str, ...], List[float]]:
+        totals: Dict[Tuple[str, ...], List[float]] = {}
+        for shard in self._snapshot():
+            for labels, data in shard.items():
+                total = totals.setdefault(labels, [0] * len(data))
+                for i, value in enumerate(list(data)):
+                    total[i] += value
+        return totals
+
+
+    def quantile(self, q: float, data: List[float]) -> Optional[float]:
+        """Оценка квантиля по корзинам с линейной интерполяцией внутри корзины, как histogram_quantile в Prometheus"""
+        count = data[-1]
+        if not count:
+            return None
+
+        rank = q * count
+        cumulative = 0
+        lower = 0.0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), data):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+            lower = bound
+        return lower
+
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for labels, data in sorted(self.totals().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), data):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{self._format_labels(labels, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(labels)} {data[-2]}")
+            lines.append(f"{self.name}_count{self._format_labels(labels)} {data[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (), callback=None) -> Gauge:
+        gauge = self._register(Gauge(name, documentation, labelnames, callback))
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "mahojin_http_requests_total", "HTTP запросы TLSClient", ["method", "host", "path", "status"]
+)
+HTTP_LATENCY = registry.histogram(
+    "mahojin_http_request_duration_seconds", "Длительность HTTP запросов TLSClient (с учетом повторов)", ["method", "host", "path"]
+)
+RETRIES = registry.counter(
+    "mahojin_retries_total", "Повторные попытки запросов", ["component", "reason"]
+)
+SESSION_RECREATIONS = registry.counter(
+    "mahojin_session_recreations_total", "Пересоздания HTTP сессии TLSClient"
+)
+RPC_REQUESTS = registry.counter(
+    "mahojin_rpc_requests_total", "JSON-RPC вызовы", ["method", "outcome"]
+)
+RPC_ENDPOINT_REQUESTS = registry.counter(
+    "mahojin_rpc_endpoint_requests_total", "Запросы к отдельным RPC сети", ["endpoint", "outcome"]
+)
+RPC_LATENCY = registry.histogram(
+    "mahojin_rpc_request_duration_seconds", "Длительность JSON-RPC вызовов", ["method"]
+)
+TX_REPLACEMENTS = registry.counter(
+    "mahojin_tx_replacements_total", "Замены зависших транзакций с повышенной комиссией", ["outcome"]
+)
+FAULTS_INJECTED = registry.counter(
+    "mahojin_faults_injected_total", "Искусственные сбои, внесенные FaultInjector", ["transport", "kind"]
+)
+STAGE_STARTED = registry.counter(
+    "mahojin_stage_started_total", "Запуски этапов прогона", ["stage"]
+)
+STAGE_RUNS = registry.counter(
+    "mahojin_stage_runs_total", "Выполнения этапов прогона", ["stage", "outcome"]
+)
+STAGE_LATENCY = registry.histogram(
+    "mahojin_stage_duration_seconds", "Длительность этапов прогона", ["stage"]
+)
+
+
+_ID_SEGMENT = re.compile(r"^(?:\d+|0x[0-9a-fA-F]+|[0-9a-fA-F-]{16,}|[A-Za-z0-9_-]{20,})$")
+
+
+@functools.lru_cache(maxsize=4096)
+def url_template(url: str) -> Tuple[str, str]:
+    """Хост и шаблон пути без query и идентификаторов, чтобы число серий метрик оставалось ограниченным"""
+    parts = urlsplit(url)
+    segments = ["{id}" if _ID_SEGMENT.match(segment) else segment for segment in parts.path.split("/")]
+    return parts.netloc, "/".join(segments) or "/"
+
+
+def timed_stage(stage: str):
+    """Декоратор асинхронного этапа: число запусков по исходу, гистограмма длительности и спан трейса"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            STAGE_STARTED.inc(stage)
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                with logger.contextualize(stage=stage), span(stage):
+                    result = await func(*args, **kwargs)
+                failed = result is False or (isinstance(result, dict) and result.get("success") is False)
+                outcome = "failed" if failed else "ok"
+                return result
+            finally:
+                STAGE_LATENCY.observe(stage, value=time.perf_counter() - started)
+                STAGE_RUNS.inc(stage, outcome)
+        return wrapper
+    return decorator
+
+
+def active_stages() -> Dict[str, int]:
+    """Сколько этапов каждого типа выполняется прямо сейчас: запуски минус завершения"""
+    active: Dict[str, int] = {}
+    for (stage,), value in STAGE_STARTED.totals().items():
+        active[stage] = active.get(stage, 0) + int(value)
+    for (stage, _), value in STAGE_RUNS.totals().items():
+        active[stage] = active.get(stage, 0) - int(value)
+    return active
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Запускает HTTP сервер /metrics в фоновом потоке (один раз на процесс)"""
+    global _server
+    if _server is not None:
+        return _server
+
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"Не удалось запустить сервер метрик на {host}:{port}: {e}")
+        return None
+
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return _server
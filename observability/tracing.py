@@ -0,0 +1,223 @@
+import os
+import sys
+import glob
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Optional, Iterator
+from loguru import logger
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "start", "end", "tid", "attrs")
+
+    def __init__(self, span_id: int, parent_id: Optional[int], name: str, start: float, tid: int, attrs: Dict[str, Any]):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start
+        self.end: Optional[float] = None
+        self.tid = tid
+        self.attrs = attrs
+
+
+class Trace:
+    """Спаны одного прогона; время хранится как perf_counter относительно начала трейса"""
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.wall_start = time.time()
+        self._perf_start = time.perf_counter()
+        self._tids: Dict[int, int] = {}
+        self.spans: List[Span] = []
+        self.root = self.open_span(name, None, attrs)
+
+
+    def _tid(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        # Параллельные задачи рисуются на отдельных дорожках, иначе спаны перекрываются
+        return self._tids.setdefault(id(task), len(self._tids) + 1)
+
+
+    def open_span(self, name: str, parent_id: Optional[int], attrs: Dict[str, Any]) -> Span:
+        span = Span(len(self.spans), parent_id, name, time.perf_counter() - self._perf_start, self._tid(), attrs)
+        self.spans.append(span)
+        return span
+
+
+    def close_span(self, span: Span) -> None:
+        span.end = time.perf_counter() - self._perf_start
+
+
+    @property
+    def duration(self) -> float:
+        return (self.root.end if self.root.end is not None else time.perf_counter() - self._perf_start)
+
+
+    def to_chrome(self) -> Dict[str, Any]:
+        pid = int(self.attrs.get("account_index", 0)) + 1
+        base_us = self.wall_start * 1_000_000
+        events = [{
+            "name": "process_name", "ph": "M", "pid": pid,
+            "args": {"name": f"{self.name} #{pid} {self.trace_id}"}
+        }]
+
+        for span in self.spans:
+            end = span.end if span.end is not None else self.duration
+            events.append({
+                "name": span.name,
+                "ph": "X",
+                "ts": round(base_us + span.start * 1_000_000, 1),
+                "dur": round((end - span.start) * 1_000_000, 1),
+                "pid": pid,
+                "tid": span.tid,
+                "args": dict(span.attrs, span_id=span.span_id, parent_id=span.parent_id)
+            })
+
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "metadata": dict(self.attrs, trace_id=self.trace_id, name=self.name,
+                             started_at=self.wall_start, duration=self.duration)
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("mahojin_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("mahojin_span", default=None)
+
+_settings: Dict[str, Any] = {"enabled": False, "sample_rate": 0.0, "output_dir": "files/traces"}
+
+
+def configure(enabled: bool = False, sample_rate: float = 0.05, output_dir: str = "files/traces") -> None:
+    _settings.update(enabled=enabled, sample_rate=sample_rate, output_dir=output_dir)
+    if enabled:
+        os.makedirs(output_dir, exist_ok=True)
+        logger.info(f"Трассировка включена: доля прогонов {sample_rate}, каталог {output_dir}")
+
+
+def start_trace(name: str, **attrs: Any) -> Optional[Trace]:
+    """Начинает трейс с учетом сэмплирования; для не попавших в выборку прогонов возвращает None"""
+    if not _settings["enabled"] or random.random() >= _settings["sample_rate"]:
+        return None
+    return Trace(name, attrs)
+
+
+@contextmanager
+def activate(trace: Optional[Trace]) -> Iterator[Optional[Trace]]:
+    if trace is None:
+        yield None
+        return
+
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = trace.open_span(name, parent.span_id if parent else None, attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        trace.close_span(current)
+
+
+def finish_trace(trace: Optional[Trace], **attrs: Any) -> Optional[str]:
+    if trace is None:
+        return None
+
+    trace.close_span(trace.root)
+    trace.attrs.update(attrs)
+    trace.root.attrs.update(attrs)
+
+    path = os.path.join(
+        _settings["output_dir"],
+        f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(trace.wall_start))}-{trace.trace_id}.json"
+    )
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace.to_chrome(), f, ensure_ascii=False, default=str)
+    except OSError as e:
+        logger.error(f"Не удалось сохранить трейс {path}: {e}")
+        return None
+    return path
+
+
+def critical_path(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Цепочка спанов от корня, на каждом уровне - дочерний спан, закончившийся последним"""
+    spans = [event for event in events if event.get("ph") == "X"]
+    children: Dict[Optional[int], List[Dict[str, Any]]] = {}
+    for event in spans:
+        children.setdefault(event["args"].get("parent_id"), []).append(event)
+
+    path = []
+    level = children.get(None, [])
+    while level:
+        current = max(level, key=lambda event: event["ts"] + event["dur"])
+        path.append(current)
+        level = children.get(current["args"]["span_id"], [])
+    return path
+
+
+def report(traces_dir: str = "files/traces", top: int = 10) -> str:
+    traces = []
+    for path in glob.glob(os.path.join(traces_dir, "*.json")):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            traces.append((data["metadata"].get("duration", 0), path, data))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Пропущен поврежденный трейс {path}: {e}")
+
+    traces.sort(key=lambda item: item[0], reverse=True)
+
+    lines = [f"Трейсов: {len(traces)}, самые медленные {min(top, len(traces))}:"]
+    for duration, path, data in traces[:top]:
+        metadata = data["metadata"]
+        lines.append("")
+        lines.append(
+            f"{duration:8.1f} с  аккаунт #{int(metadata.get('account_index', 0)) + 1}  "
+            f"success={metadata.get('success')}  {os.path.basename(path)}"
+        )
+        for event in critical_path(data["traceEvents"])[1:]:
+            lines.append(f"           {event['dur'] / 1_000_000:8.2f} с  {event['name']}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Отчет по самым медленным прогонам")
+    parser.add_argument("--dir", default="files/traces", help="каталог с трейсами")
+    parser.add_argument("--top", type=int, default=10, help="сколько прогонов показать")
+    args = parser.parse_args(argv)
+
+    print(report(args.dir, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
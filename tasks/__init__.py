@@ -3,6 +3,8 @@ from .image_generator import ImageGenerator
 from .publisher import Publisher
 from .blockchain import BlockchainManager
 from .mahojin_task import MahojinTask
+from .checkpoint import CheckpointStore, RunStage
+from .endpoints import Endpoints
 
 __all__ = [
     'Authenticator', 
@@ -10,4 +12,7 @@ __all__ = [
     'Publisher', 
     'BlockchainManager', 
     'MahojinTask',
+    'CheckpointStore',
+    'RunStage',
+    'Endpoints',
 ]
\ No newline at end of file
@@ -3,9 +3,9 @@ import logging
 from typing import Dict, Optional
 from urllib.parse import urlencode
 
-from eth_account.messages import encode_defunct
-
 from tls_client.client import TLSClient
+from observability.metrics import timed_stage
+from .endpoints import Endpoints
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +22,7 @@ class Authenticator:
     async def get_nonce(self) -> str:
         logger.info("Получение nonce для аутентификации")
         
-        url = "https://app.dynamicauth.com/api/v0/sdk/f710531c-6197-4279-b201-cfde7e6195e4/nonce"
+        url = Endpoints.dynamic_auth("/nonce")
         headers = {
             "accept": "*/*",
             "content-type": "application/json",
@@ -63,24 +63,24 @@ class Authenticator:
         return message
     
     
-    def sign_message(self, evm_client, message: str) -> str:
+    async def sign_message(self, evm_client, message: str) -> str:
         logger.info("Подписание сообщения для аутентификации")
         
-        encoded_message = encode_defunct(text=message)
-        signed = evm_client.web3.eth.account.sign_message(encoded_message, private_key=evm_client.private_key)
+        signature = await evm_client.sign_message(message)
         
-        logger.debug(f"Сообщение подписано: {signed.signature.hex()}")
-        return signed.signature.hex()
+        logger.debug(f"Сообщение подписано: {signature}")
+        return signature
     
     
+    @timed_stage("authenticate")
     async def authenticate(self, evm_client) -> bool:
         self.wallet_address = evm_client.account.address
         
         nonce = await self.get_nonce()
         message = self.prepare_sign_message(self.wallet_address, nonce)
-        signature = self.sign_message(evm_client, message)
+        signature = await self.sign_message(evm_client, message)
         
-        verify_url = "https://app.dynamicauth.com/api/v0/sdk/f710531c-6197-4279-b201-cfde7e6195e4/verify"
+        verify_url = Endpoints.dynamic_auth("/verify")
         headers = {
             "accept": "*/*",
             "content-type": "application/json",
@@ -113,7 +113,7 @@ class Authenticator:
         
         logger.info(f"Успешная аутентификация. User ID: {self.user_id}")
         
-        session_url = "https://app.mahojin.ai/api/auth/session"
+        session_url = Endpoints.mahojin("/api/auth/session")
         session_headers = {
             "accept": "*/*",
             "content-type": "application/json",
@@ -123,7 +123,7 @@ class Authenticator:
         
         data = await self.client.get(session_url, headers=session_headers)
                 
-        csrf_url = "https://app.mahojin.ai/api/auth/csrf"
+        csrf_url = Endpoints.mahojin("/api/auth/csrf")
         csrf_response = await self.client.get(csrf_url, headers=session_headers)
         
         csrf_data = csrf_response.json()
@@ -133,7 +133,7 @@ class Authenticator:
         
         csrf_token = csrf_data["csrfToken"]
         
-        dynamic_labs_req_url = "https://app.mahojin.ai/api/auth/callback/dynamic_labs"
+        dynamic_labs_req_url = Endpoints.mahojin("/api/auth/callback/dynamic_labs")
         dynamic_data = {
             'token': self.jwt_token,
             'referralId': '',
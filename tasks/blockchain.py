@@ -1,35 +1,58 @@
-import json
-import logging
 import asyncio
-from typing import Dict, Any, List
+import logging
+from typing import Dict, Any, List, Optional, Callable
 
 from web3 import Web3
 from web3.exceptions import TransactionNotFound
 
 from evm.client import EVMClient
+from evm.pending_transactions import PendingTransactionManager
+from evm.events import decode_mints
+from evm.networks import Networks
+from evm.registry import registry
+from observability.metrics import timed_stage
+from functions.mint_journal import MintJournal, MintStatus, reconcile
+from functions.spend_ledger import SpendLedger, GasBudget
 
 logger = logging.getLogger(__name__)
 
+SPG_NFT_CONTRACT = registry.protocol(Networks.STORY, "spg_nft").address
+
 
 class BlockchainManager:
-    def __init__(self, evm_client: EVMClient):
+    def __init__(
+        self,
+        evm_client: EVMClient,
+        receipt_poll_interval: float = 5,
+        receipt_timeout: float = 300,
+        stuck_blocks: int = 3,
+        bump_percent: float = 12.5,
+        max_bumps: int = 5,
+        mint_journal: Optional[MintJournal] = None,
+        spend_ledger: Optional[SpendLedger] = None,
+        gas_budget: Optional[GasBudget] = None
+    ):
         self.client = evm_client
-        self.contract_address = "0xcC2E862bCee5B6036Db0de6E06Ae87e524a79fd8"
-        self.abi_file = "license_attachment.json"
-        self._abi = None
+        self.pending_transactions = PendingTransactionManager(evm_client, stuck_blocks, bump_percent, max_bumps)
+        self.mint_journal = mint_journal
+        self.spend_ledger = spend_ledger
+        self.gas_budget = gas_budget
+        self.receipt_poll_interval = receipt_poll_interval
+        self.receipt_timeout = receipt_timeout
+        # Контракты берутся из реестра сети клиента
+        self.workflows = registry.protocol(evm_client.chain_id, "license_attachment_workflows")
+        self.contract_address = self.workflows.address
+        self.spg_nft_contract = registry.protocol(evm_client.chain_id, "spg_nft").address
         self._contract = None
     
     
     @property
     def abi(self) -> List[Dict[str, Any]]:
-        if self._abi is None:
-            try:
-                with open(f"evm/abis/{self.abi_file}", "r", encoding="utf-8") as f:
-                    self._abi = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError) as e:
-                logger.error(f"Ошибка при загрузке ABI: {e}")
-                raise
-        return self._abi
+        try:
+            return self.workflows.abi
+        except (FileNotFoundError, ValueError) as e:
+            logger.error(f"Ошибка при загрузке ABI: {e}")
+            raise
     
     
     @property
@@ -42,111 +65,234 @@ class BlockchainManager:
         return self._contract
     
     
-    async def mint_image_nft(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
-        logger.info("Начало процесса минтинга NFT")
+    def _encode_mint_call(self, metadata: Dict[str, Any]) -> str:
+        spg_nft_contract = Web3.to_checksum_address(self.spg_nft_contract)
+        recipient = self.client.account.address
         
-        try:
-            spg_nft_contract = Web3.to_checksum_address("0xb4D6411f44767a4C093CEFbf584cA9369849DB01")
-            recipient = self.client.account.address
-            
-            ip_metadata = (
-                metadata["metadata_url"],
-                Web3.keccak(text=metadata["metadataHash"]),
-                metadata["metadata_url"],
-                Web3.keccak(text=metadata["metadataHash"])
-            )
-            
-            license_terms = [(
-                (
-                    True,
-                    "0x9156e603C949481883B1d3355c6f1132D191fC41",
-                    0,
-                    0,
-                    True,
-                    True,
-                    "0x0000000000000000000000000000000000000000",
-                    b"",
-                    10000000, 
-                    0, 
-                    True,  
-                    True, 
-                    False,  
-                    True, 
-                    0,  
-                    "0x1514000000000000000000000000000000000000",
-                    ""  
-                ),
-                (  
-                    False,  
-                    0,  
-                    "0x0000000000000000000000000000000000000000",  
-                    b"",  
-                    0,  
-                    False,  
-                    0,  
-                    "0x0000000000000000000000000000000000000000"
-                )
-            )]
-            
-            allow_duplicates = False
-            
-            function_data = self.contract.encodeABI(
-                fn_name='mintAndRegisterIpAndAttachPILTerms',
-                args=[
-                    spg_nft_contract,
-                    recipient,
-                    ip_metadata,
-                    license_terms,
-                    allow_duplicates
-                ]
+        ip_metadata = (
+            metadata["metadata_url"],
+            Web3.keccak(text=metadata["metadataHash"]),
+            metadata["metadata_url"],
+            Web3.keccak(text=metadata["metadataHash"])
+        )
+        
+        license_terms = [(
+            (
+                True,
+                "0x9156e603C949481883B1d3355c6f1132D191fC41",
+                0,
+                0,
+                True,
+                True,
+                "0x0000000000000000000000000000000000000000",
+                b"",
+                10000000, 
+                0, 
+                True,  
+                True, 
+                False,  
+                True, 
+                0,  
+                "0x1514000000000000000000000000000000000000",
+                ""  
+            ),
+            (  
+                False,  
+                0,  
+                "0x0000000000000000000000000000000000000000",  
+                b"",  
+                0,  
+                False,  
+                0,  
+                "0x0000000000000000000000000000000000000000"
             )
+        )]
+        
+        allow_duplicates = False
+        
+        return self.contract.encodeABI(
+            fn_name='mintAndRegisterIpAndAttachPILTerms',
+            args=[
+                spg_nft_contract,
+                recipient,
+                ip_metadata,
+                license_terms,
+                allow_duplicates
+            ]
+        )
+    
+    
+    async def _resume_mint(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Минт метаданных по записи журнала: вошедшая в блок транзакция или еще ожидающая, которую
+        нужно ждать (и при необходимости заменять), а не отправлять минт повторно"""
+        metadata_id = entry["metadata_id"]
+        if entry["status"] == MintStatus.PENDING:
+            entry = (await reconcile(self.mint_journal, self.client.web3, [entry]))[0]
+        
+        if entry["status"] == MintStatus.CONFIRMED:
+            logger.warning(f"Метаданные {metadata_id} уже заминчены транзакцией {entry['landed_hash']}, повторный минт не отправляется")
+            return {"transaction_hash": entry["landed_hash"], "nonce": entry["nonce"]}
+        if entry["status"] == MintStatus.PENDING:
+            pending = self.pending_transactions.adopt(entry["tx"], entry["tx_hashes"], self._journal_hook(metadata_id))
+            logger.warning(f"Транзакция минта метаданных {metadata_id} еще не вошла в блок, ждем ее: {pending.tx_hash}")
+            return {"transaction_hash": pending.tx_hash, "nonce": entry["nonce"]}
+        return None
+    
+    
+    def _journal_hook(self, metadata_id: str) -> Callable[[Dict[str, Any], str], None]:
+        wallet = self.client.account.address
+        return lambda tx, tx_hash: self.mint_journal.record(wallet, metadata_id, tx, tx_hash)
+    
+    
+    @timed_stage("mint_send")
+    async def send_mint_transaction(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        metadata_id = metadata.get("metadataId")
+        journaled = self.mint_journal is not None and metadata_id is not None
+        if journaled:
+            entry = self.mint_journal.get(self.client.account.address, metadata_id)
+            resumed = await self._resume_mint(entry) if entry is not None else None
+            if resumed is not None:
+                return resumed
+        
+        logger.info("Отправка транзакции минта NFT")
+        
+        try:
+            function_data = self._encode_mint_call(metadata)
             
             tx = await self.client.build_transaction(
                 to=self.contract_address,
                 data=function_data
             )
             
-            tx_hash = await self.client.send_transaction(tx)
+            # Транзакция попадает в журнал до отправки: после сбоя минт не уйдет второй раз
+            on_signed = self._journal_hook(metadata_id) if journaled else None
+            tx_hash = (await self.pending_transactions.send(tx, on_signed)).tx_hash
             logger.info(f"Транзакция отправлена, хеш: {tx_hash}")
             
-            tx_receipt = await self._wait_for_transaction_receipt(tx_hash)
-            
-            if tx_receipt["status"] == 1:
-                logger.info(f"Транзакция успешно выполнена! Блок: {tx_receipt['blockNumber']}")
-                
-                return {
-                    "success": True,
-                    "transaction_hash": tx_hash,
-                    "block_number": tx_receipt["blockNumber"],
-                    "gas_used": tx_receipt["gasUsed"],
-                    "metadata": metadata
-                }
-            else:
-                logger.error("Транзакция завершилась неудачно")
-                return {
-                    "success": False,
-                    "transaction_hash": tx_hash,
-                    "error": "Transaction failed"
-                }
+            return {
+                "transaction_hash": tx_hash,
+                "nonce": tx["nonce"]
+            }
             
         except Exception as e:
-            logger.error(f"Ошибка при минтинге NFT: {e}")
+            logger.error(f"Ошибка при отправке транзакции минта: {e}")
             raise
     
     
-    async def _wait_for_transaction_receipt(self, tx_hash: str, timeout: int = 300, poll_interval: int = 5) -> Dict[str, Any]:
-        """Ожидает получения квитанции транзакции"""
-        start_time = asyncio.get_event_loop().time()
+    async def gas_price_over_limit(self) -> Optional[int]:
+        """Текущая цена газа (base fee + tip), если она выше потолка бюджета, иначе None"""
+        if self.gas_budget is None or not self.gas_budget.max_gas_price:
+            return None
+        latest_block, priority_fee = await asyncio.gather(
+            self.client.web3.eth.get_block('latest'),
+            self.client.web3.eth.max_priority_fee
+        )
+        gas_price = latest_block['baseFeePerGas'] + priority_fee
+        return gas_price if self.gas_budget.gas_price_too_high(gas_price) else None
+    
+    
+    @timed_stage("mint_confirm")
+    async def wait_for_mint(
+        self,
+        tx_hash: str,
+        metadata: Dict[str, Any],
+        on_replaced: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        sent_tx = self.pending_transactions.transaction(tx_hash) or {}
+        tx_receipt = await self.pending_transactions.wait_for_receipt(
+            tx_hash, timeout=self.receipt_timeout, poll_interval=self.receipt_poll_interval, on_replaced=on_replaced
+        )
+        # Если транзакцию заменяли с повышенной комиссией, в блок могла войти замена, а не исходная
+        tx_hash = tx_receipt["transactionHash"].hex()
+        if self.mint_journal is not None and metadata.get("metadataId") is not None:
+            self.mint_journal.finish(
+                self.client.account.address,
+                metadata["metadataId"],
+                MintStatus.CONFIRMED if tx_receipt["status"] == 1 else MintStatus.REVERTED,
+                tx_hash,
+                tx_receipt["blockNumber"]
+            )
+        if self.spend_ledger is not None:
+            self.spend_ledger.record(self.client.account.address, tx_receipt, value=sent_tx.get("value", 0))
+        
+        if tx_receipt["status"] == 1:
+            mint = decode_mints(tx_receipt["logs"], self.spg_nft_contract).get(tx_hash)
+            if mint is None:
+                logger.warning(f"В логах транзакции {tx_hash} нет минта NFT")
+            logger.info(
+                f"Транзакция успешно выполнена! Блок: {tx_receipt['blockNumber']}"
+                + (f", token id {mint.token_id}, IP {mint.ip_id}" if mint is not None else "")
+            )
+            
+            return {
+                "success": True,
+                "transaction_hash": tx_hash,
+                "block_number": tx_receipt["blockNumber"],
+                "token_id": mint.token_id if mint is not None else None,
+                "ip_id": mint.ip_id if mint is not None else None,
+                "gas_used": tx_receipt["gasUsed"],
+                "effective_gas_price": tx_receipt.get("effectiveGasPrice"),
+                "metadata": metadata
+            }
+        else:
+            logger.error("Транзакция завершилась неудачно")
+            return {
+                "success": False,
+                "transaction_hash": tx_hash,
+                "block_number": tx_receipt["blockNumber"],
+                "gas_used": tx_receipt["gasUsed"],
+                "effective_gas_price": tx_receipt.get("effectiveGasPrice"),
+                "error": "Transaction failed"
+            }
+    
+    
+    async def resume_sent_mint(self, metadata: Dict[str, Any], tx_hash: str, nonce: int) -> Optional[Dict[str, Any]]:
+        """Отправленный до перезапуска минт. По журналу опрашиваются все хеши транзакции и ее замен,
+        а ожидающая транзакция снова берется под наблюдение и заменяется при застревании.
+        None - минт в блок не вошел и его нужно отправить заново"""
+        metadata_id = metadata.get("metadataId")
+        if self.mint_journal is not None and metadata_id is not None:
+            entry = self.mint_journal.get(self.client.account.address, metadata_id)
+            if entry is not None:
+                return await self._resume_mint(entry)
         
-        while asyncio.get_event_loop().time() - start_time < timeout:
+        if await self.is_transaction_dropped([tx_hash], nonce):
+            return None
+        return {"transaction_hash": tx_hash, "nonce": nonce}
+    
+    
+    async def is_transaction_dropped(self, tx_hashes: List[str], nonce: int) -> bool:
+        """Транзакции с этим nonce потеряны, если ни одна не вошла в блок и при этом nonce уже занят
+        другой транзакцией кошелька или узел не знает ни одной из них"""
+        web3 = self.client.web3
+        # Nonce запрашивается раньше квитанций: если он уже занят нашей транзакцией, ее квитанция тоже найдется
+        confirmed_nonce = await web3.eth.get_transaction_count(self.client.account.address, "latest")
+        
+        for tx_hash in tx_hashes:
             try:
-                tx_receipt = await self.client.web3.eth.get_transaction_receipt(tx_hash)
-                if tx_receipt is not None:
-                    return tx_receipt
+                await web3.eth.get_transaction_receipt(tx_hash)
+                return False
             except TransactionNotFound:
                 pass
-            
-            await asyncio.sleep(poll_interval)
+        if confirmed_nonce > nonce:
+            return True
         
-        raise TimeoutError(f"Превышено время ожидания квитанции транзакции: {tx_hash}")
-    
\ No newline at end of file
+        for tx_hash in tx_hashes:
+            try:
+                await web3.eth.get_transaction(tx_hash)
+                return False
+            except TransactionNotFound:
+                pass
+        return True
+    
+    
+    async def mint_image_nft(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        logger.info("Начало процесса минтинга NFT")
+        
+        try:
+            sent = await self.send_mint_transaction(metadata)
+            return await self.wait_for_mint(sent["transaction_hash"], metadata)
+            
+        except Exception as e:
+            logger.error(f"Ошибка при минтинге NFT: {e}")
+            raise
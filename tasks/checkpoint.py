@@ -0,0 +1,74 @@
+import os
+import json
+import time
+import uuid
+import logging
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RunStage:
+    CLAIMED = "claimed"
+    GENERATED = "generated"
+    PUBLISHED = "published"
+    TX_SENT = "tx_sent"
+
+    # Подтверждение не сохраняется: после успешного минта чекпоинт удаляется
+    ORDER = [CLAIMED, GENERATED, PUBLISHED, TX_SENT]
+
+
+    @classmethod
+    def reached(cls, stage: Optional[str], target: str) -> bool:
+        """Проверяет, пройден ли этап target при текущем этапе stage"""
+        if stage is None:
+            return False
+        return cls.ORDER.index(stage) >= cls.ORDER.index(target)
+
+
+class CheckpointStore:
+    """Хранит состояние незавершенного прогона по каждому кошельку (один файл на кошелек)"""
+
+    def __init__(self, checkpoints_dir: str = "files/checkpoints"):
+        self.checkpoints_dir = checkpoints_dir
+        os.makedirs(self.checkpoints_dir, exist_ok=True)
+
+
+    def _path(self, wallet: str) -> str:
+        return os.path.join(self.checkpoints_dir, f"{wallet.lower()}.json")
+
+
+    def get(self, wallet: str) -> Optional[Dict[str, Any]]:
+        path = self._path(wallet)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Ошибка при чтении чекпоинта {path}: {e}")
+            return None
+
+
+    def save(self, wallet: str, stage: str, **data: Any) -> Dict[str, Any]:
+        checkpoint = self.get(wallet) or {"run_id": uuid.uuid4().hex}
+        checkpoint.update(data)
+        checkpoint["stage"] = stage
+        checkpoint["updated_at"] = time.time()
+
+        path = self._path(wallet)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        logger.debug(f"Чекпоинт {wallet}: {stage}")
+        return checkpoint
+
+
+    def clear(self, wallet: str) -> None:
+        try:
+            os.remove(self._path(wallet))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,29 @@
+from typing import Optional
+
+
+DYNAMIC_ENVIRONMENT_ID = "f710531c-6197-4279-b201-cfde7e6195e4"
+
+
+class Endpoints:
+    """Базовые адреса внешних сервисов; для нагрузочных тестов их подменяют адресами локальных заглушек"""
+
+    mahojin_url = "https://app.mahojin.ai"
+    dynamic_auth_url = "https://app.dynamicauth.com"
+
+
+    @classmethod
+    def configure(cls, mahojin_url: Optional[str] = None, dynamic_auth_url: Optional[str] = None) -> None:
+        if mahojin_url:
+            cls.mahojin_url = mahojin_url.rstrip("/")
+        if dynamic_auth_url:
+            cls.dynamic_auth_url = dynamic_auth_url.rstrip("/")
+
+
+    @classmethod
+    def mahojin(cls, path: str) -> str:
+        return f"{cls.mahojin_url}{path}"
+
+
+    @classmethod
+    def dynamic_auth(cls, path: str) -> str:
+        return f"{cls.dynamic_auth_url}/api/v0/sdk/{DYNAMIC_ENVIRONMENT_ID}{path}"
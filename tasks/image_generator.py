@@ -5,15 +5,18 @@ import asyncio
 from typing import Dict, Any
 
 from tls_client.client import TLSClient
+from observability.metrics import timed_stage
+from .endpoints import Endpoints
 
 logger = logging.getLogger(__name__)
 
 
 class ImageGenerator:
     
-    def __init__(self, tls_client: TLSClient, auth_cookies: Dict[str, str]):
+    def __init__(self, tls_client: TLSClient, auth_cookies: Dict[str, str], poll_interval: float = 5):
         self.client = tls_client
         self.auth_cookies = auth_cookies
+        self.poll_interval = poll_interval
         self.models = [
             {"modelId": "p4PgTp_bT9OxMzlnV7UeZQ", "modelVersionId": "qePX9z3iSJKZjEbFU8AYzw", "name": "FLUX", "version": "Dev"}, 
             {"modelId": "vUGcx92eTwKKfk7MUaAVoA", "modelVersionId": "5e61_C85TxCfYMIoqQH2bw", "name": "XMAG", "version": "1.0"}, 
@@ -38,10 +41,11 @@ class ImageGenerator:
         return random.choice(self.aspect_ratios)
     
     
+    @timed_stage("generate")
     async def generate_image(self, prompt: str) -> Dict[str, Any]:
         logger.info(f"Генерация изображения с prompt: '{prompt}'")
         
-        url = "https://app.mahojin.ai/api/generate-image"
+        url = Endpoints.mahojin("/api/generate-image")
         
         json_data = {
             'checkpoint': {
@@ -90,7 +94,7 @@ class ImageGenerator:
     
     
     async def check_generation_status(self, request_id: str) -> Dict[str, Any]:
-        url = "https://app.mahojin.ai/api/generate-image/requests/sync-state"
+        url = Endpoints.mahojin("/api/generate-image/requests/sync-state")
         
         payload = {
             "requestIds": [request_id]
@@ -121,7 +125,7 @@ class ImageGenerator:
             
             if "requests" not in status_data or not status_data["requests"]:
                 logger.error(f"Ошибка при проверке статуса: {status_data}")
-                await asyncio.sleep(5)
+                await asyncio.sleep(self.poll_interval)
                 continue
             
             request = status_data["requests"][0]
@@ -149,7 +153,7 @@ class ImageGenerator:
                 raise ValueError(f"Ошибка генерации изображения: {request.get('error', 'Неизвестная ошибка')}")
             
             logger.debug(f"Статус генерации: {state}, ожидаем...")
-            await asyncio.sleep(5)
+            await asyncio.sleep(self.poll_interval)
         
         logger.error(f"Время ожидания генерации изображения истекло ({timeout} сек)")
         raise TimeoutError(f"Время ожидания генерации изображения истекло ({timeout} сек)")
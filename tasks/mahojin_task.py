@@ -1,5 +1,5 @@
 import random
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from loguru import logger
 
 from tls_client.client import TLSClient
@@ -8,86 +8,227 @@ from .authenticator import Authenticator
 from .image_generator import ImageGenerator
 from .publisher import Publisher
 from .blockchain import BlockchainManager
+from .checkpoint import CheckpointStore, RunStage
+from .endpoints import Endpoints
+from observability.metrics import timed_stage
 from tasks.promts import get_diverse_prompts
 
 
+GENERATION_COST_POINTS = 40
+
+
 class MahojinTask:
-    
-    def __init__(self, 
-                 tls_client: TLSClient, 
+
+    def __init__(self,
+                 tls_client: TLSClient,
                  evm_client: EVMClient,
                  authenticator: Authenticator,
                  image_generator: ImageGenerator,
                  publisher: Publisher,
-                 blockchain_manager: BlockchainManager):
+                 blockchain_manager: BlockchainManager,
+                 checkpoint_store: Optional[CheckpointStore] = None):
         self.tls_client = tls_client
         self.evm_client = evm_client
         self.authenticator = authenticator
         self.image_generator = image_generator
         self.publisher = publisher
         self.blockchain_manager = blockchain_manager
-    
-    
-    async def run(self) -> Dict[str, Any]:        
+        self.checkpoint_store = checkpoint_store
+        self.wallet = evm_client.account.address
+        self.checkpoint: Dict[str, Any] = {}
+        self.resumed_from: Optional[str] = None
+        self.current_points: Optional[int] = None
+        self.points_spent = 0
+
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if self.checkpoint_store is None:
+            return {}
+        return self.checkpoint_store.get(self.wallet) or {}
+
+
+    def _save_checkpoint(self, stage: str, **data: Any) -> None:
+        if self.checkpoint_store is None:
+            self.checkpoint.update(data)
+            self.checkpoint["stage"] = stage
+            return
+        self.checkpoint = self.checkpoint_store.save(self.wallet, stage, **data)
+
+
+    def _clear_checkpoint(self) -> None:
+        self.checkpoint = {}
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.clear(self.wallet)
+
+
+    @property
+    def stage(self) -> Optional[str]:
+        return self.checkpoint.get("stage")
+
+
+    @timed_stage("claim")
+    async def claim_points(self) -> Optional[Dict[str, Any]]:
+        """Клеймит поинты. Возвращает результат пропуска, если поинтов недостаточно"""
         try:
-            if not self.authenticator.auth_cookies:
-                logger.error("Аутентификация не выполнена")
-                return {"success": False, "error": "Ошибка аутентификации"}
-            
-            try:
-                logger.info("Пытаемся заклеймить поинты")
-                point_data = await self.tls_client.post(
-                    url='https://app.mahojin.ai/api/point/claim',
-                    json={},
-                )
-                
-                if point_data.status_code == 200:
-                    point_data_json = point_data.json()
-                    current_points = point_data_json.get("point", 0)
-                    logger.info(f"Поинты успешно заклеймлены. Текущее количество поинтов: {current_points}")
-                    
-                    if current_points < 40:
-                        logger.info(f"Недостаточно поинтов для выполнения задачи (требуется 40, текущее: {current_points}). Ожидаем следующего захода.")
-                        return {
-                            "success": True,
-                            "skip_reason": "insufficient_points",
-                            "current_points": current_points,
-                            "required_points": 40,
-                            "point_data": point_data_json
-                        }
-                else:
-                    logger.warning(f"Ошибка при клейме поинтов: {point_data.status_code}, {point_data.text}")
-            except Exception as e:
-                logger.error(f"Ошибка при клейме поинтов: {e}")
-            
-            logger.info("Начало процесса генерации изображения")
-            prompt = random.choice(get_diverse_prompts())
-            image_data = await self.image_generator.generate_image(prompt)
-            
-            logger.info("Начало процесса публикации изображения")
-            publish_data = await self.publisher.publish_image(image_data)
+            logger.info("Пытаемся заклеймить поинты")
+            point_data = await self.tls_client.post(
+                url=Endpoints.mahojin("/api/point/claim"),
+                json={},
+            )
+
+            if point_data.status_code == 200:
+                point_data_json = point_data.json()
+                current_points = point_data_json.get("point", 0)
+                self.current_points = current_points
+                logger.info(f"Поинты успешно заклеймлены. Текущее количество поинтов: {current_points}")
+
+                if current_points < GENERATION_COST_POINTS:
+                    logger.info(f"Недостаточно поинтов для выполнения задачи (требуется {GENERATION_COST_POINTS}, текущее: {current_points}). Ожидаем следующего захода.")
+                    return {
+                        "success": True,
+                        "skip_reason": "insufficient_points",
+                        "wallet": self.wallet,
+                        "current_points": current_points,
+                        "required_points": GENERATION_COST_POINTS,
+                        "point_data": point_data_json
+                    }
+            else:
+                logger.warning(f"Ошибка при клейме поинтов: {point_data.status_code}, {point_data.text}")
+        except Exception as e:
+            logger.error(f"Ошибка при клейме поинтов: {e}")
+
+        return None
+
+
+    async def prepare(self) -> Optional[Dict[str, Any]]:
+        """Загружает чекпоинт и клеймит поинты. Возвращает итоговый результат, если продолжать не нужно"""
+        self.checkpoint = self._load_checkpoint()
+        self.resumed_from = self.stage
+        if self.resumed_from:
+            logger.info(f"Продолжаем прерванный прогон {self.checkpoint.get('run_id')} с этапа {self.resumed_from}")
+
+        if not RunStage.reached(self.stage, RunStage.PUBLISHED) and not self.authenticator.auth_cookies:
+            logger.error("Аутентификация не выполнена")
+            return {"success": False, "error": "Ошибка аутентификации"}
+
+        if not RunStage.reached(self.stage, RunStage.GENERATED):
+            skip_result = await self.claim_points()
+            if skip_result is not None:
+                return skip_result
+            self._save_checkpoint(RunStage.CLAIMED)
+
+        return None
+
+
+    async def generate(self) -> None:
+        if RunStage.reached(self.stage, RunStage.GENERATED):
+            return
+
+        logger.info("Начало процесса генерации изображения")
+        prompt = random.choice(get_diverse_prompts())
+        image_data = await self.image_generator.generate_image(prompt)
+        self.points_spent = GENERATION_COST_POINTS
+        self._save_checkpoint(RunStage.GENERATED, prompt=prompt, image_data=image_data)
+
+
+    async def publish(self) -> None:
+        if RunStage.reached(self.stage, RunStage.PUBLISHED):
+            return
+
+        logger.info("Начало процесса публикации изображения")
+        publish_data = await self.publisher.publish_image(self.checkpoint["image_data"])
+        self._save_checkpoint(RunStage.PUBLISHED, metadata=publish_data["metadata"])
+
+
+    async def mint(self) -> Dict[str, Any]:
+        metadata = self.checkpoint["metadata"]
+
+        if self.stage == RunStage.TX_SENT:
+            tx_hash = self.checkpoint["transaction_hash"]
+            resumed = await self.blockchain_manager.resume_sent_mint(metadata, tx_hash, self.checkpoint["nonce"])
+            if resumed is None:
+                logger.warning(f"Транзакция {tx_hash} потеряна сетью, отправляем минт заново")
+                self._save_checkpoint(RunStage.PUBLISHED, transaction_hash=None, nonce=None)
+            elif resumed["transaction_hash"] != tx_hash:
+                self._save_checkpoint(RunStage.TX_SENT, **resumed)
+
+        if not RunStage.reached(self.stage, RunStage.TX_SENT):
+            gas_price = await self.blockchain_manager.gas_price_over_limit()
+            if gas_price is not None:
+                # Чекпоинт остается на публикации: следующий прогон начнет сразу с минта
+                logger.warning(f"Цена газа {gas_price / 10**9:.2f} gwei выше лимита, минт отложен до следующего запуска")
+                return {
+                    "success": True,
+                    "skip_reason": "gas_price",
+                    "wallet": self.wallet,
+                    "gas_price": gas_price,
+                    "resumed_from": self.resumed_from,
+                    "current_points": self.current_points,
+                    "points_spent": self.points_spent
+                }
             
             logger.info("Начало процесса минтинга NFT")
-            blockchain_result = await self.blockchain_manager.mint_image_nft(publish_data["metadata"])
-            
-            result = {
-                "success": blockchain_result["success"],
-                "image": {
-                    "url": image_data["imageUrl"],
-                    "prompt": prompt,
-                    "seed": image_data["seed"]
-                },
-                "blockchain": {
-                    "transaction_hash": blockchain_result.get("transaction_hash"),
-                    "block_number": blockchain_result.get("block_number"),
-                    "token_id": blockchain_result.get("token_id")
-                },
-                "metadata": publish_data["metadata"]
-            }
-                        
-            return result
-            
+            sent = await self.blockchain_manager.send_mint_transaction(metadata)
+            self._save_checkpoint(RunStage.TX_SENT, **sent)
+
+        prompt = self.checkpoint["prompt"]
+        image_data = self.checkpoint["image_data"]
+        blockchain_result = await self.blockchain_manager.wait_for_mint(
+            self.checkpoint["transaction_hash"],
+            metadata,
+            # Чекпоинт хранит последнюю замену: после перезапуска ждать нужно ее
+            on_replaced=lambda tx_hash: self._save_checkpoint(RunStage.TX_SENT, transaction_hash=tx_hash)
+        )
+
+        if blockchain_result["success"]:
+            self._clear_checkpoint()
+        else:
+            self._save_checkpoint(RunStage.PUBLISHED, transaction_hash=None, nonce=None)
+
+        return {
+            "success": blockchain_result["success"],
+            "image": {
+                "url": image_data["imageUrl"],
+                "prompt": prompt,
+                "seed": image_data["seed"]
+            },
+            "blockchain": {
+                "transaction_hash": blockchain_result.get("transaction_hash"),
+                "block_number": blockchain_result.get("block_number"),
+                "token_id": blockchain_result.get("token_id"),
+                "ip_id": blockchain_result.get("ip_id"),
+                "gas_used": blockchain_result.get("gas_used"),
+                "effective_gas_price": blockchain_result.get("effective_gas_price")
+            },
+            "metadata": metadata,
+            "resumed_from": self.resumed_from,
+            "wallet": self.wallet,
+            "current_points": self.current_points,
+            "points_spent": self.points_spent
+        }
+
+
+    def failure(self, error: Exception) -> Dict[str, Any]:
+        logger.exception(f"Ошибка при выполнении задачи: {error}")
+        return {
+            "success": False,
+            "error": str(error),
+            "stage": self.stage,
+            "wallet": self.wallet,
+            "current_points": self.current_points,
+            "points_spent": self.points_spent
+        }
+
+
+    async def run(self) -> Dict[str, Any]:
+        try:
+            result = await self.prepare()
+            if result is not None:
+                return result
+
+            await self.generate()
+            await self.publish()
+            return await self.mint()
+
         except Exception as e:
-            logger.exception(f"Ошибка при выполнении задачи: {e}")
-            return {"success": False, "error": str(e)}
-        
\ No newline at end of file
+            return self.failure(e)
@@ -3,6 +3,8 @@ import logging
 from typing import Dict, Any
 
 from tls_client.client import TLSClient
+from observability.metrics import timed_stage
+from .endpoints import Endpoints
 
 
 logger = logging.getLogger(__name__)
@@ -18,7 +20,7 @@ class Publisher:
     async def upload_image(self, image_url: str) -> Dict[str, Any]:
         logger.info("Загрузка изображения на сервер")
         
-        url = "https://app.mahojin.ai/api/upload/signed-url"
+        url = Endpoints.mahojin("/api/upload/signed-url")
         
         payload = {
             "prefix": "images",
@@ -59,7 +61,7 @@ class Publisher:
     async def moderate_image(self, image_id: str, prompt: str) -> Dict[str, Any]:
         logger.info(f"Запрос модерации для изображения: {image_id}")
         
-        url = f"https://app.mahojin.ai/api/images/moderations?imageId={image_id}"
+        url = Endpoints.mahojin(f"/api/images/moderations?imageId={image_id}")
         
         payload = {
             "prompt": prompt
@@ -96,7 +98,7 @@ class Publisher:
     async def prepare_metadata(self, image_data: Dict[str, Any], upload_data: Dict[str, Any]) -> Dict[str, Any]:
         logger.info("Подготовка метаданных для публикации")
         
-        url = "https://app.mahojin.ai/api/metadata/image"
+        url = Endpoints.mahojin("/api/metadata/image")
         
         prompt = image_data["prompt"]
         prompt_words = prompt.split()
@@ -172,12 +174,13 @@ class Publisher:
         return {
             "metadataId": data["metadataId"],
             "metadataHash": data["metadataHash"],
-            "metadata_url": f"https://app.mahojin.ai/api/metadata/image/{data['metadataId']}",
+            "metadata_url": Endpoints.mahojin(f"/api/metadata/image/{data['metadataId']}"),
             "title": title,
             "prompt": prompt
         }
     
     
+    @timed_stage("publish")
     async def publish_image(self, image_data: Dict[str, Any]) -> Dict[str, Any]:
         upload_data = await self.upload_image(image_data["imageUrl"])
         moderation_data = await self.moderate_image(upload_data["imageId"], image_data["prompt"])
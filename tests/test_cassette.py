@@ -0,0 +1,82 @@
+import os
+import json
+import asyncio
+
+from tls_client.cassette import Cassette
+
+
+class FakeHeaders:
+
+    def __init__(self, items):
+        self.items = items
+
+
+    def multi_items(self):
+        return list(self.items)
+
+
+class FakeResponse:
+    """Поля ответа curl_cffi, которые пишет кассета"""
+
+    def __init__(self, status_code, body, headers=()):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode()
+        self.headers = FakeHeaders(headers)
+
+
+WALLET = "0x" + "ab" * 20
+
+
+def record(cassette, method, url, body, status_code=200, headers=()):
+    cassette.record(method, url, {}, FakeResponse(status_code, body, headers), started=0, elapsed=0.01, wallet=WALLET)
+
+
+def replay(cassette, method, url, wallet=WALLET):
+    return asyncio.run(cassette.replay(method, url, wallet))
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "default")
+    cassette = Cassette(path, mode="record")
+    record(cassette, "GET", "https://api.example/users/123/points", {"points": 1, "wallet": WALLET})
+    record(cassette, "GET", "https://api.example/users/456/points", {"points": 2})
+    record(cassette, "POST", "https://api.example/auth", {"token": "secret"}, headers=[("Set-Cookie", "sid=abc; Path=/")])
+    cassette.close()
+
+    cassette = Cassette(path, mode="replay", latency_scale=0)
+    # Идентификаторы в пути не входят в ключ: ответы одного ключа отдаются по кругу в порядке записи
+    first = replay(cassette, "GET", "https://other.host/users/789/points", wallet="0x" + "cd" * 20)
+    assert first.json() == {"points": 1, "wallet": "0x" + "cd" * 20}
+    assert replay(cassette, "GET", "https://api.example/users/1/points").json() == {"points": 2}
+    assert replay(cassette, "GET", "https://api.example/users/1/points").json()["points"] == 1
+
+    auth = replay(cassette, "POST", "https://api.example/auth")
+    assert auth.json() == {"token": "<redacted>"}
+    assert auth.headers["Set-Cookie"] == "sid=<redacted>; Path=/"
+    cassette.close()
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    path = str(tmp_path / "default")
+    cassette = Cassette(path, mode="record")
+    record(cassette, "GET", "https://api.example/status", {"n": 1})
+    record(cassette, "GET", "https://api.example/status", {"n": 2})
+    cassette.close()
+
+    # Падение во время записи: последняя запись оборвана, индекс не обновлен
+    with open(f"{path}.data", "r+b") as f:
+        f.truncate(os.path.getsize(f"{path}.data") - 5)
+    os.remove(f"{path}.idx")
+
+    cassette = Cassette(path, mode="replay", latency_scale=0)
+    assert [replay(cassette, "GET", "https://api.example/status").json()["n"] for _ in range(2)] == [1, 1]
+    cassette.close()
+
+    # Дозапись отрезает оборванный хвост, новые записи идут сразу за целыми
+    cassette = Cassette(path, mode="record")
+    record(cassette, "GET", "https://api.example/status", {"n": 3})
+    cassette.close()
+
+    cassette = Cassette(path, mode="replay", latency_scale=0)
+    assert [replay(cassette, "GET", "https://api.example/status").json()["n"] for _ in range(3)] == [1, 3, 1]
+    cassette.close()
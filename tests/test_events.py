@@ -0,0 +1,75 @@
+from eth_abi import encode
+from eth_utils import keccak, to_checksum_address
+from hexbytes import HexBytes
+from web3.datastructures import AttributeDict
+
+from evm.events import decode_mints, TRANSFER, IP_REGISTERED
+
+
+SPG_NFT = "0xb4D6411f44767a4C093CEFbf584cA9369849DB01"
+IP_ASSET_REGISTRY = "0x77319B4031e6eF1250907aa00018B8B1c67a244b"
+WIP = "0x1514000000000000000000000000000000000000"
+OTHER_NFT = "0x" + "12" * 20
+WALLET = "0x6813Eb9362372EEF6200f3b1dbC3f819671cBA69"
+IP_ID = to_checksum_address("0x2e2e7e1a2d5e3c4ad7c8c0e9f8a1b2c3d4e5f607")
+TX_HASH = HexBytes("0x" + "aa" * 32)
+
+
+def topic(abi_type, value):
+    return HexBytes(encode([abi_type], [value]))
+
+
+def log(address, topics, data=b"", log_index=0, tx_hash=TX_HASH):
+    """Лог в том виде, в каком его возвращает web3 в квитанции"""
+    return AttributeDict({
+        "address": address,
+        "topics": [HexBytes(item) for item in topics],
+        "data": HexBytes(data),
+        "blockNumber": 123,
+        "transactionHash": tx_hash,
+        "logIndex": log_index
+    })
+
+
+def mint_logs(nft_contract=SPG_NFT, token_id=7, tx_hash=TX_HASH, ip_id=IP_ID):
+    """Логи минта mintAndRegisterIpAndAttachPILTerms: перевод комиссии в WIP, минт NFT, регистрация IP
+    и событие прикрепления лицензии, которое декодер не знает"""
+    return [
+        log(WIP, [TRANSFER.topic, topic("address", WALLET), topic("address", nft_contract)],
+            encode(["uint256"], [10 ** 18]), 0, tx_hash),
+        log(nft_contract, [TRANSFER.topic, topic("address", "0x" + "00" * 20), topic("address", WALLET), topic("uint256", token_id)],
+            b"", 1, tx_hash),
+        log(IP_ASSET_REGISTRY, [IP_REGISTERED.topic, topic("uint256", 1514), topic("address", nft_contract), topic("uint256", token_id)],
+            encode(["address", "string", "string", "uint256"], [ip_id, "1514: Mahojin #7", "ipfs://meta", 1700000000]), 2, tx_hash),
+        log(IP_ASSET_REGISTRY, [keccak(text="LicenseTermsAttached(address,address,address,uint256)")], b"", 3, tx_hash)
+    ]
+
+
+def test_decode_mint_receipt():
+    mints = decode_mints(mint_logs(), SPG_NFT)
+
+    assert list(mints) == ["0x" + "aa" * 32]
+    mint = mints["0x" + "aa" * 32]
+    assert mint.token_id == 7
+    assert mint.owner == WALLET
+    assert mint.nft_contract == SPG_NFT
+    assert mint.ip_id == IP_ID
+    assert mint.block_number == 123
+
+
+def test_decode_filters_other_contracts():
+    other_hash = HexBytes("0x" + "bb" * 32)
+    other_ip_id = to_checksum_address("0x" + "34" * 20)
+    logs = mint_logs() + mint_logs(OTHER_NFT, token_id=7, tx_hash=other_hash, ip_id=other_ip_id)
+
+    assert list(decode_mints(logs, SPG_NFT)) == ["0x" + "aa" * 32]
+    # Без фильтра контракта IP Asset сопоставляется по паре (контракт, token id), а не только по token id
+    mints = decode_mints(logs)
+    assert mints["0x" + "bb" * 32].nft_contract.lower() == OTHER_NFT
+    assert mints["0x" + "bb" * 32].ip_id == other_ip_id
+    assert mints["0x" + "aa" * 32].ip_id == IP_ID
+
+
+def test_mint_without_ip_registration():
+    mints = decode_mints(mint_logs()[:2], SPG_NFT)
+    assert mints["0x" + "aa" * 32].ip_id is None
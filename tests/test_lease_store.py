@@ -0,0 +1,53 @@
+import pytest
+
+from functions import lease_store
+from functions.lease_store import LeaseStore
+
+
+CYCLE = 1000
+START = 1_000_000 * CYCLE
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # Все кошельки запускаются с начала цикла
+    monkeypatch.setattr(lease_store.random, "uniform", lambda low, high: 0)
+    store = LeaseStore(str(tmp_path / "leases.db"), lease_ttl=10, cycle_seconds=CYCLE)
+    store.register(["a", "b"])
+    yield store
+    store.close()
+
+
+def test_expired_lease_is_reclaimed(store):
+    now = START + 100
+    assert sorted(store.acquire("node-1", 10, now)) == ["a", "b"]
+    assert store.acquire("node-2", 10, now + 5) == []
+
+    store.complete("node-1", "a", store.current_cycle(now))
+    # Узел 1 пропал: после lease_ttl его невыполненный кошелек забирает другой узел
+    assert store.acquire("node-2", 10, now + 11) == ["b"]
+
+    # Запоздалое завершение прежнего владельца не засчитывается
+    store.complete("node-1", "b", store.current_cycle(now))
+    assert store.acquire("node-3", 10, now + 22) == ["b"]
+
+
+def test_complete_counts_lease_cycle(store):
+    now = START + CYCLE - 1
+    cycle = store.current_cycle(now)
+    assert store.acquire("node-1", 1, now) == ["a"]
+
+    # Прогон закончился уже в следующем цикле: кошелек выполнен в цикле аренды и в новом цикле берется снова
+    store.complete("node-1", "a", cycle)
+    assert sorted(store.acquire("node-1", 10, START + CYCLE + 1)) == ["a", "b"]
+
+
+def test_released_wallet_waits_for_retry(store):
+    now = START + 100
+    assert sorted(store.acquire("node-1", 10, now)) == ["a", "b"]
+
+    store.release("node-1", ["a"], now + 100)
+    store.release("node-1", ["b"])
+    assert store.acquire("node-2", 10, now + 50) == ["b"]
+    store.complete("node-2", "b", store.current_cycle(now))
+    assert store.acquire("node-2", 10, now + 101) == ["a"]
@@ -0,0 +1,79 @@
+import asyncio
+
+from web3.exceptions import TransactionNotFound
+
+from functions.mint_journal import MintJournal, MintStatus, reconcile
+
+
+WALLET = "0x" + "ab" * 20
+
+
+class FakeEth:
+    """Квитанции по хешу и подтвержденный nonce кошелька, как их вернул бы узел"""
+
+    def __init__(self, receipts, confirmed_nonce):
+        self.receipts = receipts
+        self.confirmed_nonce = confirmed_nonce
+
+
+    async def get_transaction_count(self, wallet, block_identifier):
+        return self.confirmed_nonce
+
+
+    async def get_transaction_receipt(self, tx_hash):
+        if tx_hash not in self.receipts:
+            raise TransactionNotFound(tx_hash)
+        return self.receipts[tx_hash]
+
+
+class FakeWeb3:
+
+    def __init__(self, receipts, confirmed_nonce):
+        self.eth = FakeEth(receipts, confirmed_nonce)
+
+
+def tx_hash(n):
+    return "0x" + f"{n:064x}"
+
+
+def test_reconcile_outcomes(tmp_path):
+    journal = MintJournal(str(tmp_path / "mints.db"))
+    # Подтвержден замененный вариант, а не исходная транзакция
+    journal.record(WALLET, "confirmed", {"nonce": 0}, tx_hash(1))
+    journal.record(WALLET, "confirmed", {"nonce": 0}, tx_hash(2))
+    journal.record(WALLET, "reverted", {"nonce": 1}, tx_hash(3))
+    # Nonce 2 занят транзакцией не из журнала
+    journal.record(WALLET, "lost", {"nonce": 2}, tx_hash(4))
+    journal.record(WALLET, "pending", {"nonce": 3}, tx_hash(5))
+
+    web3 = FakeWeb3({
+        tx_hash(2): {"status": 1, "blockNumber": 10},
+        tx_hash(3): {"status": 0, "blockNumber": 11}
+    }, confirmed_nonce=3)
+    entries = asyncio.run(reconcile(journal, web3, journal.pending()))
+
+    assert {entry["metadata_id"]: entry["status"] for entry in entries} == {
+        "confirmed": MintStatus.CONFIRMED,
+        "reverted": MintStatus.REVERTED,
+        "lost": MintStatus.LOST,
+        "pending": MintStatus.PENDING
+    }
+    confirmed = journal.get(WALLET, "confirmed")
+    assert confirmed["landed_hash"] == tx_hash(2)
+    assert confirmed["block_number"] == 10
+    assert journal.get(WALLET, "lost")["status"] == MintStatus.LOST
+    assert [entry["metadata_id"] for entry in journal.pending()] == ["pending"]
+    journal.close()
+
+
+def test_record_keeps_replaced_hashes(tmp_path):
+    journal = MintJournal(str(tmp_path / "mints.db"))
+    # Адрес в журнале не зависит от регистра
+    journal.record("0x" + "AB" * 20, "m", {"nonce": 5}, tx_hash(1))
+    journal.record(WALLET, "m", {"nonce": 5}, tx_hash(2))
+    journal.record(WALLET, "m", {"nonce": 5}, tx_hash(2))
+
+    entry = journal.get(WALLET, "m")
+    assert entry["tx_hashes"] == [tx_hash(1), tx_hash(2)]
+    assert entry["status"] == MintStatus.PENDING
+    journal.close()
@@ -0,0 +1,19 @@
+import pytest
+
+from functions.supervisor import shard_accounts
+
+
+ACCOUNTS = [{"private_key": f"0x{n:064x}"} for n in range(2000)]
+
+
+@pytest.mark.parametrize("shards, processes", [(2, 2), (2, 4), (4, 4)])
+def test_sub_shards_stay_balanced(shards, processes):
+    for shard in shard_accounts(ACCOUNTS, shards, salt="shard:"):
+        workers = [len(worker) for worker in shard_accounts(shard, processes)]
+        # Каждый процесс получает свою долю шарда, а не остаток после вложенного разбиения на том же кольце
+        assert min(workers) > len(shard) / processes * 0.6
+
+
+def test_shard_keeps_account_index():
+    shards = shard_accounts(ACCOUNTS[:10], 2, salt="shard:")
+    assert sorted(account["index"] for shard in shards for account in shard) == list(range(10))
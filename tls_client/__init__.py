@@ -1,4 +1,5 @@
 from .client import TLSClient
+from .cassette import Cassette, CassetteResponse
 from .exceptions import (
     TLSClientError,
     ConnectionError,
@@ -9,6 +10,8 @@ from .exceptions import (
 
 __all__ = [
     "TLSClient",
+    "Cassette",
+    "CassetteResponse",
     "TLSClientError",
     "ConnectionError",
     "TimeoutError",
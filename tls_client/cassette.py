@@ -0,0 +1,320 @@
+import os
+import re
+import json
+import mmap
+import zlib
+import base64
+import struct
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from .exceptions import TLSClientError
+from observability.metrics import url_template
+
+
+RECORD_HEADER = struct.Struct("<I")
+INDEX_HEADER = struct.Struct("<4sIQQ")
+# Запись индекса: хеш ключа, порядковый номер ответа по ключу, смещение и длина записи в файле данных
+INDEX_ENTRY = struct.Struct("<QIQI")
+INDEX_MAGIC = b"MHJC"
+INDEX_VERSION = 1
+
+REDACTED = "<redacted>"
+WALLET_PLACEHOLDER = "<wallet>"
+SECRET_HEADERS = {"authorization", "cookie", "set-cookie", "x-csrf-token", "proxy-authorization"}
+SECRET_FIELDS = re.compile(r"token|jwt|secret|password|signature|signed|cookie|private|key$", re.IGNORECASE)
+
+
+def interaction_key(method: str, url: str) -> str:
+    """Ключ сопоставления запроса: метод и шаблон пути без идентификаторов, как в метриках.
+    Хост в ключ не входит, чтобы кассету можно было воспроизвести с другими адресами endpoints"""
+    _, path = url_template(url)
+    return f"{method.upper()} {path}"
+
+
+def _key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+def _redact_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if SECRET_FIELDS.search(key) and isinstance(item, (str, int)) else _redact_value(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact_value(item) for item in value]
+    return value
+
+
+def _redact_cookie(header: str) -> str:
+    name, _, rest = header.partition("=")
+    attributes = rest.split(";", 1)
+    return f"{name}={REDACTED}" + (f";{attributes[1]}" if len(attributes) > 1 else "")
+
+
+class CassetteResponse:
+    """Ответ из кассеты с тем же набором полей, что используют задачи у ответа curl_cffi"""
+
+    def __init__(self, url: str, status_code: int, headers: List[Tuple[str, str]], content: bytes, elapsed: float):
+        self.url = url
+        self.status_code = status_code
+        self.headers = dict(headers)
+        self.header_items = headers
+        self.content = content
+        self.elapsed = elapsed
+
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class _IndexView:
+    """Последовательность (хеш, номер) поверх отображенного в память индекса для bisect"""
+
+    def __init__(self, buffer: mmap.mmap, count: int):
+        self.buffer = buffer
+        self.count = count
+
+
+    def __len__(self) -> int:
+        return self.count
+
+
+    def __getitem__(self, i: int) -> Tuple[int, int]:
+        return INDEX_ENTRY.unpack_from(self.buffer, INDEX_HEADER.size + i * INDEX_ENTRY.size)[:2]
+
+
+    def entry(self, i: int) -> Tuple[int, int, int, int]:
+        return INDEX_ENTRY.unpack_from(self.buffer, INDEX_HEADER.size + i * INDEX_ENTRY.size)
+
+
+class Cassette:
+    """Кассета HTTP-взаимодействий: файл данных только дописывается сжатыми записями,
+    отсортированный индекс (ключ, номер) -> смещение читается через mmap бинарным поиском,
+    поэтому воспроизведение не загружает кассету в память и не сканирует ее"""
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Неизвестный режим кассеты: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.data_path = f"{path}.data"
+        self.index_path = f"{path}.idx"
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._counters: Dict[int, int] = {}
+        self._closed = False
+
+        directory = os.path.dirname(self.data_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if mode == "record":
+            self._open_for_record()
+        else:
+            self._open_for_replay()
+
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+
+    def _open_for_record(self) -> None:
+        self._entries: List[Tuple[int, int, int, int]] = []
+        valid_size = 0
+        if os.path.exists(self.data_path):
+            # Дозапись в существующую кассету: номера по ключам продолжаются с уже записанных
+            for key_hash, seq, offset, length in self._scan():
+                self._entries.append((key_hash, seq, offset, length))
+                self._counters[key_hash] = seq + 1
+                valid_size = offset + RECORD_HEADER.size + length
+        self._data = open(self.data_path, "ab")
+        # Оборванная при падении последняя запись отрезается, иначе новые записи окажутся за ней
+        self._data.truncate(valid_size)
+        # Позиция после открытия - прежний конец файла, а смещения новых записей считаются от tell()
+        self._data.seek(valid_size)
+        self._started_at = time.time()
+
+
+    def _open_for_replay(self) -> None:
+        if not os.path.exists(self.data_path):
+            raise TLSClientError(f"Кассета {self.data_path} не найдена")
+
+        data_size = os.path.getsize(self.data_path)
+        if not self._index_is_current(data_size):
+            self.logger.warning(f"Индекс кассеты {self.index_path} устарел или отсутствует, перестраиваем")
+            self._write_index(sorted(self._scan()), data_size)
+
+        self._fd = os.open(self.data_path, os.O_RDONLY)
+        with open(self.index_path, "rb") as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, _, count = INDEX_HEADER.unpack_from(self._index, 0)
+        self._view = _IndexView(self._index, count)
+        self._ranges: Dict[int, Tuple[int, int]] = {}
+
+
+    def _index_is_current(self, data_size: int) -> bool:
+        try:
+            with open(self.index_path, "rb") as f:
+                magic, version, indexed_size, _ = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+        except (OSError, struct.error):
+            return False
+        return magic == INDEX_MAGIC and version == INDEX_VERSION and indexed_size == data_size
+
+
+    def _scan(self):
+        """Проходит файл данных по заголовкам записей; нужен только для восстановления индекса"""
+        counters: Dict[int, int] = {}
+        with open(self.data_path, "rb") as f:
+            offset = 0
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                (length,) = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length:
+                    # Хвост оборванной записи после падения не индексируется
+                    return
+                key_hash = _key_hash(json.loads(zlib.decompress(payload))["key"])
+                seq = counters.get(key_hash, 0)
+                counters[key_hash] = seq + 1
+                yield key_hash, seq, offset, length
+                offset += RECORD_HEADER.size + length
+
+
+    def _write_index(self, entries: List[Tuple[int, int, int, int]], data_size: int) -> None:
+        # У каждого процесса свой временный файл: индекс может перестраиваться в нескольких процессах сразу
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, data_size, len(entries)))
+            for entry in entries:
+                f.write(INDEX_ENTRY.pack(*entry))
+        os.replace(temp_path, self.index_path)
+
+
+    def record(self, method: str, url: str, request_kwargs: Dict[str, Any], response: Any,
+               started: float, elapsed: float, wallet: Optional[str] = None) -> None:
+        key = interaction_key(method, url)
+        content = response.content or b""
+        try:
+            body = content.decode("utf-8")
+            try:
+                body = json.dumps(_redact_value(json.loads(body)), ensure_ascii=False, separators=(",", ":"))
+            except ValueError:
+                pass
+            encoding = "text"
+        except UnicodeDecodeError:
+            body = base64.b64encode(content).decode()
+            encoding = "base64"
+
+        headers = []
+        for name, value in response.headers.multi_items():
+            if name.lower() == "set-cookie":
+                value = _redact_cookie(value)
+            elif name.lower() in SECRET_HEADERS:
+                value = REDACTED
+            headers.append([name, value])
+
+        request_body = request_kwargs.get("json")
+        record = {
+            "key": key,
+            "method": method.upper(),
+            "url": url.split("?", 1)[0],
+            "offset": started - self._started_at,
+            "elapsed": elapsed,
+            "status": response.status_code,
+            "headers": headers,
+            "body": body,
+            "encoding": encoding,
+            "request": None if request_body is None else _redact_value(request_body)
+        }
+
+        payload = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        if wallet:
+            # Адрес кошелька заменяется меткой, чтобы ответ подходил любому кошельку при воспроизведении
+            payload = re.sub(re.escape(wallet), WALLET_PLACEHOLDER, payload, flags=re.IGNORECASE)
+        compressed = zlib.compress(payload.encode("utf-8"))
+
+        key_hash = _key_hash(key)
+        with self._lock:
+            if self._closed:
+                return
+            offset = self._data.tell()
+            self._data.write(RECORD_HEADER.pack(len(compressed)) + compressed)
+            seq = self._counters.get(key_hash, 0)
+            self._counters[key_hash] = seq + 1
+            self._entries.append((key_hash, seq, offset, len(compressed)))
+
+
+    def _range(self, key_hash: int) -> Tuple[int, int]:
+        found = self._ranges.get(key_hash)
+        if found is None:
+            start = bisect_left(self._view, (key_hash, 0))
+            end = bisect_left(self._view, (key_hash + 1, 0), start)
+            found = self._ranges[key_hash] = (start, end - start)
+        return found
+
+
+    def _read(self, method: str, url: str) -> Dict[str, Any]:
+        key = interaction_key(method, url)
+        key_hash = _key_hash(key)
+        with self._lock:
+            start, count = self._range(key_hash)
+            if not count:
+                raise TLSClientError(f"В кассете {self.path} нет ответа для {key}")
+            # Ответы одного ключа отдаются по кругу в порядке записи
+            seq = self._counters.get(key_hash, 0)
+            self._counters[key_hash] = seq + 1
+
+        _, _, offset, length = self._view.entry(start + seq % count)
+        payload = os.pread(self._fd, length, offset + RECORD_HEADER.size)
+        return json.loads(zlib.decompress(payload))
+
+
+    async def replay(self, method: str, url: str, wallet: Optional[str] = None) -> CassetteResponse:
+        record = self._read(method, url)
+        if self.latency_scale > 0:
+            await asyncio.sleep(record["elapsed"] * self.latency_scale)
+
+        body = record["body"]
+        headers = [tuple(item) for item in record["headers"]]
+        if wallet:
+            body = body.replace(WALLET_PLACEHOLDER, wallet)
+            headers = [(name, value.replace(WALLET_PLACEHOLDER, wallet)) for name, value in headers]
+        content = base64.b64decode(body) if record["encoding"] == "base64" else body.encode("utf-8")
+        return CassetteResponse(url, record["status"], headers, content, record["elapsed"])
+
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+
+        if self.mode == "record":
+            self._data.close()
+            self._write_index(sorted(self._entries), os.path.getsize(self.data_path))
+            self.logger.info(f"Кассета {self.path} сохранена: {len(self._entries)} взаимодействий")
+        else:
+            self._index.close()
+            os.close(self._fd)
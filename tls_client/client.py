@@ -14,10 +14,12 @@ from .config import (
     DEFAULT_HEADERS, 
     DEFAULT_TIMEOUT
 )
-from .decorators import log_request
+from .cassette import Cassette, CassetteResponse
+from .decorators import log_request, record_metrics, trace_request
 from .exceptions import TLSClientError
 from .types import HeadersType, ProxyType
 from .fingerprint_randomizer import FingerprintRandomizer
+from observability.metrics import RETRIES, SESSION_RECREATIONS
 
 
 T = TypeVar('T')
@@ -32,7 +34,12 @@ class TLSClient:
         browser_type: Any = None,
         timeout: float = DEFAULT_TIMEOUT,
         disable_ssl: bool = DEFAULT_DISABLE_SSL,
-        randomize_fingerprint: bool = True
+        randomize_fingerprint: bool = True,
+        cassette: Optional[Cassette] = None,
+        wallet: Optional[str] = None,
+        fault_injector: Optional[Any] = None,
+        max_retries: int = 3,
+        retry_delay: float = 1.0
     ) -> None:
         self._proxy = proxy
         self._timeout = timeout
@@ -42,6 +49,11 @@ class TLSClient:
         self._browser_type = browser_type
         self._disable_ssl = disable_ssl
         self._headers = headers or {}
+        self._cassette = cassette
+        self._wallet = wallet
+        self._fault_injector = fault_injector
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
         
         if randomize_fingerprint:
             random_headers, random_browser_type = FingerprintRandomizer.get_random_fingerprint()
@@ -69,6 +81,8 @@ class TLSClient:
         async with self._session_lock:
             if self._is_closed:
                 return
+            
+            SESSION_RECREATIONS.inc()
                 
             if self._session:
                 try:
@@ -163,11 +177,19 @@ class TLSClient:
         return self._session.cookies
 
 
+    @record_metrics()
+    @trace_request()
     @log_request()
     async def request(self, method: str, url: str, *, headers: Optional[Dict[str, str]] = None, 
-                    max_retries: int = 3, retry_delay: float = 1.0, **kwargs: Any) -> Response:
+                    max_retries: Optional[int] = None, retry_delay: Optional[float] = None, **kwargs: Any) -> Response:
         if self._is_closed:
             raise TLSClientError("Клиент закрыт и не может выполнять запросы")
+        
+        max_retries = self._max_retries if max_retries is None else max_retries
+        retry_delay = self._retry_delay if retry_delay is None else retry_delay
+        
+        if self._cassette is not None and self._cassette.replaying:
+            return await self._replay(method, url)
             
         original_timeout = kwargs.get("timeout", self._timeout)
         
@@ -191,18 +213,24 @@ class TLSClient:
                 
                 try:
                     if method_lower == "get":
-                        request_task = asyncio.create_task(self._session.get(url, **kwargs))
+                        request_coro = self._session.get(url, **kwargs)
                     elif method_lower == "post":
-                        request_task = asyncio.create_task(self._session.post(url, **kwargs))
+                        request_coro = self._session.post(url, **kwargs)
                     elif method_lower == "put":
-                        request_task = asyncio.create_task(self._session.put(url, **kwargs))
+                        request_coro = self._session.put(url, **kwargs)
                     elif method_lower == "delete":
-                        request_task = asyncio.create_task(self._session.delete(url, **kwargs))
+                        request_coro = self._session.delete(url, **kwargs)
                     else:
                         raise TLSClientError(f"Unsupported method: {method}")
                     
                     current_timeout = kwargs.get("timeout", self._timeout)
+                    if self._fault_injector is not None:
+                        request_coro = self._fault_injector.http(request_coro, url, current_timeout)
+                    request_task = asyncio.create_task(request_coro)
+                    started = time.time()
                     resp = await asyncio.wait_for(request_task, timeout=current_timeout + 5.0)
+                    if self._cassette is not None:
+                        self._record(method, url, kwargs, resp, started)
                     return resp
                     
                 except asyncio.TimeoutError:
@@ -214,6 +242,8 @@ class TLSClient:
                             pass
                     
                     self.logger.warning(f"Таймаут запроса (попытка {attempt+1}/{max_retries}): {url}")
+                    if attempt < max_retries - 1:
+                        RETRIES.inc("http", "timeout")
                     
                     await self._recreate_session()
                     
@@ -230,6 +260,7 @@ class TLSClient:
                 self.logger.warning(f"Ошибка запроса (попытка {attempt+1}/{max_retries}): {str(e)}")
                 
                 if attempt < max_retries - 1:
+                    RETRIES.inc("http", "error")
                     backoff = retry_delay * (2 ** attempt) * (0.75 + 0.5 * random.random())
                     await asyncio.sleep(backoff)
                     continue
@@ -241,6 +272,23 @@ class TLSClient:
         raise TLSClientError(f"Request failed for unknown reason after {max_retries} attempts")
 
 
+    def _record(self, method: str, url: str, kwargs: Dict[str, Any], resp: Response, started: float) -> None:
+        try:
+            self._cassette.record(method, url, kwargs, resp, started, time.time() - started, self._wallet)
+        except Exception as e:
+            self.logger.warning(f"Не удалось записать ответ в кассету: {str(e)}")
+
+
+    async def _replay(self, method: str, url: str) -> CassetteResponse:
+        resp = await self._cassette.replay(method, url, self._wallet)
+        # Куки сессии из кассеты (значения скрыты) ставятся так же, как их поставил бы настоящий ответ
+        for name, value in resp.header_items:
+            if name.lower() == "set-cookie" and self._session is not None:
+                cookie_name, _, rest = value.partition("=")
+                self._session.cookies.set(cookie_name.strip(), rest.split(";", 1)[0])
+        return resp
+
+
     async def get(self, url: str, **kwargs: Any) -> Response:
         return await self.request("GET", url, **kwargs)
 
@@ -1,7 +1,11 @@
+import time
 import functools
 import logging
 from typing import Any, Callable, TypeVar, Awaitable
 
+from observability.metrics import HTTP_REQUESTS, HTTP_LATENCY, url_template
+from observability.tracing import span
+
 T = TypeVar('T')
 
 
@@ -23,3 +27,36 @@ def log_request(logger: logging.Logger = None):
                 raise
         return wrapper
     return decorator
+
+
+def record_metrics():
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(func)
+        async def wrapper(self, method: str, url: str, *args: Any, **kwargs: Any) -> T:
+            host, path = url_template(url)
+            method = method.upper()
+            started = time.perf_counter()
+            status = "error"
+            try:
+                result = await func(self, method, url, *args, **kwargs)
+                status = str(getattr(result, "status_code", "unknown"))
+                return result
+            finally:
+                HTTP_LATENCY.observe(method, host, path, value=time.perf_counter() - started)
+                HTTP_REQUESTS.inc(method, host, path, status)
+        return wrapper
+    return decorator
+
+
+def trace_request():
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(func)
+        async def wrapper(self, method: str, url: str, *args: Any, **kwargs: Any) -> T:
+            host, path = url_template(url)
+            with span(f"{method.upper()} {host}{path}") as current:
+                result = await func(self, method, url, *args, **kwargs)
+                if current is not None:
+                    current.attrs["status"] = getattr(result, "status_code", None)
+                return result
+        return wrapper
+    return decorator